@@ -0,0 +1,19 @@
+"""
+volt benchmarks.
+Run each benchmark as module from repository root. ex) `python -m benchmarks.codec_bench`
+"""
+
+from pathlib import Path
+from typing import List
+
+
+PAYLOADS_PATH = Path(__file__).parent / 'gateway_payloads.jsonl'
+
+
+def load_payloads() -> List[bytes]:
+    """
+    Load synthetic gateway payloads (HELLO, READY, GUILD_CREATE and mixed DISPATCH events), shaped like real discord payloads.
+    :return: list of raw JSON frames.
+    """
+    with open(PAYLOADS_PATH, 'rb') as f:
+        return [line.rstrip(b'\n') for line in f if line.strip()]
@@ -0,0 +1,50 @@
+"""
+Compare JSON backends of `volt.codec` (and ETF gateway encoding) on synthetic gateway payloads.
+usage : python -m benchmarks.codec_bench [rounds]
+"""
+
+import sys
+import time
+
+from volt import codec, etf
+from benchmarks import load_payloads
+
+
+def bench(name: str, func, payloads, rounds: int, size: int):
+    total_bytes = size * rounds
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for payload in payloads:
+            func(payload)
+    elapsed = time.perf_counter() - start
+    count = len(payloads) * rounds
+    print(f'{name:<28} {elapsed * 1000:>10.2f} ms  {count / elapsed:>12,.0f} frames/s  {total_bytes / elapsed / 1024 / 1024:>8.1f} MiB/s')
+
+
+def main(rounds: int = 20):
+    raw_frames = load_payloads()
+    text_frames = [frame.decode('utf-8') for frame in raw_frames]
+    objects = [codec.loads(frame) for frame in raw_frames]
+    etf_frames = [etf.encode(obj) for obj in objects]
+    json_size = sum(map(len, raw_frames))
+    etf_size = sum(map(len, etf_frames))
+    print(f'{len(raw_frames)} frames, {json_size:,} bytes as json, {etf_size:,} bytes as etf, {rounds} rounds. Default backend : {codec.get_backend().name}')
+
+    default_backend = codec.get_backend()
+    for name in codec.BACKENDS:
+        try:
+            backend = codec.set_backend(name)
+        except ModuleNotFoundError:
+            print(f'{name:<28} not installed.')
+            continue
+        bench(f'{name}.loads(bytes)', backend.loads, raw_frames, rounds, json_size)
+        bench(f'{name}.loads(str)', backend.loads, text_frames, rounds, json_size)
+        bench(f'{name}.dumps_bytes', backend.dumps_bytes, objects, rounds, json_size)
+    codec.set_backend(default_backend)
+
+    bench('etf.decode', etf.decode, etf_frames, rounds, etf_size)
+    bench('etf.encode', etf.encode, objects, rounds, etf_size)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
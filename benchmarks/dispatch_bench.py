@@ -0,0 +1,94 @@
+"""
+Measure per-event overhead of `EventManager.dispatch` on synthetic gateway payloads, against the previous dispatch path.
+Each round dispatches every DISPATCH event of the payloads, then runs listener tasks until they finish.
+usage : python -m benchmarks.dispatch_bench [rounds]
+"""
+
+import asyncio
+import sys
+import time
+
+from volt import codec
+from volt.events import EventManager, _current_shard_id
+from volt.gateway import GatewayResponse, GatewayOpcodes
+from benchmarks import load_payloads
+
+
+LISTENED_EVENTS = ('MESSAGE_CREATE', 'MESSAGE_UPDATE', 'MESSAGE_DELETE')
+
+
+class ListDispatchEventManager(EventManager):
+    """
+    Previous dispatch path : looks up mutable lists, and switches shard id context for every event.
+    """
+
+    def is_subscribed(self, event_name) -> bool:
+        return event_name in self.consumers or bool(self.listeners.get(event_name))
+
+    def dispatch(self, resp, shard_id=None):
+        hooks = self.hooks.get(resp.t)
+        if hooks:
+            for hook in hooks:
+                hook(resp.t, resp.data)
+        event_name, event_data = self.process_events(resp)
+        listeners = self.listeners.get(event_name)
+        if listeners:
+            token = _current_shard_id.set(shard_id)
+            try:
+                for listener in listeners:
+                    self.loop.create_task(listener(event_data))
+            finally:
+                _current_shard_id.reset(token)
+
+
+def load_events():
+    events = []
+    for frame in load_payloads():
+        resp = GatewayResponse(frame)
+        if resp.op is GatewayOpcodes.DISPATCH:
+            events.append(resp)
+    return events
+
+
+async def bench(name: str, manager: EventManager, events, rounds: int, listeners: int):
+    called = 0
+
+    async def listener(_):
+        nonlocal called
+        called += 1
+
+    for event_name in LISTENED_EVENTS:
+        for _ in range(listeners):
+            manager.listen(event_name, listener)
+    dispatch = manager.dispatch
+    # Warm up.
+    for resp in events:
+        dispatch(resp)
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for resp in events:
+            dispatch(resp)
+        # Run listener tasks created by this round.
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    count = len(events) * rounds
+    print(f'{name:<28} {listeners} listener(s)  {elapsed * 1000:>9.2f} ms  {elapsed / count * 1e9:>8.0f} ns/event  {count / elapsed:>12,.0f} events/s')
+
+
+async def run(rounds: int):
+    events = load_events()
+    listened = sum(resp.t in LISTENED_EVENTS for resp in events)
+    print(f'{len(events)} events ({listened} listened, decoded by {codec.get_backend().name}), {rounds} rounds.')
+    for listeners in (1, 3):
+        await bench('list dispatch (previous)', ListDispatchEventManager(gateway=None), events, rounds, listeners)
+        await bench('routing table dispatch', EventManager(gateway=None), events, rounds, listeners)
+
+
+def main(rounds: int = 500):
+    asyncio.run(run(rounds))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
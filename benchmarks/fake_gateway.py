@@ -0,0 +1,239 @@
+"""
+Local fake discord gateway, speaking enough of the gateway protocol to run GatewayBot offline.
+Supports HELLO, IDENTIFY / READY, heartbeat ACK, RESUME (with replay of missed events) and scripted DISPATCH floods,
+on json / etf encoding with optional zlib-stream compression.
+usage : python -m benchmarks.fake_gateway [port]
+"""
+
+import asyncio
+import sys
+import zlib
+from collections import deque
+from itertools import count
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+from aiohttp import web, WSMsgType
+
+from volt import codec, etf
+from volt.gateway import GatewayOpcodes
+
+
+__all__ = (
+    'FakeGateway',
+)
+
+
+class _Session:
+    __slots__ = ('session_id', 'seq', 'history', 'shard')
+
+    def __init__(self, session_id: str, history: int, shard: Optional[List[int]]):
+        self.session_id = session_id
+        self.seq: int = 0
+        # Sent dispatch payloads, replayed on resume.
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self.shard = shard
+
+
+class _Connection:
+    __slots__ = ('ws', 'encoding', 'compressor', 'session')
+
+    def __init__(self, ws: web.WebSocketResponse, encoding: str, compress: bool):
+        self.ws = ws
+        self.encoding = encoding
+        self.compressor = zlib.compressobj() if compress else None
+        self.session: Optional[_Session] = None
+
+    async def send(self, payload: Dict[str, Any]):
+        if self.ws.closed:
+            return
+        if self.encoding == 'etf':
+            data = etf.encode(payload)
+        else:
+            data = codec.dumps_bytes(payload)
+        if self.compressor is not None:
+            await self.ws.send_bytes(self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH))
+        elif self.encoding == 'etf':
+            await self.ws.send_bytes(data)
+        else:
+            await self.ws.send_str(data.decode('utf-8'))
+
+    def decode(self, data: Any) -> Dict[str, Any]:
+        return etf.decode(data, snowflakes=False) if self.encoding == 'etf' else codec.loads(data)
+
+
+class FakeGateway:
+    """
+    Local websocket server acting as discord gateway.
+    Point GatewayBot to it with `GatewayBot(..., gateway_url=fake.url)`.
+    """
+
+    def __init__(
+            self,
+            host: str = '127.0.0.1',
+            port: int = 0,
+            heartbeat_interval: float = 41.25,
+            guild_count: int = 1,
+            history: int = 1000,
+            ack_heartbeats: bool = True
+    ):
+        """
+        :param host: host to bind.
+        :param port: port to bind. 0 to use random free port.
+        :param heartbeat_interval: heartbeat interval sent in HELLO, in seconds.
+        :param guild_count: count of unavailable guilds in READY.
+        :param history: dispatch payloads kept per session for resume.
+        :param ack_heartbeats: whether to acknowledge heartbeats. Disable to simulate zombie connection.
+        """
+        self.host = host
+        self.port = port
+        self.heartbeat_interval = heartbeat_interval
+        self.guild_count = guild_count
+        self.history = history
+        self.ack_heartbeats = ack_heartbeats
+        self.sessions: Dict[str, _Session] = {}
+        self.connections: List[_Connection] = []
+        # Count of received gateway commands, by opcode name.
+        self.received: Dict[str, int] = {}
+        self.__session_ids = count(1)
+        self.__runner: Optional[web.AppRunner] = None
+        self.__ready: Optional[asyncio.Condition] = None
+
+    @property
+    def url(self) -> str:
+        return f'ws://{self.host}:{self.port}'
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/', self._handle)
+        self.__runner = web.AppRunner(app)
+        await self.__runner.setup()
+        site = web.TCPSite(self.__runner, self.host, self.port)
+        await site.start()
+        # Resolve the port when random port is used.
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.__ready = asyncio.Condition()
+
+    async def stop(self):
+        await self.disconnect(1001)
+        if self.__runner is not None:
+            await self.__runner.cleanup()
+            self.__runner = None
+
+    async def __aenter__(self) -> 'FakeGateway':
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    async def wait_ready(self, sessions: int = 1, timeout: Optional[float] = None):
+        """
+        Wait until given count of connections are identified or resumed.
+        """
+        async with self.__ready:
+            await asyncio.wait_for(
+                self.__ready.wait_for(lambda: sum(c.session is not None and not c.ws.closed for c in self.connections) >= sessions),
+                timeout
+            )
+
+    async def disconnect(self, code: int = 4000):
+        """
+        Close every connection with given close code. Sessions are kept, so clients can resume.
+        """
+        for connection in list(self.connections):
+            await connection.ws.close(code=code)
+
+    async def dispatch(self, event: str, data: Any, connection: Optional[_Connection] = None):
+        """
+        Send DISPATCH event to a connection, or to every ready connection.
+        """
+        targets = [connection] if connection is not None else [c for c in self.connections if c.session is not None]
+        for target in targets:
+            session = target.session
+            session.seq += 1
+            payload = {'op': GatewayOpcodes.DISPATCH.value, 't': event, 's': session.seq, 'd': data}
+            session.history.append(payload)
+            await target.send(payload)
+
+    async def flood(self, events: Iterable[Tuple[str, Any]], connection: Optional[_Connection] = None):
+        """
+        Send scripted DISPATCH events as fast as possible.
+        :param events: iterable of (event name, event data).
+        """
+        for event, data in events:
+            await self.dispatch(event, data, connection)
+
+    async def _notify_ready(self):
+        async with self.__ready:
+            self.__ready.notify_all()
+
+    async def _identify(self, connection: _Connection, data: Dict[str, Any]):
+        session = _Session(f'fake-session-{next(self.__session_ids)}', self.history, data.get('shard'))
+        self.sessions[session.session_id] = session
+        connection.session = session
+        await self.dispatch('READY', {
+            'v': 9,
+            'user': {'id': '1', 'username': 'volt', 'discriminator': '0000', 'bot': True},
+            'guilds': [{'id': str(guild_id), 'unavailable': True} for guild_id in range(1, self.guild_count + 1)],
+            'session_id': session.session_id,
+            'resume_gateway_url': self.url,
+            'shard': session.shard,
+            'application': {'id': '1', 'flags': 0}
+        }, connection)
+        await self._notify_ready()
+
+    async def _resume(self, connection: _Connection, data: Dict[str, Any]):
+        session = self.sessions.get(data.get('session_id'))
+        seq = data.get('seq') or 0
+        if session is None or (session.history and session.history[0]['s'] > seq + 1):
+            # Unknown session, or missed events are not kept anymore.
+            await connection.send({'op': GatewayOpcodes.INVALIDATE_SESSION.value, 'd': False, 's': None, 't': None})
+            return
+        connection.session = session
+        for payload in list(session.history):
+            if payload['s'] > seq:
+                await connection.send(payload)
+        await self.dispatch('RESUMED', None, connection)
+        await self._notify_ready()
+
+    async def _handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        connection = _Connection(ws, request.query.get('encoding', 'json'), request.query.get('compress') == 'zlib-stream')
+        self.connections.append(connection)
+        try:
+            await connection.send({
+                'op': GatewayOpcodes.HELLO.value,
+                'd': {'heartbeat_interval': int(self.heartbeat_interval * 1000)},
+                's': None,
+                't': None
+            })
+            async for msg in ws:
+                if msg.type not in (WSMsgType.TEXT, WSMsgType.BINARY):
+                    break
+                payload = connection.decode(msg.data)
+                op = GatewayOpcodes(payload['op'])
+                self.received[op.name] = self.received.get(op.name, 0) + 1
+                if op is GatewayOpcodes.HEARTBEAT:
+                    if self.ack_heartbeats:
+                        await connection.send({'op': GatewayOpcodes.HEARTBEAT_ACK.value, 'd': None, 's': None, 't': None})
+                elif op is GatewayOpcodes.IDENTIFY:
+                    await self._identify(connection, payload['d'])
+                elif op is GatewayOpcodes.RESUME:
+                    await self._resume(connection, payload['d'])
+        finally:
+            self.connections.remove(connection)
+        return ws
+
+
+async def _serve(port: int):
+    async with FakeGateway(port=port) as gateway:
+        print(f'Fake gateway is listening on {gateway.url}')
+        await asyncio.Event().wait()
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(_serve(int(sys.argv[1]) if len(sys.argv) > 1 else 8765))
+    except KeyboardInterrupt:
+        pass
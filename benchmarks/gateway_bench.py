@@ -0,0 +1,149 @@
+"""
+End-to-end gateway benchmark : GatewayBot.run -> EventManager.dispatch -> listener, against local fake gateway.
+Fake gateway floods synthetic DISPATCH events from another process, and reports events/sec,
+time from receive to listener, and memory use of the client process.
+usage : python -m benchmarks.gateway_bench [--rounds N] [--encoding json|etf] [--compress] [--no-filter]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import time
+from collections import deque
+from typing import Any, Deque, List, Tuple
+
+from volt import codec
+from volt.gateway import GatewayBot, GatewayResponse, GatewayOpcodes
+from volt.utils.log import WARNING
+from volt.utils.stats import RollingStats
+from benchmarks import load_payloads
+from benchmarks.fake_gateway import FakeGateway
+
+try:
+    import resource
+except ImportError:     # Not available on windows.
+    resource = None
+
+
+# Events with benchmark listeners. Other events are filtered by gateway, unless filtering is disabled.
+LISTENED_EVENTS = ('MESSAGE_CREATE', 'MESSAGE_UPDATE', 'MESSAGE_DELETE')
+
+
+def load_flood() -> List[Tuple[str, Any]]:
+    events = []
+    for frame in load_payloads():
+        payload = codec.loads(frame)
+        if payload['op'] == GatewayOpcodes.DISPATCH and payload['t'] not in ('READY', 'GUILD_CREATE'):
+            events.append((payload['t'], payload['d']))
+    # Flood ends with listened event, so the last listener call marks the end of flood.
+    while events[-1][0] not in LISTENED_EVENTS:
+        events.pop()
+    return events
+
+
+def _serve(conn, rounds: int):
+    async def serve():
+        events = load_flood()
+        async with FakeGateway() as gateway:
+            conn.send(gateway.url)
+            await gateway.wait_ready()
+            for _ in range(rounds):
+                await gateway.flood(events)
+            # Keep serving until benchmark closes the bot.
+            await asyncio.get_running_loop().run_in_executor(None, conn.recv)
+    asyncio.run(serve())
+
+
+class BenchGatewayBot(GatewayBot):
+    """
+    GatewayBot recording receive time of listened events.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(BenchGatewayBot, self).__init__(*args, **kwargs)
+        self.received_at: Deque[float] = deque()
+        self.ready_at: float = 0.0
+
+    async def receive(self) -> GatewayResponse:
+        resp = await super(BenchGatewayBot, self).receive()
+        if resp.t in LISTENED_EVENTS:
+            self.received_at.append(time.perf_counter())
+        elif resp.t == 'READY':
+            self.ready_at = time.perf_counter()
+        return resp
+
+
+def max_rss_kib() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource is not None else 0
+
+
+async def bench(rounds: int, encoding: str, compress: bool, filter_events: bool):
+    events = load_flood()
+    expected = sum(event in LISTENED_EVENTS for event, _ in events) * rounds
+    # Forking a process with running event loop breaks asyncio in child. Spawn server process instead.
+    context = multiprocessing.get_context('spawn')
+    conn, child_conn = context.Pipe()
+    server = context.Process(target=_serve, args=(child_conn, rounds), daemon=True)
+    server.start()
+    url = await asyncio.get_running_loop().run_in_executor(None, conn.recv)
+
+    rss_before = max_rss_kib()
+    bot = BenchGatewayBot(
+        'fake-token',
+        encoding=encoding,
+        compress='zlib-stream' if compress else None,
+        filter_events=filter_events,
+        gateway_url=url
+    )
+    bot.logger.setLevel(WARNING)
+    latencies = RollingStats(size=expected)
+    done = asyncio.Event()
+    finished_at = 0.0
+
+    async def listener(_):
+        nonlocal finished_at
+        now = time.perf_counter()
+        latencies.add(now - bot.received_at.popleft())
+        if latencies.total == expected:
+            finished_at = now
+            done.set()
+
+    for event in LISTENED_EVENTS:
+        bot.event_manager.listen(event, listener)
+
+    task = asyncio.create_task(bot.run())
+    waiter = asyncio.create_task(done.wait())
+    await asyncio.wait((task, waiter), return_when=asyncio.FIRST_COMPLETED)
+    if task.done():
+        # Gateway stopped before flood ends.
+        waiter.cancel()
+        conn.send(None)
+        task.result()
+        raise RuntimeError('Gateway stopped before receiving every event.')
+    await bot.close()
+    await task
+    conn.send(None)
+    server.join()
+
+    elapsed = finished_at - bot.ready_at
+    stats = latencies.snapshot()
+    print(
+        f'encoding = {encoding}, compress = {compress}, filter = {filter_events}, json backend = {codec.get_backend().name}\n'
+        f'{len(events) * rounds:,} events ({expected:,} listened) in {elapsed:.3f} s : {len(events) * rounds / elapsed:,.0f} events/s\n'
+        f'receive -> listener : p50 {stats["p50"] * 1e6:.1f} us, p99 {stats["p99"] * 1e6:.1f} us, max {stats["max"] * 1e6:.1f} us\n'
+        f'max rss : {max_rss_kib() / 1024:.1f} MiB (+{(max_rss_kib() - rss_before) / 1024:.1f} MiB during run)'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end gateway benchmark against local fake gateway.')
+    parser.add_argument('--rounds', type=int, default=50, help='times to replay recorded events.')
+    parser.add_argument('--encoding', choices=('json', 'etf'), default='json')
+    parser.add_argument('--compress', action='store_true', help='use zlib-stream transport compression.')
+    parser.add_argument('--no-filter', action='store_true', help='decode every event, including unsubscribed ones.')
+    args = parser.parse_args()
+    asyncio.run(bench(args.rounds, args.encoding, args.compress, not args.no_filter))
+
+
+if __name__ == '__main__':
+    main()
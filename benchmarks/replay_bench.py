@@ -0,0 +1,55 @@
+"""
+Replay recorded gateway frames (see `GatewayBot(record=...)`) into EventManager without network.
+usage : python -m benchmarks.replay_bench RECORD_FILE [--pace] [--speed X] [--no-filter] [--listen EVENT ...] [--profile]
+"""
+
+import argparse
+import asyncio
+import cProfile
+import pstats
+
+from volt.replay import GatewayReplay
+
+
+async def replay(path: str, pace: bool, speed: float, filter_events: bool, events, profile: bool):
+    with GatewayReplay(path, filter_events=filter_events) as gateway_replay:
+        listened = 0
+
+        async def listener(_):
+            nonlocal listened
+            listened += 1
+
+        for event in events:
+            gateway_replay.event_manager.listen(event, listener)
+        profiler = cProfile.Profile() if profile else None
+        if profiler is not None:
+            profiler.enable()
+        result = await gateway_replay.run(pace=pace, speed=speed)
+        # Let the last listener tasks finish.
+        await asyncio.sleep(0)
+        if profiler is not None:
+            profiler.disable()
+
+    elapsed = result['elapsed']
+    print(
+        f'{result["frames"]:,} frames, {result["decoded"]:,} decoded, {result["dispatched"]:,} dispatched, '
+        f'{listened:,} listened in {elapsed:.3f} s : {result["frames"] / elapsed:,.0f} frames/s'
+    )
+    if profiler is not None:
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(25)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded gateway frames.')
+    parser.add_argument('path', help='recorded file.')
+    parser.add_argument('--pace', action='store_true', help='reproduce original timing instead of replaying as fast as possible.')
+    parser.add_argument('--speed', type=float, default=1.0, help='pacing multiplier.')
+    parser.add_argument('--no-filter', action='store_true', help='decode every event, including unsubscribed ones.')
+    parser.add_argument('--listen', nargs='*', default=['MESSAGE_CREATE', 'MESSAGE_UPDATE', 'MESSAGE_DELETE'], help='events to listen.')
+    parser.add_argument('--profile', action='store_true', help='profile replay with cProfile.')
+    args = parser.parse_args()
+    asyncio.run(replay(args.path, args.pace, args.speed, not args.no_filter, args.listen, args.profile))
+
+
+if __name__ == '__main__':
+    main()
@@ -11,8 +11,9 @@ with __import__('volt.__init__.py') as module_info:
 
 extra_requires = {
     'voice': [],
-    'speed': ['uvloop'],
-    'all': ['uvloop']
+    'speed': ['uvloop', 'orjson'],
+    'etf': ['erlpack'],
+    'all': ['uvloop', 'orjson']
 }
 
 packages = [
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import tempfile
+import time
+
+from aiohttp import web
+
+import volt.assets
+from volt.assets import AssetFetcher
+
+
+ASSETS = {
+    'small': b's' * 100,
+    'medium': b'm' * 300,
+    'large': b'l' * 1000
+}
+
+
+async def start_server(requested):
+    async def handler(request: web.Request) -> web.StreamResponse:
+        name = request.match_info['name']
+        requested.append(name)
+        if name not in ASSETS:
+            return web.json_response({'message': 'Not Found'}, status=404)
+        # Streamed without content length, so size of asset is known only after download.
+        resp = web.StreamResponse()
+        resp.enable_chunked_encoding()
+        await resp.prepare(request)
+        await resp.write(ASSETS[name])
+        await resp.write_eof()
+        return resp
+
+    app = web.Application()
+    app.router.add_get('/icons/{name}.png', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    volt.assets.CDN_BASE = f'http://127.0.0.1:{runner.addresses[0][1]}'
+    return runner
+
+
+async def test():
+    requested = []
+    runner = await start_server(requested)
+    disk_path = tempfile.mkdtemp()
+    fetcher = AssetFetcher(disk_path=disk_path, memory_limit=0, disk_limit=500)
+
+    print('Asset is streamed into disk store, and served from disk afterwards.')
+    assert await fetcher.fetch('icons/small') == ASSETS['small']
+    assert await fetcher.fetch('icons/small') == ASSETS['small']
+    assert requested == ['small'] and fetcher.disk_hits == 1
+
+    print('Asset larger than disk limit is returned without storing it.')
+    assert await fetcher.fetch('icons/large') == ASSETS['large']
+    assert fetcher.stats()['disk_bytes'] == 100
+    assert not any(name.endswith('.part') for name in os.listdir(disk_path))
+
+    print('Least recently used asset is evicted over disk limit.')
+    assert await fetcher.fetch('icons/medium') == ASSETS['medium']
+    assert await fetcher.fetch('icons/medium') == ASSETS['medium']
+    await fetcher.fetch('icons/small')
+    stats = fetcher.stats()
+    assert stats['disk_bytes'] == 400 and stats['disk_entries'] == 2
+    fetcher.disk_limit = 350
+    requested.clear()
+    assert await fetcher.fetch('icons/large') == ASSETS['large']
+    assert len(os.listdir(disk_path)) == 2
+
+    print('Concurrent fetches share one download.')
+    memory = AssetFetcher()
+    requested.clear()
+    results = await asyncio.gather(*(memory.fetch('icons/medium') for _ in range(5)))
+    assert all(result == ASSETS['medium'] for result in results) and requested == ['medium']
+
+    print('CDN error carries status and error body.')
+    try:
+        await memory.fetch('icons/missing')
+    except volt.assets.DiscordHTTPError as e:
+        assert e.status == 404 and e.data == {'message': 'Not Found'}
+    else:
+        raise AssertionError('Missing asset is fetched.')
+
+    print('Entry evicted by another download while it is read from disk is fetched, before or after its file is removed.')
+    read_and_touch = volt.assets._read_and_touch
+
+    def read_before_eviction(file_path):
+        data = read_and_touch(file_path)
+        time.sleep(0.2)
+        return data
+
+    def read_after_eviction(file_path):
+        time.sleep(0.2)
+        return read_and_touch(file_path)
+
+    for slow_read in (read_before_eviction, read_after_eviction):
+        evicting = AssetFetcher(disk_path=tempfile.mkdtemp(), memory_limit=0, disk_limit=350)
+        await evicting.fetch('icons/small')
+        volt.assets._read_and_touch = slow_read
+        try:
+            results = await asyncio.gather(evicting.fetch('icons/small'), evicting.fetch('icons/medium'))
+        finally:
+            volt.assets._read_and_touch = read_and_touch
+        assert results == [ASSETS['small'], ASSETS['medium']]
+        assert evicting.stats()['disk_bytes'] <= 350
+
+    print('Disk store is loaded again on restart.')
+    restarted = AssetFetcher(disk_path=disk_path, memory_limit=0, disk_limit=500)
+    requested.clear()
+    await restarted.fetch('icons/small')
+    assert not requested and restarted.disk_hits == 1
+
+    await runner.cleanup()
+
+
+asyncio.get_event_loop().run_until_complete(test())
@@ -0,0 +1,78 @@
+import asyncio
+import os
+import tempfile
+from multiprocessing import Pipe
+
+from volt.cluster import ClusterLauncher, ClusterWorker, _WorkerHandle
+from volt.ratelimit_broker import RateLimitBroker
+
+
+class FakeProcess:
+    exitcode = 1
+
+    def join(self, timeout=None):
+        pass
+
+
+class FakeConn:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(message)
+
+    def close(self):
+        pass
+
+
+launcher = ClusterLauncher('fake-token', shard_count=2)
+handle = launcher.workers[0] = _WorkerHandle(0, [0, 1])
+handle.process, handle.conn = FakeProcess(), FakeConn()
+
+print('Identify grant queued for a dead worker must not reach its restarted process.')
+launcher.identify_schedule.remaining = 0    # Grant is scheduled in the future.
+launcher.identify_schedule.reset_at = 1e12
+launcher._schedule_identify(handle, 0, 0)
+assert launcher._ClusterLauncher__grants
+launcher._handle_death(handle)
+assert not launcher._ClusterLauncher__grants
+handle.restart_at = None    # Restarted. Its nonces start from 0 again.
+handle.conn = FakeConn()
+launcher._flush_grants()
+assert not handle.conn.sent
+
+print('Broker start failure is raised to launcher, instead of blocking forever.')
+launcher = ClusterLauncher('fake-token', shard_count=1, ratelimit_socket=os.path.join(tempfile.mkdtemp(), 'missing', 'broker.sock'))
+try:
+    launcher._start_broker()
+except OSError as e:
+    print(f'Broker failed : {e!r}')
+else:
+    raise AssertionError('Broker start failure is not raised.')
+
+
+async def test_worker_shutdown():
+    print('Worker closes its REST client on shutdown, releasing its tickets on the broker.')
+    path = os.path.join(tempfile.mkdtemp(), 'broker.sock')
+    broker = RateLimitBroker(path)
+    await broker.start()
+    conn, _ = Pipe()
+    worker = ClusterWorker(0, conn, 'fake-token', [0], 1, ratelimit_socket=path)
+
+    async def failing_prepare():
+        raise ConnectionError('Gateway is unreachable.')
+
+    worker.manager.prepare = failing_prepare
+    await worker.rest.ratelimiter.acquire('GET /gateway/bot', '')
+    assert broker.tickets
+    try:
+        await worker.start()
+    except ConnectionError:
+        pass
+    await asyncio.sleep(0.05)
+    assert not broker.tickets
+    await worker.manager.close()
+    await broker.close()
+
+
+asyncio.get_event_loop().run_until_complete(test_worker_shutdown())
@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+from volt.concurrency import AdaptiveLimit, BreakerState, CircuitBreaker, ConcurrencyController
+from volt.errors import CircuitOpenError, RequestQueueFullError
+
+
+async def test():
+    print('Limit shrinks by half on failure, and grows back additively on success.')
+    limit = AdaptiveLimit(initial=16)
+    limit.on_success(10.0)
+    limit.on_failure()
+    assert int(limit.limit) == 8
+    limit.on_failure()     # Failures within recent latency are one congestion signal, so limit is decreased once.
+    assert int(limit.limit) == 8
+    before = limit.limit
+    limit.on_success(0.01)
+    assert before < limit.limit < before + 1
+
+    print('Requests over the limit wait, and the bounded wait queue rejects the rest.')
+    limit = AdaptiveLimit(initial=1, max_waiting=1)
+    await limit.acquire()
+    waiter = asyncio.ensure_future(limit.acquire())
+    await asyncio.sleep(0)
+    assert limit.waiting == 1 and not waiter.done()
+    try:
+        await limit.acquire()
+    except RequestQueueFullError:
+        pass
+    else:
+        raise AssertionError('Request over wait queue is accepted.')
+    limit.release()
+    await waiter
+    assert limit.inflight == 1 and limit.waiting == 0
+
+    print('Rising latency shrinks the limit.')
+    limit = AdaptiveLimit(initial=16)
+    for _ in range(10):
+        limit.on_success(0.01)
+    grown = limit.limit
+    for _ in range(10):
+        limit.on_success(1.0)
+    assert limit.limit < grown
+
+    print('Breaker opens after consecutive failures, and fails requests fast.')
+    breaker = CircuitBreaker(threshold=3, open_seconds=0.05)
+    for _ in range(3):
+        assert not breaker.check('route')
+        breaker.on_failure()
+    assert breaker.state is BreakerState.OPEN
+    try:
+        breaker.check('route')
+    except CircuitOpenError:
+        pass
+    else:
+        raise AssertionError('Open breaker passes request.')
+
+    print('Half open breaker lets one probe through. Failed probe doubles open period, successful probe closes it.')
+    time.sleep(0.06)
+    assert breaker.check('route')
+    try:
+        breaker.check('route')
+    except CircuitOpenError:
+        pass
+    else:
+        raise AssertionError('Second probe passes.')
+    breaker.on_failure()
+    assert breaker.state is BreakerState.OPEN and breaker.open_seconds == 0.1
+    time.sleep(0.11)
+    assert breaker.check('route')
+    breaker.on_success()
+    assert breaker.state is BreakerState.CLOSED and breaker.open_seconds == 0.05
+
+    print('Controller keeps limits & breakers per route, and 429 does not count as failure.')
+    controller = ConcurrencyController(failure_threshold=2, open_seconds=60)
+    for _ in range(2):
+        await controller.acquire('GET /a')
+        controller.release('GET /a', False)
+    await controller.acquire('GET /b')
+    controller.release('GET /b', None)
+    await controller.acquire('GET /b')
+    controller.release('GET /b', True, 0.01)
+    stats = controller.stats()
+    assert stats['GET /a']['breaker'] == 'open' and stats['GET /b']['breaker'] == 'closed'
+    assert stats['GET /a']['inflight'] == stats['GET /b']['inflight'] == 0
+    try:
+        await controller.acquire('GET /a')
+    except CircuitOpenError:
+        pass
+    else:
+        raise AssertionError('Failing route accepts request.')
+
+
+asyncio.get_event_loop().run_until_complete(test())
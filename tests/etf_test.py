@@ -0,0 +1,64 @@
+import json
+
+from volt import etf
+from volt.gateway import EtfEncoding
+
+payload = {
+    'op': 0,
+    's': 42,
+    't': 'MESSAGE_CREATE',
+    'd': {
+        'id': '880000000000000001',
+        'channel_id': '880000000000000002',
+        'custom_id': '1234',
+        'content': 'Hello, volt! 안녕하세요',
+        'tts': False,
+        'pinned': True,
+        'edited_timestamp': None,
+        'embeds': [],
+        'mentions': [{'id': '880000000000000003', 'username': 'Lapis'}],
+        'nonce': 2 ** 70,
+        'flags': -5,
+        'score': 0.5
+    }
+}
+
+
+
+def _parts(obj):
+    parts = []
+    etf._encode_term(obj, parts.append)
+    return parts
+
+
+encoded = etf.encode(payload)
+decoded = etf.decode(encoded)
+print(f'erlpack encoder : {etf.ACCELERATED}')
+print(decoded)
+
+# Values are the same as json encoding gives, so listeners do not depend on gateway encoding.
+assert decoded == json.loads(json.dumps(payload))
+assert decoded['d']['id'] == '880000000000000001'
+assert decoded['d']['custom_id'] == '1234'
+assert decoded['d']['content'] == payload['d']['content']
+assert decoded['d']['edited_timestamp'] is None
+assert decoded['d']['pinned'] is True and decoded['d']['tts'] is False
+assert decoded['d']['nonce'] == 2 ** 70
+assert decoded['d']['flags'] == -5
+assert decoded['d']['score'] == 0.5
+# erlpack encoder (if installed) and pure-python encoder give terms decoded into the same values.
+assert etf.decode(bytes([etf.FORMAT_VERSION]) + b''.join(_parts(payload))) == decoded
+
+# Snowflake conversion is opt-in.
+snowflakes = etf.decode(encoded, snowflakes=True)
+assert snowflakes['d']['id'] == 880000000000000001
+assert snowflakes['d']['channel_id'] == 880000000000000002
+assert snowflakes['d']['mentions'][0]['id'] == 880000000000000003
+assert snowflakes['d']['custom_id'] == '1234'
+# Gateway etf encoding passes the option through.
+assert EtfEncoding(snowflakes=True).loads(encoded)['d']['id'] == 880000000000000001
+assert EtfEncoding().loads(encoded)['d']['id'] == '880000000000000001'
+
+# Atom keys are decoded into interned strings.
+atom_map = bytes([131, 116, 0, 0, 0, 1, 119, 2]) + b'op' + bytes([97, 10])
+assert etf.decode(atom_map) == {'op': 10}
@@ -0,0 +1,136 @@
+import asyncio
+
+from volt.events import EventManager, current_shard_id, ordering_key
+
+
+class FakeResponse:
+    def __init__(self, t, data):
+        self.t = t
+        self.data = data
+
+
+class DataEventManager(EventManager):
+    """
+    Passes raw event data to listeners, so tests can tell events apart.
+    """
+
+    @staticmethod
+    def process_events(resp):
+        return resp.t, resp.data
+
+
+async def test():
+    print('Routing table follows registered listeners and hooks.')
+    manager = DataEventManager(gateway=None)
+    order = []
+
+    async def listener(data):
+        order.append(('listener', data['n'], current_shard_id()))
+
+    assert not manager.is_subscribed('MESSAGE_CREATE')
+    manager.listen('MESSAGE_CREATE', listener)
+    manager.add_hook('MESSAGE_CREATE', lambda event_name, data: order.append(('hook', data['n'], None)))
+    assert manager.is_subscribed('MESSAGE_CREATE') and not manager.is_subscribed('MESSAGE_DELETE')
+
+    print('Hooks run synchronously before listener tasks, which see shard id of the event.')
+    manager.dispatch(FakeResponse('MESSAGE_CREATE', {'n': 1}), shard_id=3)
+    assert order == [('hook', 1, None)]
+    await asyncio.sleep(0)
+    assert order == [('hook', 1, None), ('listener', 1, 3)]
+    assert current_shard_id() is None
+
+    print('Removed listener is not called, and unsubscribed events are not routed.')
+    manager.remove_listener('MESSAGE_CREATE', listener)
+    order.clear()
+    manager.dispatch(FakeResponse('MESSAGE_CREATE', {'n': 2}))
+    manager.dispatch(FakeResponse('MESSAGE_DELETE', {'n': 3}))
+    await asyncio.sleep(0)
+    assert order == [('hook', 2, None)]
+
+    print('Invalid listeners are rejected.')
+    for event_name, invalid in (('NOT_AN_EVENT', listener), ('MESSAGE_CREATE', lambda data: None)):
+        try:
+            manager.listen(event_name, invalid)
+        except (ValueError, TypeError):
+            pass
+        else:
+            raise AssertionError(f'Invalid listener of {event_name} is registered.')
+
+    print('Json (str) and etf (int) ids give the same ordering key.')
+    assert ordering_key('MESSAGE_CREATE', {'guild_id': '41771983423143937'}) == ordering_key('MESSAGE_CREATE', {'guild_id': 41771983423143937})
+    assert ordering_key('GUILD_UPDATE', {'id': '1'}) == 1
+    assert ordering_key('MESSAGE_CREATE', {'channel_id': '2'}) == 2
+    assert ordering_key('MESSAGE_CREATE', {}) is None
+
+    print('Events of the same guild are handled in dispatched order, by one worker.')
+    manager = DataEventManager(gateway=None, workers=4)
+    handled = []
+
+    async def ordered(data):
+        handled.append(data['n'])
+        await asyncio.sleep(0)
+
+    manager.listen('MESSAGE_CREATE', ordered)
+    for n in range(20):
+        # Same guild, alternating json & etf id types.
+        manager.dispatch(FakeResponse('MESSAGE_CREATE', {'guild_id': '7' if n % 2 else 7, 'n': n}))
+    for _ in range(50):
+        await asyncio.sleep(0)
+    assert handled == list(range(20)), handled
+    assert sum(stats['processed'] for stats in manager.worker_stats()) == 20
+    assert sorted(stats['processed'] for stats in manager.worker_stats())[:3] == [0, 0, 0]
+    await manager.close()
+
+    print('Worker queue is bounded. Dispatch into full queue returns an awaitable, and no event is dropped.')
+    manager = DataEventManager(gateway=None, workers=1, queue_size=4)
+    release = asyncio.Event()
+    handled.clear()
+
+    async def blocking(data):
+        await release.wait()
+        handled.append(data['n'])
+
+    manager.listen('MESSAGE_CREATE', blocking)
+    assert manager.dispatch(FakeResponse('MESSAGE_CREATE', {'guild_id': 1, 'n': 0})) is None
+    await asyncio.sleep(0)     # Worker takes the first event, and waits in listener.
+    for n in range(1, 5):
+        assert manager.dispatch(FakeResponse('MESSAGE_CREATE', {'guild_id': 1, 'n': n})) is None
+    assert manager.congested and manager.worker_stats()[0]['depth'] == 4
+    waiting = asyncio.ensure_future(manager.dispatch(FakeResponse('MESSAGE_CREATE', {'guild_id': 1, 'n': 5})))
+    await asyncio.sleep(0)
+    assert not waiting.done()
+    release.set()
+    await asyncio.wait_for(waiting, 1)
+    for _ in range(20):
+        await asyncio.sleep(0)
+    assert handled == [0, 1, 2, 3, 4, 5], handled
+    await manager.close()
+
+    print('Shards sharing full worker queues wait for room, instead of dropping events.')
+    manager = DataEventManager(gateway=None, workers=2, queue_size=8)
+    handled.clear()
+
+    async def slow(data):
+        await asyncio.sleep(0.001)
+        handled.append((data['shard'], data['n']))
+
+    async def shard(shard_id):
+        for n in range(50):
+            waiting = manager.dispatch(FakeResponse('MESSAGE_CREATE', {'guild_id': shard_id, 'shard': shard_id, 'n': n}), shard_id)
+            if waiting is not None:
+                await waiting
+            assert all(stats['depth'] <= 8 for stats in manager.worker_stats())
+
+    manager.listen('MESSAGE_CREATE', slow)
+    await asyncio.wait_for(asyncio.gather(*(shard(shard_id) for shard_id in range(4))), 5)
+    for _ in range(100):
+        if len(handled) == 200:
+            break
+        await asyncio.sleep(0.01)
+    assert len(handled) == 200
+    for shard_id in range(4):
+        assert [n for s, n in handled if s == shard_id] == list(range(50))
+    await manager.close()
+
+
+asyncio.get_event_loop().run_until_complete(test())
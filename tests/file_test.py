@@ -0,0 +1,91 @@
+import asyncio
+import io
+import os
+import tempfile
+
+from aiohttp import web
+
+from volt import codec
+from volt.file import File
+from volt.http import ApiRoute, HTTPClient
+
+
+async def start_server(state):
+    async def create_message(request: web.Request) -> web.Response:
+        state['posts'] += 1
+        if state['posts'] == 1:
+            await request.read()
+            return web.json_response({'message': 'Internal Server Error'}, status=500)
+        parts = {}
+        async for part in await request.multipart():
+            parts[part.name] = (part.filename, await part.read())
+        state['parts'] = parts
+        return web.json_response({'id': '1'})
+
+    app = web.Application()
+    app.router.add_post('/api/v9/channels/{channel_id}/messages', create_message)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    ApiRoute.base = f'http://127.0.0.1:{runner.addresses[0][1]}/api'
+    return runner
+
+
+async def test():
+    state = {'posts': 0, 'parts': None}
+    runner = await start_server(state)
+    client = HTTPClient()
+
+    print('Multipart upload streams every file source, and streams them again on retry.')
+    path = os.path.join(tempfile.mkdtemp(), 'path.txt')
+    with open(path, 'wb') as fp:
+        fp.write(b'from path' * 10000)
+
+    async def chunks():
+        for chunk in (b'from ', b'iterable'):
+            yield chunk
+
+    files = [
+        File(path),
+        File(io.BytesIO(b'from file object'), 'object.txt', description='alt text'),
+        File(chunks, 'iterable.txt', spoiler=True)
+    ]
+    await client.create_message(1, {'content': 'files'}, files)
+    assert state['posts'] == 2
+    parts = state['parts']
+    assert parts['files[0]'] == ('path.txt', b'from path' * 10000)
+    assert parts['files[1]'] == ('object.txt', b'from file object')
+    assert parts['files[2]'] == ('SPOILER_iterable.txt', b'from iterable')
+    payload = codec.loads(parts['payload_json'][1])
+    assert payload['content'] == 'files'
+    assert payload['attachments'] == [
+        {'id': 0, 'filename': 'path.txt'},
+        {'id': 1, 'filename': 'object.txt', 'description': 'alt text'},
+        {'id': 2, 'filename': 'SPOILER_iterable.txt'}
+    ]
+
+    print('Async iterable without factory cannot be streamed twice.')
+    once = File(chunks(), 'once.txt')
+    assert not once.rewindable
+    once.stream()
+    try:
+        once.stream()
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('Consumed iterable is streamed again.')
+
+    print('File source without name needs filename.')
+    try:
+        File(chunks)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('File without filename is accepted.')
+
+    await client.close()
+    await runner.cleanup()
+
+
+asyncio.get_event_loop().run_until_complete(test())
@@ -1,20 +1,49 @@
 import asyncio
 
 from volt.gateway import GatewayBot, GatewayOpcodes
+from benchmarks.fake_gateway import FakeGateway
 
 
 async def test():
-    print('Initialize GatewayBot instance.')
-    bot = GatewayBot('Njk2Nzc4MjI3NjAzMjEwMjkw.XotrSg.zpo_4Bx6Co3Za0aeD10TlxfGNqs')
+    async with FakeGateway(heartbeat_interval=0.5) as fake:
+        print('Initialize GatewayBot instance.')
+        bot = GatewayBot('fake-token', gateway_url=fake.url)
+        received = []
+
+        async def on_message(data):
+            received.append(data)
+
+        bot.event_manager.listen('MESSAGE_CREATE', on_message)
+        task = asyncio.create_task(bot.run())
+        await fake.wait_ready(timeout=5)
+        assert bot.session_id is not None
+
+        await fake.flood([('MESSAGE_CREATE', {'id': str(i)}) for i in range(3)])
+        print('Drop connection, and check the bot resumes the session.')
+        await fake.disconnect(4000)
+        await fake.wait_ready(timeout=10)
+        await fake.flood([('MESSAGE_CREATE', {'id': '3'})])
+        await asyncio.sleep(1)
 
-    async def close_bot():
-        await asyncio.sleep(20)
         print('Close the bot!')
         await bot.close()
-
-    asyncio.create_task(close_bot())
-    await bot.run()
+        await task
+        assert fake.received[GatewayOpcodes.IDENTIFY.name] == 1
+        assert fake.received[GatewayOpcodes.RESUME.name] == 1
+        assert fake.received[GatewayOpcodes.HEARTBEAT.name] >= 1
+        assert len(received) == 4
+        assert bot.latency is not None
+
+    async with FakeGateway(heartbeat_interval=0.5) as fake:
+        print('Keepalive thread is released on disconnect.')
+        bot = GatewayBot('fake-token', gateway_url=fake.url, keepalive_thread=True)
+        task = asyncio.create_task(bot.run())
+        await fake.wait_ready(timeout=5)
+        await asyncio.sleep(0.6)
+        assert bot.loop_lag is not None
+        await bot.close()
+        await task
+        assert bot.loop_lag is None
 
 
 asyncio.get_event_loop().run_until_complete(test())
-
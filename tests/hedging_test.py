@@ -0,0 +1,65 @@
+import asyncio
+from collections import Counter
+
+from aiohttp import web
+
+from volt.errors import DiscordHTTPError
+from volt.http import ApiRoute, HTTPClient
+from volt.utils.stats import RollingStats
+
+
+async def start_server(requested):
+    async def get_channel(request: web.Request) -> web.Response:
+        channel_id = request.match_info['channel_id']
+        requested[channel_id] += 1
+        if channel_id == '404':
+            return web.json_response({'code': 10003, 'message': 'Unknown Channel'}, status=404)
+        if requested[channel_id] == 2:
+            await asyncio.sleep(1)     # Second request is stuck. Its duplicate is answered at once.
+        else:
+            await asyncio.sleep(0.05)
+        return web.json_response({'id': channel_id, 'n': requested[channel_id]})
+
+    app = web.Application()
+    app.router.add_get('/api/v9/channels/{channel_id}', get_channel)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    ApiRoute.base = f'http://127.0.0.1:{runner.addresses[0][1]}/api'
+    return runner
+
+
+async def test():
+    requested = Counter()
+    runner = await start_server(requested)
+    client = HTTPClient(hedging=True)
+
+    print('Route without enough latency samples is not hedged.')
+    assert client.hedge_delay('GET /channels/{channel_id}') is None
+    # Bucket of channel allows one request at once, until its limit is learned from first response.
+    assert (await client.get_channel(1))['n'] == 1
+    assert client.hedged == 0
+
+    print('Slow request is hedged after latency percentile of route, and the duplicate wins.')
+    latencies = client.latencies['GET /channels/{channel_id}'] = RollingStats(128)
+    for _ in range(20):
+        latencies.add(0.05)
+    assert client.hedge_delay('GET /channels/{channel_id}') == 0.05
+    result = await asyncio.wait_for(client.get_channel(1), 0.8)
+    assert result['n'] == 3 and client.hedged == 1 and client.hedge_wins == 1
+    assert client.hedge_stats()['wins'] == 1
+
+    print('Failed request raises DiscordHTTPError with status and error body.')
+    try:
+        await client.get_channel(404)
+    except DiscordHTTPError as e:
+        assert e.status == 404 and e.data['code'] == 10003
+    else:
+        raise AssertionError('Failed request returned.')
+
+    await client.close()
+    await runner.cleanup()
+
+
+asyncio.get_event_loop().run_until_complete(test())
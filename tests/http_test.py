@@ -0,0 +1,131 @@
+import asyncio
+import time
+from collections import Counter
+
+from aiohttp import web
+
+from volt.errors import DiscordHTTPError
+from volt.http import ApiRoute, HTTPClient, HTTPSession
+
+
+BUCKET_LIMIT = 2
+BUCKET_RESET = 0.3
+GLOBAL_RETRY_AFTER = 0.3
+
+
+async def start_server(state):
+    """
+    Discord-like server : messages of each channel are limited to BUCKET_LIMIT per BUCKET_RESET seconds.
+    """
+    windows = {}
+
+    async def create_message(request: web.Request) -> web.Response:
+        channel_id = request.match_info['channel_id']
+        now = time.monotonic()
+        window_end, count = windows.get(channel_id, (0.0, 0))
+        if window_end <= now:
+            window_end, count = now + BUCKET_RESET, 0
+        count += 1
+        windows[channel_id] = (window_end, count)
+        state['sent'].append((channel_id, now))
+        headers = {
+            'X-RateLimit-Bucket': 'messages',
+            'X-RateLimit-Limit': str(BUCKET_LIMIT),
+            'X-RateLimit-Remaining': str(max(0, BUCKET_LIMIT - count)),
+            'X-RateLimit-Reset-After': f'{window_end - now:.3f}'
+        }
+        if count > BUCKET_LIMIT:
+            state['429'][channel_id] += 1
+            return web.json_response({'retry_after': window_end - now, 'global': False}, status=429, headers=headers)
+        await asyncio.sleep(0.01)
+        return web.json_response({'channel_id': channel_id, 'content': (await request.json())['content']}, headers=headers)
+
+    async def get_user(request: web.Request) -> web.Response:
+        user_id = request.match_info['user_id']
+        state['sent'].append((user_id, time.monotonic()))
+        if user_id == 'global' and not state['global_limited']:
+            state['global_limited'] = True
+            return web.json_response(
+                {'retry_after': GLOBAL_RETRY_AFTER, 'global': True}, status=429, headers={'X-RateLimit-Global': 'true'}
+            )
+        if user_id == '404':
+            return web.json_response({'code': 10013, 'message': 'Unknown User'}, status=404)
+        return web.json_response({'id': user_id})
+
+    app = web.Application()
+    app.router.add_post('/api/v9/channels/{channel_id}/messages', create_message)
+    app.router.add_get('/api/v9/users/{user_id}', get_user)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    ApiRoute.base = f'http://127.0.0.1:{runner.addresses[0][1]}/api'
+    return runner
+
+
+async def test():
+    state = {'sent': [], '429': Counter(), 'global_limited': False}
+    runner = await start_server(state)
+    client = HTTPClient()
+
+    print('Major parameters split buckets of the same route.')
+    route = client.route('POST', '/channels/{channel_id}/messages', channel_id=1)
+    assert route.major_parameters != client.route('POST', '/channels/{channel_id}/messages', channel_id=2).major_parameters
+    assert route.route_key == 'POST /channels/{channel_id}/messages'
+
+    print('Requests over bucket limit wait for the next window instead of failing, without any 429.')
+    started = time.monotonic()
+    results = await asyncio.gather(*(client.create_message(1, {'content': str(n)}) for n in range(5)))
+    assert [result['content'] for result in results] == ['0', '1', '2', '3', '4']
+    assert not state['429'], state['429']
+    # 5 requests with 2 per window take 3 windows.
+    assert time.monotonic() - started >= BUCKET_RESET * 2 - 0.05
+
+    print('Independent buckets run in parallel, while another bucket is waiting.')
+    state['sent'].clear()
+    slow = asyncio.ensure_future(asyncio.gather(*(client.create_message(2, {'content': str(n)}) for n in range(4))))
+    await asyncio.sleep(0.05)
+    started = time.monotonic()
+    await client.create_message(3, {'content': 'other'})
+    assert time.monotonic() - started < BUCKET_RESET / 2
+    assert not slow.done()
+    await slow
+    assert not state['429'], state['429']
+
+    print('Bucket hash from response headers is learned for the route.')
+    assert client.ratelimiter.bucket_hashes['POST /channels/{channel_id}/messages'] == 'messages'
+
+    print('Global 429 blocks every route until retry_after, then request is retried.')
+    started = time.monotonic()
+    limited = asyncio.ensure_future(client.get_user('global'))
+    while not state['global_limited']:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.02)
+    assert await client.get_user(5) == {'id': '5'}
+    assert time.monotonic() - started >= GLOBAL_RETRY_AFTER - 0.05
+    assert await limited == {'id': 'global'}
+
+    print('Failed request raises DiscordHTTPError.')
+    try:
+        await client.get_user(404)
+    except DiscordHTTPError as e:
+        assert e.status == 404
+    else:
+        raise AssertionError('Failed request returned.')
+
+    await client.close()
+
+    print('Closing a client keeps http session given to it open, for its other users.')
+    session = HTTPSession()
+    borrowing = HTTPClient(http=session)
+    assert await borrowing.get_user(6) == {'id': '6'}
+    connection_pool = session.session
+    await borrowing.close()
+    assert not connection_pool.closed and session.session is connection_pool
+    assert await HTTPClient(http=session).get_user(7) == {'id': '7'}
+    await session.close()
+
+    await runner.cleanup()
+
+
+asyncio.get_event_loop().run_until_complete(test())
@@ -0,0 +1,37 @@
+import time
+
+from volt.identify import IDENTIFY_INTERVAL, IdentifySchedule
+
+
+def delays(schedule: IdentifySchedule, shard_ids):
+    now = time.monotonic()
+    return {shard_id: round(schedule.reserve_slot(shard_id) - now) for shard_id in shard_ids}
+
+
+print('Shards in different max_concurrency buckets identify in parallel, same bucket is spaced by identify interval.')
+schedule = IdentifySchedule(max_concurrency=4)
+result = delays(schedule, range(8))
+print(result)
+assert all(result[shard_id] == 0 for shard_id in range(4))
+assert all(result[shard_id] == IDENTIFY_INTERVAL for shard_id in range(4, 8))
+
+print('Reserved identifies are never used, by any bucket.')
+schedule = IdentifySchedule(max_concurrency=4, remaining=7, total=1000, reset_after=3600, reserve=5)
+result = delays(schedule, range(8))
+print(result)
+assert result[0] == 0 and result[1] == 0
+assert all(result[shard_id] >= 3599 for shard_id in range(2, 8))
+assert schedule.remaining == 5
+assert schedule.blocked_until is not None
+
+print('Budget is refilled only after reset, and identifies deferred into the new window are counted.')
+schedule = IdentifySchedule(max_concurrency=1, remaining=6, total=8, reset_after=0.05, reserve=5)
+result = delays(schedule, range(6))
+print(result)
+assert result[0] == 0 and all(result[shard_id] < 60 for shard_id in (1, 2, 3))
+assert all(result[shard_id] >= 86400 for shard_id in (4, 5))
+# 3 usable identifies per window. Shards 1~3 wait for the next window, shards 4~5 for the one after.
+assert schedule.remaining == 5
+time.sleep(0.06)
+schedule.reserve_slot(6)
+assert schedule.remaining == 5 and schedule.blocked_until is not None
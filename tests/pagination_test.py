@@ -0,0 +1,85 @@
+import asyncio
+
+from volt.rest_pagination import paginate, paginate_split
+
+
+ENTITIES = [{'id': str(snowflake)} for snowflake in range(1, 1001)]
+
+
+def key(entity):
+    return int(entity['id'])
+
+
+class Endpoint:
+    """
+    Cursor-paginated endpoint over ENTITIES, recording requested pages.
+    """
+
+    def __init__(self, ascending: bool):
+        self.ascending = ascending
+        self.requests = []
+
+    async def fetch(self, cursor, size):
+        self.requests.append((cursor, size))
+        await asyncio.sleep(0.01)
+        if self.ascending:
+            page = [entity for entity in ENTITIES if cursor is None or key(entity) > cursor][:size]
+        else:
+            page = [entity for entity in reversed(ENTITIES) if cursor is None or key(entity) < cursor][:size]
+        return page
+
+
+async def test():
+    print('Descending walk yields every entity in order, page by page.')
+    endpoint = Endpoint(ascending=False)
+    ids = [key(entity) async for entity in paginate(endpoint.fetch, key, 100)]
+    assert ids == list(range(1000, 0, -1))
+    # Last page is full, so one more (empty) page is requested to find the end.
+    assert len(endpoint.requests) == 11
+
+    print('Next page is fetched while current page is consumed.')
+    endpoint = Endpoint(ascending=False)
+    iterator = paginate(endpoint.fetch, key, 100)
+    await iterator.__anext__()
+    await asyncio.sleep(0.02)
+    assert len(endpoint.requests) == 2
+    await iterator.aclose()
+
+    print('Limit caps yielded entities and requested pages.')
+    endpoint = Endpoint(ascending=False)
+    ids = [key(entity) async for entity in paginate(endpoint.fetch, key, 100, limit=150)]
+    assert ids == list(range(1000, 850, -1)) and len(endpoint.requests) == 2
+    endpoint = Endpoint(ascending=False)
+    ids = [key(entity) async for entity in paginate(endpoint.fetch, key, 100, limit=30)]
+    assert len(ids) == 30 and endpoint.requests == [(None, 30)]
+
+    print('Ascending walk stops at end snowflake.')
+    endpoint = Endpoint(ascending=True)
+    ids = [key(entity) async for entity in paginate(endpoint.fetch, key, 100, cursor=10, end=260, ascending=True)]
+    assert ids == list(range(11, 260))
+    assert len(endpoint.requests) == 3
+
+    print('Split walk covers the range once, with sub-ranges walked concurrently.')
+    endpoint = Endpoint(ascending=True)
+    ids = [key(entity) async for entity in paginate_split(endpoint.fetch, key, 100, after=0, before=801, splits=4)]
+    assert sorted(ids) == list(range(1, 801))
+    assert len(ids) == len(set(ids))
+    assert {cursor for cursor, _ in endpoint.requests} >= {0, 199, 399, 599}
+
+    print('Error of a sub-range walk is raised to consumer.')
+
+    async def failing(cursor, size):
+        if cursor is not None and cursor > 300:
+            raise RuntimeError('failed page')
+        return await endpoint.fetch(cursor, size)
+
+    try:
+        async for _ in paginate_split(failing, key, 100, after=0, before=801, splits=4):
+            pass
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError('Failed sub-range is ignored.')
+
+
+asyncio.get_event_loop().run_until_complete(test())
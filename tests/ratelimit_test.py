@@ -0,0 +1,118 @@
+import asyncio
+import os
+import socket
+import tempfile
+import time
+
+from aiohttp import web
+
+from volt.http import ApiRoute, HTTPClient
+from volt.ratelimit import RateLimiter
+from volt.ratelimit_broker import BrokerRateLimiter, RateLimitBroker
+
+
+RETRY_AFTER = 0.5
+
+
+async def start_server(sent):
+    """
+    Discord-like server : first request of each channel is rate limited, following ones succeed.
+    """
+    limited = set()
+
+    async def handler(request: web.Request) -> web.Response:
+        channel_id = request.match_info['channel_id']
+        sent.append((channel_id, time.monotonic()))
+        headers = {
+            'X-RateLimit-Bucket': 'messages',
+            'X-RateLimit-Limit': '5',
+            'X-RateLimit-Remaining': '4',
+            'X-RateLimit-Reset-After': '5.0'
+        }
+        if channel_id not in limited:
+            limited.add(channel_id)
+            headers['X-RateLimit-Remaining'] = '0'
+            return web.json_response({'retry_after': RETRY_AFTER, 'global': False}, status=429, headers=headers)
+        return web.json_response({'id': channel_id}, headers=headers)
+
+    app = web.Application()
+    app.router.add_get('/api/v9/channels/{channel_id}', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    ApiRoute.base = f'http://127.0.0.1:{port}/api'
+    return runner
+
+
+async def check_locked(client: HTTPClient, sent):
+    sent.clear()
+    # Different query parameters, so requests are not coalesced into one.
+    route = client.route('GET', '/channels/{channel_id}', channel_id=1)
+    first, second = await asyncio.gather(client.request(route, params={'n': 1}), client.request(route, params={'n': 2}))
+    assert first == second == {'id': '1'}
+    assert len(sent) == 3
+    # Nothing is sent on the bucket until retry_after passes, including the other waiting request.
+    assert sent[1][1] - sent[0][1] >= RETRY_AFTER - 0.05, sent
+    assert sent[2][1] - sent[0][1] >= RETRY_AFTER - 0.05, sent
+
+
+async def test():
+    sent = []
+    runner = await start_server(sent)
+
+    print('Bucket 429 blocks the bucket before the next request on it is sent. (in-memory rate limiter)')
+    client = HTTPClient(ratelimiter=RateLimiter())
+    await check_locked(client, sent)
+    await client.close()
+
+    print('Bucket 429 blocks the bucket before the next request on it is sent. (rate limit broker)')
+    path = os.path.join(tempfile.mkdtemp(), 'ratelimit.sock')
+    broker = RateLimitBroker(path)
+    await broker.start()
+    ratelimiter = BrokerRateLimiter(path)
+    client = HTTPClient(ratelimiter=ratelimiter)
+    sent.clear()
+    first = await client.get_channel(2)
+    assert first == {'id': '2'} and len(sent) == 2
+    assert sent[1][1] - sent[0][1] >= RETRY_AFTER - 0.05, sent
+    stats = await ratelimiter.stats()
+    assert stats['buckets'] >= 1, stats
+
+    print('Closing the client closes its broker connection, releasing tickets on the broker.')
+    await client.close()
+    await asyncio.sleep(0.05)
+    assert not broker.tickets
+
+    print('Global lock without broker connection is kept locally, and the next request reconnects after it.')
+    ratelimiter.lock_global(0.2)
+    started = time.monotonic()
+    ticket = await ratelimiter.acquire('GET /channels/{channel_id}', '3')
+    assert time.monotonic() - started >= 0.15
+    await ratelimiter.release(ticket, 'GET /channels/{channel_id}', '3')
+    await ratelimiter.close()
+
+    print('Running broker is not taken over, but socket of a crashed broker is replaced.')
+    try:
+        await RateLimitBroker(path).start()
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError('Running broker is taken over.')
+    probe = BrokerRateLimiter(path)
+    assert 'buckets' in await probe.stats()
+    await probe.close()
+    stale_path = os.path.join(tempfile.mkdtemp(), 'stale.sock')
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(stale_path)
+    stale.close()
+    stale_broker = RateLimitBroker(stale_path)
+    await stale_broker.start()
+    await stale_broker.close()
+
+    await broker.close()
+    await runner.cleanup()
+
+
+asyncio.get_event_loop().run_until_complete(test())
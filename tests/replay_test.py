@@ -0,0 +1,56 @@
+import asyncio
+import os
+import tempfile
+
+from volt.recorder import FrameRecorder
+from volt.replay import GatewayReplay
+
+
+async def test():
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'gateway.rec')
+    recorder = FrameRecorder(path)
+    recorder.connection('json', None)
+    for i in range(10):
+        recorder.frame(f'{{"t":"MESSAGE_CREATE","s":{i + 1},"op":0,"d":{{"id":"{i}"}}}}')
+    recorder.close()
+
+    print('Replay dispatches recorded frames.')
+    received = []
+
+    async def on_message(data):
+        received.append(data)
+
+    with GatewayReplay(path) as replay:
+        replay.event_manager.listen('MESSAGE_CREATE', on_message)
+        result = await replay.run()
+        await asyncio.sleep(0)
+    assert result['frames'] == 10 and result['dispatched'] == 10
+    assert len(received) == 10
+
+    print('Replay stopped part-way by exception can be closed.')
+
+    replay = GatewayReplay(path)
+    replay.event_manager.listen('MESSAGE_CREATE', on_message)
+    replay.event_manager.dispatch = lambda resp, shard_id=None: 1 / 0
+    try:
+        await replay.run()
+    except ZeroDivisionError:
+        pass
+    replay.close()
+
+    print('Records iterator left part-way is released on close.')
+    replay = GatewayReplay(path)
+    records = replay.records()
+    next(records)
+    replay.close()
+
+    print('Empty recording has no records.')
+    empty = os.path.join(directory, 'empty.rec')
+    open(empty, 'wb').close()
+    with GatewayReplay(empty) as replay:
+        result = await replay.run()
+    assert result['frames'] == 0
+
+
+asyncio.get_event_loop().run_until_complete(test())
@@ -0,0 +1,120 @@
+import asyncio
+import time
+from collections import Counter
+
+from aiohttp import web
+
+from volt.events import EventManager
+from volt.http import ApiRoute, HTTPClient
+from volt.rest_cache import ResponseCache
+
+
+class FakeResponse:
+    def __init__(self, t, data):
+        self.t = t
+        self.data = data
+
+
+async def start_server(requested):
+    async def get_channel(request: web.Request) -> web.Response:
+        channel_id = request.match_info['channel_id']
+        requested[channel_id] += 1
+        await asyncio.sleep(0.05)
+        return web.json_response({'id': channel_id, 'n': requested[channel_id]})
+
+    app = web.Application()
+    app.router.add_get('/api/v9/channels/{channel_id}', get_channel)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    ApiRoute.base = f'http://127.0.0.1:{runner.addresses[0][1]}/api'
+    return runner
+
+
+async def test():
+    print('Cached responses expire after ttl of their route, and uncached routes are not stored.')
+    cache = ResponseCache({'GET /channels/{channel_id}': 0.05})
+    cache.set('c1', 'GET /channels/{channel_id}', {'channel_id': 1}, {'id': '1'})
+    cache.set('u1', 'GET /users/{user_id}', {'user_id': 1}, {'id': '1'})
+    assert cache.get('c1') == {'id': '1'}
+    assert cache.get('u1') is None
+    time.sleep(0.06)
+    assert cache.get('c1') is None
+
+    print('Invalidation discards in-flight responses of the invalidated channel only.')
+    cache = ResponseCache()
+    channel_1, channel_2 = cache.generation({'channel_id': 1}), cache.generation({'channel_id': 2})
+    assert cache.invalidate(channel_id=1) == 0
+    cache.set('c1', 'GET /channels/{channel_id}', {'channel_id': 1}, {'id': '1'}, channel_1)
+    cache.set('c2', 'GET /channels/{channel_id}', {'channel_id': 2}, {'id': '2'}, channel_2)
+    assert cache.get('c1') is None
+    assert cache.get('c2') == {'id': '2'}
+
+    print('Member invalidation removes only the member entry of the guild.')
+    cache.set('g1', 'GET /guilds/{guild_id}', {'guild_id': 1}, {'id': '1'})
+    cache.set('m1', 'GET /guilds/{guild_id}/members/{user_id}', {'guild_id': 1, 'user_id': 2}, {'user': {'id': '2'}})
+    assert cache.invalidate(guild_id=1, user_id=2) == 1
+    assert cache.get('g1') == {'id': '1'} and cache.get('m1') is None
+
+    print('Only events invalidating configured routes are hooked.')
+    manager = EventManager(gateway=None)
+    ResponseCache({'GET /channels/{channel_id}': 60.0}).attach(manager)
+    assert manager.is_subscribed('CHANNEL_UPDATE')
+    assert not manager.is_subscribed('MESSAGE_UPDATE')
+    assert not manager.is_subscribed('GUILD_UPDATE')
+
+    print('Removing a hook keeps events consumed by the gateway subscribed.')
+    manager = EventManager(gateway=None)
+    manager.add_consumer('GUILD_DELETE')    # As GatewayBot does.
+    cache = ResponseCache()
+    cache.attach(manager)
+    cache.detach(manager)
+    assert manager.is_subscribed('GUILD_DELETE')
+    assert not manager.is_subscribed('GUILD_UPDATE')
+
+    print('Failing hook is logged, and does not stop other hooks.')
+    called = []
+
+    def broken(event_name, data):
+        raise KeyError('id')
+
+    manager.add_hook('GUILD_UPDATE', broken)
+    manager.add_hook('GUILD_UPDATE', lambda event_name, data: called.append(data))
+    manager.dispatch(FakeResponse('GUILD_UPDATE', {}))
+    assert called == [{}]
+
+    print('Gateway event invalidates cached entry through hook.')
+    cache.attach(manager)
+    cache.set('g1', 'GET /guilds/{guild_id}', {'guild_id': 1}, {'id': '1'})
+    manager.dispatch(FakeResponse('GUILD_UPDATE', {'id': '1'}))
+    assert cache.get('g1') is None
+
+    requested = Counter()
+    runner = await start_server(requested)
+    client = HTTPClient(cache=ResponseCache({'GET /channels/{channel_id}': 60.0}))
+
+    print('Identical concurrent GETs share one request.')
+    results = await asyncio.gather(*(client.get_channel(1) for _ in range(5)))
+    assert all(result is results[0] for result in results)
+    assert requested['1'] == 1 and client.coalesced == 4
+
+    print('GET response of cached route is served from cache, until the channel is invalidated.')
+    assert await client.get_channel(1) is results[0]
+    assert requested['1'] == 1 and client.cache.hits == 1
+    client.cache.invalidate(channel_id=1)
+    assert (await client.get_channel(1))['n'] == 2
+
+    print('Response of request in flight during invalidation is not cached.')
+    fetching = asyncio.ensure_future(client.get_channel(2))
+    await asyncio.sleep(0.01)
+    client.cache.invalidate(channel_id=2)
+    await fetching
+    await client.get_channel(2)
+    assert requested['2'] == 2
+
+    await client.close()
+    await runner.cleanup()
+
+
+asyncio.get_event_loop().run_until_complete(test())
@@ -0,0 +1,52 @@
+import asyncio
+
+from volt.ratelimit import CommandPriority, GatewaySendQueue
+
+
+async def test():
+    written = []
+    blocked = asyncio.Event()
+
+    async def writer(payload):
+        if payload == 'stuck':
+            blocked.set()
+            await asyncio.sleep(3600)
+        written.append(payload)
+
+    print('Commands are sent in priority order.')
+    queue = GatewaySendQueue(writer)
+    futures = [
+        queue.put('bulk', CommandPriority.BULK),
+        queue.put('presence', CommandPriority.NORMAL),
+        queue.put('heartbeat', CommandPriority.CRITICAL)
+    ]
+    queue.start()
+    await asyncio.gather(*futures)
+    assert written == ['heartbeat', 'presence', 'bulk']
+    assert queue.stats()['sent'] == 3
+
+    print('Commands are paced by the command limit.')
+    paced = GatewaySendQueue(writer, limit=2, period=0.2)
+    paced.start()
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await asyncio.gather(*(paced.put(i, CommandPriority.CRITICAL) for i in range(4)))
+    assert loop.time() - started >= 0.15
+    paced.stop()
+
+    print('Stopping the queue while a command is written fails its future, instead of leaving it pending.')
+    stuck = queue.put('stuck', CommandPriority.CRITICAL)
+    queued = queue.put('after', CommandPriority.NORMAL)
+    await blocked.wait()
+    queue.stop()
+    for future in (stuck, queued):
+        try:
+            await asyncio.wait_for(future, 1)
+        except ConnectionResetError:
+            pass
+        else:
+            raise AssertionError('Future of unsent command is resolved.')
+    assert 'after' not in written
+
+
+asyncio.get_event_loop().run_until_complete(test())
@@ -0,0 +1,95 @@
+import asyncio
+import io
+import os
+import tempfile
+import threading
+
+from volt.file import File
+from volt.upload_cache import UploadCache
+
+
+class FakeHTTP:
+    def __init__(self):
+        self.refreshed = []
+
+    async def refresh_attachment_urls(self, urls):
+        self.refreshed.extend(urls)
+        return {url: f'{url}&refreshed' for url in urls}
+
+
+def message_of(files, ids):
+    # Discord sanitizes filenames, so they do not match filenames of sent files.
+    return {
+        'id': '1',
+        'attachments': [
+            {'id': attachment_id, 'filename': f'sanitized_{index}', 'url': f'https://cdn.discordapp.com/{attachment_id}?ex=ffffffff'}
+            for index, attachment_id in enumerate(ids)
+        ]
+    }
+
+
+async def test():
+    http = FakeHTTP()
+    cache = UploadCache(':memory:', max_entries=2)
+    payload = {'embeds': [{'image': {'url': 'attachment://image one.png'}}]}
+
+    print('Uploaded file referenced by embed is recorded by attachment order, though discord renamed it.')
+    files = [File(io.BytesIO(b'plain'), 'plain.txt'), File(io.BytesIO(b'image'), 'image one.png')]
+    sent_payload, sent_files, pending = await cache.prepare(http, payload, files)
+    assert sent_payload is payload and len(sent_files) == 2 and list(pending) == [1]
+    await cache.record(pending, sent_payload, sent_files, message_of(sent_files, ['10', '11']))
+    assert len(cache) == 1 and cache.misses == 1
+
+    print('Cached upload is referenced by url instead of uploading it again.')
+    files = [File(io.BytesIO(b'plain'), 'plain.txt'), File(io.BytesIO(b'image'), 'image one.png')]
+    sent_payload, sent_files, pending = await cache.prepare(http, payload, files)
+    assert sent_payload['embeds'][0]['image']['url'] == 'https://cdn.discordapp.com/11?ex=ffffffff'
+    assert payload['embeds'][0]['image']['url'] == 'attachment://image one.png'
+    assert [file.filename for file in sent_files] == ['plain.txt'] and not pending
+    assert cache.hits == 1 and not http.refreshed
+
+    print('Attachments kept on edit are not matched to uploaded files.')
+    edited = {'attachments': [{'id': '5'}], 'embeds': [{'thumbnail': {'url': 'attachment://thumb.png'}}]}
+    files = [File(io.BytesIO(b'thumb'), 'thumb.png')]
+    sent_payload, sent_files, pending = await cache.prepare(http, edited, files)
+    await cache.record(pending, sent_payload, sent_files, message_of(sent_files, ['5', '12']))
+    assert len(cache) == 2
+    assert (await cache.get(pending[0]))[0] == 'https://cdn.discordapp.com/12?ex=ffffffff'
+
+    print('Least recently used entry is evicted over max entries, and count is kept without counting rows.')
+    files = [File(io.BytesIO(b'other'), 'other.png')]
+    other = {'embeds': [{'image': {'url': 'attachment://other.png'}}]}
+    sent_payload, sent_files, pending = await cache.prepare(http, other, files)
+    await cache.record(pending, sent_payload, sent_files, message_of(sent_files, ['13']))
+    assert len(cache) == 2
+
+    print('Expiring url is refreshed before use.')
+    expiring = {'id': '14', 'url': 'https://cdn.discordapp.com/14?ex=10'}
+    await cache.store('expiring', expiring)
+    assert await cache.resolve(http, 'expiring') == 'https://cdn.discordapp.com/14?ex=10&refreshed'
+    assert http.refreshed == ['https://cdn.discordapp.com/14?ex=10']
+
+    print('Database is used off the event loop thread.')
+    threads = set()
+    get = cache._get
+
+    def recording_get(digest):
+        threads.add(threading.current_thread())
+        return get(digest)
+
+    cache._get = recording_get
+    await cache.get('expiring')
+    assert threads and threading.current_thread() not in threads
+
+    print('Unchanged file on disk is not hashed again.')
+    path = os.path.join(tempfile.mkdtemp(), 'disk.png')
+    with open(path, 'wb') as fp:
+        fp.write(b'disk')
+    file = File(path)
+    digest = await cache.digest(file)
+    file.digest = None    # Hashing again would fail.
+    assert await cache.digest(file) == digest
+    cache.close()
+
+
+asyncio.get_event_loop().run_until_complete(test())
@@ -0,0 +1,284 @@
+"""
+CDN asset fetcher. (avatars, emojis, icons)
+Assets are cached in two tiers : in-memory LRU of bytes, and size-capped disk store.
+Entries are keyed by asset path (which contains its hash), format and size, so changed assets get new keys.
+Concurrent fetches of the same asset share one download, and downloads are streamed into disk store.
+"""
+
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, Final, List, Optional, Union
+
+from volt.errors import DiscordHTTPError
+from volt.http import HTTPSession, _decode_body
+from volt.utils.log import get_logger, DEBUG
+
+
+__all__ = (
+    'CDN_BASE',
+    'asset_url',
+    'AssetFetcher'
+)
+
+CDN_BASE: Final[str] = 'https://cdn.discordapp.com'
+ASSET_FORMATS: Final[frozenset] = frozenset(('png', 'jpg', 'jpeg', 'webp', 'gif'))
+DEFAULT_MEMORY_LIMIT: Final[int] = 32 * 1024 * 1024
+DEFAULT_DISK_LIMIT: Final[int] = 512 * 1024 * 1024
+DEFAULT_FETCH_CONCURRENCY: Final[int] = 8
+# Assets larger than this are kept on disk only.
+MAX_MEMORY_ENTRY: Final[int] = 4 * 1024 * 1024
+DOWNLOAD_CHUNK_SIZE: Final[int] = 64 * 1024
+
+
+def asset_url(path: str, format: str = 'png', size: Optional[int] = None) -> str:
+    """
+    Build CDN url of asset.
+    :param path: asset path without extension. ex) `avatars/{user_id}/{avatar_hash}`
+    :param format: image format. Animated assets (hash starting with `a_`) can be `gif`.
+    :param size: image size, power of 2 between 16 and 4096.
+    :return: asset url.
+    """
+    if format not in ASSET_FORMATS:
+        raise ValueError(f'Invalid asset format {format}. Must be one of {", ".join(sorted(ASSET_FORMATS))}.')
+    if size is not None and (size < 16 or size > 4096 or size & (size - 1)):
+        raise ValueError(f'Invalid asset size {size}. Must be power of 2 between 16 and 4096.')
+    return f'{CDN_BASE}/{path}.{format}' + (f'?size={size}' if size is not None else '')
+
+
+class AssetFetcher:
+    """
+    Fetches CDN assets through pooled http session, with bounded memory & disk cache.
+    """
+
+    def __init__(
+            self,
+            http: Optional[HTTPSession] = None,
+            disk_path: Optional[Union[str, os.PathLike]] = None,
+            memory_limit: int = DEFAULT_MEMORY_LIMIT,
+            disk_limit: int = DEFAULT_DISK_LIMIT,
+            concurrency: int = DEFAULT_FETCH_CONCURRENCY
+    ):
+        """
+        :param http: pooled http session. Shared default session is used if None.
+        :param disk_path: directory of disk store. Assets are cached in memory only if None.
+        :param memory_limit: maximum bytes of in-memory cache.
+        :param disk_limit: maximum bytes of disk store.
+        :param concurrency: maximum downloads at once.
+        """
+        self.logger = get_logger('volt.assets', stream_level=DEBUG)
+        self.http: Optional[HTTPSession] = http
+        self.disk_path: Optional[str] = os.fspath(disk_path) if disk_path is not None else None
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self.memory_hits: int = 0
+        self.disk_hits: int = 0
+        self.downloads: int = 0
+        # Key -> bytes, in LRU order.
+        self.__memory: 'OrderedDict[str, bytes]' = OrderedDict()
+        self.__memory_size: int = 0
+        # Disk file name -> size, in LRU order.
+        self.__disk: 'OrderedDict[str, int]' = OrderedDict()
+        self.__disk_size: int = 0
+        self.__inflight: Dict[str, asyncio.Task] = {}
+        self.__semaphore: Optional[asyncio.Semaphore] = None
+        self.__concurrency = concurrency
+        if self.disk_path is not None:
+            self._load_disk()
+
+    def _load_disk(self):
+        os.makedirs(self.disk_path, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self.disk_path):
+            if not entry.is_file():
+                continue
+            if entry.name.endswith('.part'):
+                os.unlink(entry.path)   # Interrupted download.
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self.__disk[name] = size
+            self.__disk_size += size
+        _unlink(self._evict_disk())
+
+    @staticmethod
+    def _file_name(key: str) -> str:
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def _remember(self, key: str, data: bytes):
+        if len(data) > MAX_MEMORY_ENTRY or len(data) > self.memory_limit:
+            return
+        old = self.__memory.pop(key, None)
+        if old is not None:
+            self.__memory_size -= len(old)
+        self.__memory[key] = data
+        self.__memory_size += len(data)
+        while self.__memory_size > self.memory_limit:
+            _, evicted = self.__memory.popitem(last=False)
+            self.__memory_size -= len(evicted)
+
+    def _evict_disk(self) -> List[str]:
+        """
+        Drop least recently used entries over disk limit.
+        :return: paths of evicted files, to be unlinked.
+        """
+        evicted = []
+        while self.__disk_size > self.disk_limit and self.__disk:
+            name, size = self.__disk.popitem(last=False)
+            self.__disk_size -= size
+            evicted.append(os.path.join(self.disk_path, name))
+        return evicted
+
+    async def fetch(self, path: str, format: str = 'png', size: Optional[int] = None) -> bytes:
+        """
+        Fetch asset from memory, disk or CDN.
+        :param path: asset path without extension. ex) `avatars/{user_id}/{avatar_hash}`
+        :param format: image format.
+        :param size: image size, power of 2 between 16 and 4096.
+        :return: asset bytes.
+        :raise DiscordHTTPError: CDN responded with error.
+        """
+        url = asset_url(path, format, size)
+        data = self.__memory.get(url)
+        if data is not None:
+            self.__memory.move_to_end(url)
+            self.memory_hits += 1
+            return data
+        task = self.__inflight.get(url)
+        if task is None:
+            task = self.__inflight[url] = asyncio.ensure_future(self._load(url))
+            task.add_done_callback(lambda t: self._loaded(url, t))
+        # Shielded, so a cancelled caller does not cancel the fetch shared with others.
+        return await asyncio.shield(task)
+
+    def _loaded(self, url: str, task: asyncio.Task):
+        if self.__inflight.get(url) is task:
+            del self.__inflight[url]
+        if not task.cancelled():
+            task.exception()    # Retrieve exception, even if every caller gave up.
+
+    async def _load(self, url: str) -> bytes:
+        loop = asyncio.get_running_loop()
+        if self.disk_path is not None:
+            name = self._file_name(url)
+            file_path = os.path.join(self.disk_path, name)
+            if name in self.__disk:
+                try:
+                    data = await loop.run_in_executor(None, _read_and_touch, file_path)
+                except FileNotFoundError:
+                    # Entry may be evicted already, by a download finished while reading.
+                    self.__disk_size -= self.__disk.pop(name, 0)
+                else:
+                    if name in self.__disk:
+                        self.__disk.move_to_end(name)
+                    self.disk_hits += 1
+                    self._remember(url, data)
+                    return data
+            data = await self._download(url, file_path)
+        else:
+            data = await self._download(url, None)
+        self._remember(url, data)
+        return data
+
+    async def _download(self, url: str, file_path: Optional[str]) -> bytes:
+        """
+        Download asset, streaming it into file if file path is given.
+        Asset larger than disk limit is not stored on disk.
+        :return: asset bytes.
+        """
+        if self.__semaphore is None:
+            self.__semaphore = asyncio.Semaphore(self.__concurrency)
+        http = self.http or HTTPSession.shared()
+        loop = asyncio.get_running_loop()
+        async with self.__semaphore:
+            async with http.session.get(url) as resp:
+                if resp.status >= 400:
+                    raise DiscordHTTPError(f'GET {url} failed with status {resp.status}.', resp.status, _decode_body(resp.headers, await resp.read()))
+                self.downloads += 1
+                if file_path is None or (resp.content_length is not None and resp.content_length > self.disk_limit):
+                    return await resp.read()
+                # Written into temporary file and renamed, so interrupted download never leaves broken entry.
+                part_path = f'{file_path}.part'
+                fp = await loop.run_in_executor(None, open, part_path, 'wb')
+                # Caller gets the bytes anyway, so they are kept instead of reading the file back.
+                chunks = []
+                try:
+                    async for chunk in resp.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                        chunks.append(chunk)
+                        await loop.run_in_executor(None, fp.write, chunk)
+                except BaseException:
+                    await loop.run_in_executor(None, _discard, fp, part_path)
+                    raise
+                data = b''.join(chunks)
+                if len(data) > self.disk_limit:
+                    # Would be evicted right away. (ex: content length was not given)
+                    await loop.run_in_executor(None, _discard, fp, part_path)
+                    return data
+                await loop.run_in_executor(None, _commit, fp, part_path, file_path)
+        name = os.path.basename(file_path)
+        self.__disk_size -= self.__disk.pop(name, 0)   # Downloaded again after its file disappeared.
+        self.__disk[name] = len(data)
+        self.__disk_size += len(data)
+        evicted = self._evict_disk()
+        if evicted:
+            await loop.run_in_executor(None, _unlink, evicted)
+        return data
+
+    async def fetch_avatar(self, user_id: int, avatar_hash: str, size: Optional[int] = None, format: Optional[str] = None) -> bytes:
+        """
+        :param format: image format. Defaults to gif for animated avatar, png otherwise.
+        """
+        return await self.fetch(f'avatars/{user_id}/{avatar_hash}', format or ('gif' if avatar_hash.startswith('a_') else 'png'), size)
+
+    async def fetch_emoji(self, emoji_id: int, animated: bool = False, size: Optional[int] = None) -> bytes:
+        return await self.fetch(f'emojis/{emoji_id}', 'gif' if animated else 'png', size)
+
+    async def fetch_guild_icon(self, guild_id: int, icon_hash: str, size: Optional[int] = None, format: Optional[str] = None) -> bytes:
+        return await self.fetch(f'icons/{guild_id}/{icon_hash}', format or ('gif' if icon_hash.startswith('a_') else 'png'), size)
+
+    def clear_memory(self):
+        self.__memory.clear()
+        self.__memory_size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'memory_entries': len(self.__memory),
+            'memory_bytes': self.__memory_size,
+            'disk_entries': len(self.__disk),
+            'disk_bytes': self.__disk_size,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'downloads': self.downloads,
+            'inflight': len(self.__inflight)
+        }
+
+
+def _read(path: str) -> bytes:
+    with open(path, 'rb') as fp:
+        return fp.read()
+
+
+def _discard(fp: BinaryIO, path: str):
+    fp.close()
+    os.unlink(path)
+
+
+def _commit(fp: BinaryIO, part_path: str, path: str):
+    fp.close()
+    os.replace(part_path, path)
+
+
+def _unlink(paths: List[str]):
+    for path in paths:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def _read_and_touch(path: str) -> bytes:
+    data = _read(path)
+    os.utime(path)  # Keep LRU order of disk store across restarts.
+    return data
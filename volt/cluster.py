@@ -0,0 +1,476 @@
+"""
+Multi-process clustering.
+ClusterLauncher spreads shard ranges over worker processes, so each cluster parses & dispatches events on its own core.
+The launcher process supervises workers, restarts crashed ones, schedules identifies of every shard centrally,
+and relays cross-cluster queries over pipes.
+"""
+
+import asyncio
+import heapq
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future
+from enum import IntEnum
+from itertools import count
+from multiprocessing.connection import Connection, wait
+from typing import Any, Callable, Dict, Final, List, Optional, Sequence, Tuple
+
+import aiohttp
+
+from volt.gateway import GatewayBot, GatewayIntents
+from volt.http import HTTPClient
+from volt.identify import IdentifySchedule
+from volt.ratelimit_broker import BrokerRateLimiter, RateLimitBroker
+from volt.shard import ShardManager, fetch_gateway_bot
+from volt.utils.log import get_logger, DEBUG
+
+
+__all__ = (
+    'ClusterOpcodes',
+    'ClusterWorker',
+    'ClusterLauncher'
+)
+
+# Restart backoff of crashed worker, in seconds.
+RESTART_BACKOFF_BASE: Final[float] = 1.0
+RESTART_BACKOFF_MAX: Final[float] = 60.0
+# Worker which stayed alive longer than this is considered healthy, and its backoff is reset.
+HEALTHY_WORKER_SECONDS: Final[float] = 120.0
+# Cross-cluster query is answered with partial results after this timeout.
+QUERY_TIMEOUT: Final[float] = 5.0
+
+# (opcode, nonce, payload)
+ClusterMessage = Tuple['ClusterOpcodes', int, Any]
+
+
+class ClusterOpcodes(IntEnum):
+    """
+    IPC messages between launcher and workers.
+    """
+    IDENTIFY = 1            # worker -> launcher : request identify of a shard. payload = shard id
+    IDENTIFY_GRANTED = 2    # launcher -> worker : shard can identify now.
+    QUERY = 3               # worker -> launcher : cross-cluster query. payload = query name
+    QUERY_RESULT = 4        # launcher -> worker : {cluster id: result}
+    COLLECT = 5             # launcher -> worker : run query locally. payload = query name
+    COLLECT_RESULT = 6      # worker -> launcher : local query result.
+    STOP = 7                # launcher -> worker : close every shard and exit.
+
+
+class ClusterWorker:
+    """
+    Worker process side of the cluster. Runs a ShardManager with shard range of this cluster.
+    """
+
+    def __init__(
+            self,
+            cluster_id: int,
+            conn: Connection,
+            token: str,
+            shard_ids: Sequence[int],
+            shard_count: int,
+            ratelimit_socket: Optional[str] = None,
+            **manager_options
+    ):
+        """
+        :param ratelimit_socket: socket path of launcher's rate limit broker. REST rate limits are local to this process if None.
+        """
+        self.logger = get_logger(f'volt.cluster.{cluster_id}', stream_level=DEBUG)
+        self.cluster_id: Final[int] = cluster_id
+        self.conn: Final[Connection] = conn
+        self.manager: ShardManager = ShardManager(
+            token,
+            shard_count=shard_count,
+            shard_ids=shard_ids,
+            before_identify=self._request_identify,
+            **manager_options
+        )
+        # REST client sharing connection pool of manager, and rate limits of every cluster through broker.
+        self.rest: HTTPClient = HTTPClient(
+            token,
+            self.manager.version,
+            http=self.manager.http,
+            ratelimiter=BrokerRateLimiter(ratelimit_socket) if ratelimit_socket is not None else None
+        )
+        self.query_handlers: Dict[str, Callable[[], Any]] = {
+            'guild_count': self.guild_count,
+            'shard_ids': lambda: list(self.manager.shards)
+        }
+        self.__nonce = count()
+        self.__pending: Dict[int, asyncio.Future] = {}
+
+    def guild_count(self) -> int:
+        """
+        :return: guild count of this cluster.
+        """
+        return sum(len(shard.guild_ids) for shard in self.manager.shards.values())
+
+    def register_query(self, name: str, handler: Callable[[], Any]):
+        """
+        Register query which can be collected from every cluster, using `query()`.
+        :param name: query name.
+        :param handler: function or coroutine function returning picklable local result.
+        """
+        self.query_handlers[name] = handler
+
+    def _send(self, op: ClusterOpcodes, nonce: int, payload: Any = None):
+        self.conn.send((op, nonce, payload))
+
+    def _request(self, op: ClusterOpcodes, payload: Any) -> asyncio.Future:
+        nonce = next(self.__nonce)
+        future = self.__pending[nonce] = asyncio.get_running_loop().create_future()
+        self._send(op, nonce, payload)
+        return future
+
+    async def _request_identify(self, shard: GatewayBot):
+        self.logger.debug(f'Shard {shard.shard_id} requests identify to launcher.')
+        await self._request(ClusterOpcodes.IDENTIFY, shard.shard_id)
+
+    async def query(self, name: str) -> Dict[int, Any]:
+        """
+        Run query on every cluster.
+        :param name: registered query name.
+        :return: dictionary of cluster id and its result. Clusters which did not answer in time are omitted.
+        """
+        return await self._request(ClusterOpcodes.QUERY, name)
+
+    async def total_guild_count(self) -> int:
+        """
+        :return: guild count of every cluster.
+        """
+        return sum((await self.query('guild_count')).values())
+
+    async def _collect(self, nonce: int, name: str):
+        handler = self.query_handlers.get(name)
+        result = None
+        if handler is not None:
+            try:
+                result = handler()
+                if asyncio.iscoroutine(result):
+                    result = await result
+            except Exception as e:
+                self.logger.error(f'Query {name} raised exception.', exc_info=e)
+                result = None
+        self._send(ClusterOpcodes.COLLECT_RESULT, nonce, result)
+
+    def _on_readable(self):
+        while self.conn.poll():
+            try:
+                op, nonce, payload = self.conn.recv()
+            except EOFError:
+                # Launcher is gone. Nobody will restart us.
+                asyncio.get_running_loop().remove_reader(self.conn.fileno())
+                asyncio.create_task(self.manager.close())
+                return
+            if op in (ClusterOpcodes.IDENTIFY_GRANTED, ClusterOpcodes.QUERY_RESULT):
+                future = self.__pending.pop(nonce, None)
+                if future is not None and not future.done():
+                    future.set_result(payload)
+            elif op is ClusterOpcodes.COLLECT:
+                asyncio.create_task(self._collect(nonce, payload))
+            elif op is ClusterOpcodes.STOP:
+                asyncio.create_task(self.manager.close())
+
+    async def start(self, setup: Optional[Callable[['ClusterWorker'], Any]] = None):
+        """
+        Start shards of this cluster.
+        :param setup: function called with this worker after shards are prepared, before they connect. Register listeners here.
+        """
+        loop = asyncio.get_running_loop()
+        loop.add_reader(self.conn.fileno(), self._on_readable)
+        try:
+            await self.manager.prepare()
+            if setup is not None:
+                result = setup(self)
+                if asyncio.iscoroutine(result):
+                    await result
+            await self.manager.start()
+        finally:
+            loop.remove_reader(self.conn.fileno())
+            # Connection pool belongs to manager. This closes connection to rate limit broker.
+            await self.rest.close()
+
+
+def _worker_main(
+        cluster_id: int,
+        conn: Connection,
+        token: str,
+        shard_ids: Sequence[int],
+        shard_count: int,
+        setup: Optional[Callable[[ClusterWorker], Any]],
+        ratelimit_socket: Optional[str],
+        manager_options: Dict[str, Any]
+):
+    async def main():
+        worker = ClusterWorker(cluster_id, conn, token, shard_ids, shard_count, ratelimit_socket, **manager_options)
+        await worker.start(setup)
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass    # Launcher handles interrupt.
+
+
+class _WorkerHandle:
+    __slots__ = ('cluster_id', 'shard_ids', 'process', 'conn', 'started', 'backoff', 'restart_at')
+
+    def __init__(self, cluster_id: int, shard_ids: Sequence[int]):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.process: Optional[multiprocessing.Process] = None
+        self.conn: Optional[Connection] = None
+        self.started: float = 0.0
+        self.backoff: float = RESTART_BACKOFF_BASE
+        self.restart_at: Optional[float] = None
+
+
+class _PendingQuery:
+    __slots__ = ('requester', 'nonce', 'waiting', 'results', 'deadline')
+
+    def __init__(self, requester: int, nonce: int, waiting: set, deadline: float):
+        self.requester = requester
+        self.nonce = nonce
+        self.waiting = waiting
+        self.results: Dict[int, Any] = {}
+        self.deadline = deadline
+
+
+class ClusterLauncher:
+    """
+    Launcher & supervisor of cluster worker processes.
+    """
+
+    def __init__(
+            self,
+            token: str,
+            clusters: Optional[int] = None,
+            shard_count: Optional[int] = None,
+            version: int = 9,
+            intents: GatewayIntents = GatewayIntents.all(),
+            setup: Optional[Callable[[ClusterWorker], Any]] = None,
+            start_method: Optional[str] = None,
+            ratelimit_socket: Optional[str] = None,
+            **gateway_options
+    ):
+        """
+        :param token: bot token.
+        :param clusters: number of worker processes. Defaults to cpu count (but not more than shard count).
+        :param shard_count: total shard count. If None, recommended shard count from `GET /gateway/bot` is used.
+        :param version: gateway & api version.
+        :param intents: gateway intents of shards.
+        :param setup: picklable function called in each worker with ClusterWorker, before shards connect. Register listeners here.
+        :param start_method: multiprocessing start method (`fork`, `spawn`, `forkserver`). None to use platform default.
+        :param ratelimit_socket: unix socket path of rate limit broker run by launcher. Every cluster shares REST rate limits through it.
+            If None, each cluster keeps its own rate limits. (Unix only)
+        :param gateway_options: extra keyword arguments passed into each GatewayBot.
+        """
+        self.logger = get_logger('volt.cluster', stream_level=DEBUG)
+        self.version: Final[int] = version
+        self.intents = intents
+        self.clusters: Optional[int] = clusters
+        self.shard_count: Optional[int] = shard_count
+        self.setup = setup
+        self.ratelimit_socket: Optional[str] = ratelimit_socket
+        self.gateway_options = gateway_options
+        self.identify_schedule: IdentifySchedule = IdentifySchedule()
+        self.workers: Dict[int, _WorkerHandle] = {}
+        self.__token: Final[str] = token
+        self.__context = multiprocessing.get_context(start_method)
+        self.__closed: bool = False
+        # Heap of scheduled identify grants : (grant time, seq, cluster id, nonce).
+        self.__grants: List[Tuple[float, int, int, int]] = []
+        self.__grant_seq = count()
+        self.__queries: Dict[int, _PendingQuery] = {}
+        self.__query_nonce = count()
+
+    async def _fetch_gateway_info(self):
+        async with aiohttp.ClientSession() as session:
+            return await fetch_gateway_bot(session, self.__token, self.version)
+
+    def _partition(self) -> List[List[int]]:
+        per_cluster = math.ceil(self.shard_count / self.clusters)
+        return [
+            list(range(start, min(start + per_cluster, self.shard_count)))
+            for start in range(0, self.shard_count, per_cluster)
+        ]
+
+    def _spawn(self, handle: _WorkerHandle):
+        parent_conn, child_conn = self.__context.Pipe(duplex=True)
+        manager_options = dict(self.gateway_options, version=self.version, intents=self.intents)
+        process = self.__context.Process(
+            target=_worker_main,
+            args=(
+                handle.cluster_id, child_conn, self.__token, handle.shard_ids, self.shard_count,
+                self.setup, self.ratelimit_socket, manager_options
+            ),
+            name=f'volt-cluster-{handle.cluster_id}',
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        handle.process = process
+        handle.conn = parent_conn
+        handle.started = time.monotonic()
+        handle.restart_at = None
+        self.logger.info(f'Cluster {handle.cluster_id} started (pid {process.pid}) with shards {handle.shard_ids[0]}~{handle.shard_ids[-1]}.')
+
+    def _send(self, handle: _WorkerHandle, op: ClusterOpcodes, nonce: int, payload: Any = None):
+        try:
+            handle.conn.send((op, nonce, payload))
+        except (BrokenPipeError, OSError):
+            pass    # Worker is dead. Supervisor loop restarts it.
+
+    def _schedule_identify(self, handle: _WorkerHandle, nonce: int, shard_id: int):
+        grant_at = self.identify_schedule.reserve_slot(shard_id)
+        heapq.heappush(self.__grants, (grant_at, next(self.__grant_seq), handle.cluster_id, nonce))
+
+    def _flush_grants(self):
+        now = time.monotonic()
+        while self.__grants and self.__grants[0][0] <= now:
+            _, _, cluster_id, nonce = heapq.heappop(self.__grants)
+            handle = self.workers[cluster_id]
+            if handle.restart_at is None:
+                self._send(handle, ClusterOpcodes.IDENTIFY_GRANTED, nonce)
+
+    def _start_query(self, handle: _WorkerHandle, nonce: int, name: str):
+        alive = {cid for cid, h in self.workers.items() if h.restart_at is None}
+        query_id = next(self.__query_nonce)
+        self.__queries[query_id] = _PendingQuery(handle.cluster_id, nonce, alive, time.monotonic() + QUERY_TIMEOUT)
+        for cid in alive:
+            self._send(self.workers[cid], ClusterOpcodes.COLLECT, query_id, name)
+
+    def _finish_queries(self, force_dead: Optional[int] = None):
+        now = time.monotonic()
+        for query_id, query in list(self.__queries.items()):
+            if force_dead is not None:
+                query.waiting.discard(force_dead)
+            if not query.waiting or query.deadline <= now:
+                del self.__queries[query_id]
+                requester = self.workers[query.requester]
+                if requester.restart_at is None:
+                    self._send(requester, ClusterOpcodes.QUERY_RESULT, query.nonce, query.results)
+
+    def _handle_message(self, handle: _WorkerHandle):
+        try:
+            op, nonce, payload = handle.conn.recv()
+        except (EOFError, OSError):
+            return  # Worker is dying. Sentinel handles it.
+        if op is ClusterOpcodes.IDENTIFY:
+            self._schedule_identify(handle, nonce, payload)
+        elif op is ClusterOpcodes.QUERY:
+            self._start_query(handle, nonce, payload)
+        elif op is ClusterOpcodes.COLLECT_RESULT:
+            query = self.__queries.get(nonce)
+            if query is not None:
+                query.results[handle.cluster_id] = payload
+                query.waiting.discard(handle.cluster_id)
+
+    def _handle_death(self, handle: _WorkerHandle):
+        handle.process.join()
+        handle.conn.close()
+        if self.__closed:
+            return
+        if time.monotonic() - handle.started > HEALTHY_WORKER_SECONDS:
+            handle.backoff = RESTART_BACKOFF_BASE
+        handle.restart_at = time.monotonic() + handle.backoff
+        self.logger.warning(
+            f'Cluster {handle.cluster_id} exited with code {handle.process.exitcode}. Restarting in {handle.backoff:.1f} seconds.'
+        )
+        handle.backoff = min(handle.backoff * 2, RESTART_BACKOFF_MAX)
+        # Nonces of restarted worker start from 0 again. Replies queued for the dead worker must not reach the new one.
+        self.__grants = [grant for grant in self.__grants if grant[2] != handle.cluster_id]
+        heapq.heapify(self.__grants)
+        for query_id, query in list(self.__queries.items()):
+            if query.requester == handle.cluster_id:
+                del self.__queries[query_id]
+        self._finish_queries(force_dead=handle.cluster_id)
+
+    def _next_timeout(self) -> float:
+        deadlines = [h.restart_at for h in self.workers.values() if h.restart_at is not None]
+        if self.__grants:
+            deadlines.append(self.__grants[0][0])
+        deadlines.extend(q.deadline for q in self.__queries.values())
+        if not deadlines:
+            return 1.0
+        return max(0.0, min(deadlines) - time.monotonic())
+
+    def _supervise(self):
+        while not self.__closed:
+            alive = [h for h in self.workers.values() if h.restart_at is None]
+            waitables = {}
+            for handle in alive:
+                waitables[handle.conn] = (handle, False)
+                waitables[handle.process.sentinel] = (handle, True)
+            for ready in wait(list(waitables), timeout=self._next_timeout()):
+                handle, is_sentinel = waitables[ready]
+                if is_sentinel:
+                    if handle.restart_at is None:
+                        self._handle_death(handle)
+                elif handle.restart_at is None:
+                    self._handle_message(handle)
+
+            now = time.monotonic()
+            for handle in self.workers.values():
+                if handle.restart_at is not None and handle.restart_at <= now:
+                    self._spawn(handle)
+            self._flush_grants()
+            self._finish_queries()
+
+    def shutdown(self, timeout: float = 10.0):
+        """
+        Stop every worker gracefully. Workers still alive after timeout are terminated.
+        """
+        self.__closed = True
+        for handle in self.workers.values():
+            if handle.process is not None and handle.process.is_alive():
+                self._send(handle, ClusterOpcodes.STOP, 0)
+        deadline = time.monotonic() + timeout
+        for handle in self.workers.values():
+            if handle.process is None:
+                continue
+            handle.process.join(max(0.0, deadline - time.monotonic()))
+            if handle.process.is_alive():
+                handle.process.terminate()
+                handle.process.join()
+
+    def _start_broker(self):
+        started: Future = Future()
+
+        async def serve():
+            broker = RateLimitBroker(self.ratelimit_socket)
+            try:
+                await broker.start()
+            except BaseException as e:
+                started.set_exception(e)
+                return
+            started.set_result(None)
+            await broker.serve_forever()
+
+        threading.Thread(target=asyncio.run, args=(serve(),), name='volt-ratelimit-broker', daemon=True).start()
+        # Raises exception of broker start. (ex: socket path in use)
+        started.result()
+
+    def run(self):
+        """
+        Blocking call to launch every cluster and supervise them.
+        """
+        if self.ratelimit_socket is not None:
+            # Broker outlives worker restarts, so restarted workers keep seeing shared rate limits.
+            self._start_broker()
+        info = asyncio.run(self._fetch_gateway_info())
+        self.identify_schedule.update(info['session_start_limit'])
+        if self.shard_count is None:
+            self.shard_count = info['shards']
+        self.clusters = min(self.clusters or os.cpu_count() or 1, self.shard_count)
+        for cluster_id, shard_ids in enumerate(self._partition()):
+            self.workers[cluster_id] = handle = _WorkerHandle(cluster_id, shard_ids)
+            self._spawn(handle)
+        self.logger.info(f'Launched {len(self.workers)} clusters for {self.shard_count} shards (max_concurrency = {self.identify_schedule.max_concurrency}).')
+        try:
+            self._supervise()
+        except KeyboardInterrupt:
+            self.logger.info('Interrupted. Shutting down clusters.')
+        finally:
+            self.shutdown()
@@ -0,0 +1,166 @@
+"""
+JSON codec layer.
+Picks the fastest installed JSON backend (orjson > ujson > json) at import time. Can be overridden using `set_backend`.
+"""
+
+import json
+from abc import ABCMeta, abstractmethod
+from typing import Dict, Final, Union
+
+from volt.types.type_hint import JSON
+from volt.utils.log import get_logger, DEBUG
+
+
+__all__ = (
+    'JsonBackend',
+    'StdlibJsonBackend',
+    'UJsonBackend',
+    'OrJsonBackend',
+    'BACKENDS',
+    'get_backend',
+    'set_backend',
+    'loads',
+    'dumps',
+    'dumps_bytes'
+)
+
+logger = get_logger('volt.codec', stream_level=DEBUG)
+
+
+class JsonBackend(metaclass=ABCMeta):
+    """
+    JSON backend used by volt. Backends must accept both str and bytes on `loads`.
+    """
+    name: str
+
+    @abstractmethod
+    def loads(self, data: Union[str, bytes]) -> JSON:   ...
+
+    @abstractmethod
+    def dumps(self, obj: JSON) -> str:  ...
+
+    @abstractmethod
+    def dumps_bytes(self, obj: JSON) -> bytes:  ...
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(name={self.name})'
+
+
+class StdlibJsonBackend(JsonBackend):
+    name = 'json'
+
+    def loads(self, data: Union[str, bytes]) -> JSON:
+        return json.loads(data)
+
+    def dumps(self, obj: JSON) -> str:
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+    def dumps_bytes(self, obj: JSON) -> bytes:
+        return self.dumps(obj).encode('utf-8')
+
+
+class UJsonBackend(JsonBackend):
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self._ujson = ujson
+
+    def loads(self, data: Union[str, bytes]) -> JSON:
+        return self._ujson.loads(data)
+
+    def dumps(self, obj: JSON) -> str:
+        return self._ujson.dumps(obj, ensure_ascii=False)
+
+    def dumps_bytes(self, obj: JSON) -> bytes:
+        return self.dumps(obj).encode('utf-8')
+
+
+class OrJsonBackend(JsonBackend):
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def loads(self, data: Union[str, bytes]) -> JSON:
+        return self._orjson.loads(data)
+
+    def dumps(self, obj: JSON) -> str:
+        return self._orjson.dumps(obj).decode('utf-8')
+
+    def dumps_bytes(self, obj: JSON) -> bytes:
+        # orjson serializes into bytes natively. No str -> bytes copy.
+        return self._orjson.dumps(obj)
+
+
+# Backends ordered by preference (fastest first).
+BACKENDS: Final[Dict[str, type]] = {
+    'orjson': OrJsonBackend,
+    'ujson': UJsonBackend,
+    'json': StdlibJsonBackend
+}
+
+
+def _select_fastest() -> JsonBackend:
+    for name, backend_cls in BACKENDS.items():
+        try:
+            backend = backend_cls()
+        except ModuleNotFoundError:
+            logger.debug(f'`{name}` module not found. Try next json backend.')
+            continue
+        logger.debug(f'Using json backend `{backend.name}`.')
+        return backend
+    raise RuntimeError('No json backend is available.')     # Unreachable, stdlib json is always available.
+
+
+_backend: JsonBackend = _select_fastest()
+
+
+def get_backend() -> JsonBackend:
+    """
+    Get JSON backend currently used by volt.
+    :return: current JsonBackend.
+    """
+    return _backend
+
+
+def set_backend(backend: Union[str, JsonBackend]) -> JsonBackend:
+    """
+    Override JSON backend used by volt.
+    :param backend: backend name (`orjson`, `ujson`, `json`) or JsonBackend instance.
+    :return: applied JsonBackend.
+    """
+    global _backend
+    if isinstance(backend, str):
+        if backend not in BACKENDS:
+            raise ValueError(f'Unknown json backend {backend}. Available backends : {tuple(BACKENDS)}')
+        backend = BACKENDS[backend]()   # Raises ModuleNotFoundError if backend is not installed.
+    elif not isinstance(backend, JsonBackend):
+        raise TypeError(f'JSON backend must be str or JsonBackend, not {type(backend)}')
+    _backend = backend
+    logger.debug(f'Using json backend `{backend.name}`.')
+    return backend
+
+
+def loads(data: Union[str, bytes]) -> JSON:
+    """
+    Deserialize JSON text or bytes using current backend.
+    """
+    return _backend.loads(data)
+
+
+def dumps(obj: JSON) -> str:
+    """
+    Serialize object into JSON text using current backend.
+    """
+    return _backend.dumps(obj)
+
+
+def dumps_bytes(obj: JSON) -> bytes:
+    """
+    Serialize object into utf-8 encoded JSON bytes using current backend.
+    Prefer this when sending payloads over network, to skip str -> bytes copy on fast backends.
+    """
+    return _backend.dumps_bytes(obj)
+
@@ -0,0 +1,272 @@
+"""
+Adaptive REST concurrency control.
+Each route has an AIMD in-flight limit : it shrinks multiplicatively on 5xx responses, timeouts and rising latency,
+and grows additively back while the route is healthy. Requests over the limit wait in a bounded queue.
+Each route also has a circuit breaker, failing requests fast while the route keeps failing.
+"""
+
+import asyncio
+import time
+from collections import deque
+from enum import Enum
+from typing import Any, Deque, Dict, Final, Optional
+
+from volt.errors import CircuitOpenError, RequestQueueFullError
+from volt.utils.log import get_logger, DEBUG
+
+
+__all__ = (
+    'AdaptiveLimit',
+    'BreakerState',
+    'CircuitBreaker',
+    'ConcurrencyController'
+)
+
+# AIMD parameters.
+INITIAL_LIMIT: Final[float] = 16.0
+MIN_LIMIT: Final[float] = 1.0
+MAX_LIMIT: Final[float] = 256.0
+DECREASE_FACTOR: Final[float] = 0.5         # On failure.
+LATENCY_DECREASE_FACTOR: Final[float] = 0.9 # On latency rise.
+# Latency is considered rising when recent latency exceeds long-term baseline by this factor.
+LATENCY_TOLERANCE: Final[float] = 2.0
+MAX_WAITING: Final[int] = 1024
+# Circuit breaker parameters.
+FAILURE_THRESHOLD: Final[int] = 5
+OPEN_SECONDS: Final[float] = 5.0
+MAX_OPEN_SECONDS: Final[float] = 60.0
+
+
+class AdaptiveLimit:
+    """
+    AIMD in-flight limit with bounded wait queue.
+    """
+
+    def __init__(
+            self,
+            initial: float = INITIAL_LIMIT,
+            minimum: float = MIN_LIMIT,
+            maximum: float = MAX_LIMIT,
+            max_waiting: int = MAX_WAITING
+    ):
+        self.limit: float = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.max_waiting = max_waiting
+        self.inflight: int = 0
+        # Exponentially weighted latencies, in seconds.
+        self.recent_latency: Optional[float] = None
+        self.baseline_latency: Optional[float] = None
+        self.__waiters: Deque[asyncio.Future] = deque()
+        self.__last_decrease: float = 0.0
+
+    @property
+    def waiting(self) -> int:
+        return len(self.__waiters)
+
+    async def acquire(self):
+        """
+        Wait for in-flight slot.
+        :raise RequestQueueFullError: too many requests are already waiting.
+        """
+        if self.inflight < int(self.limit) and not self.__waiters:
+            self.inflight += 1
+            return
+        if len(self.__waiters) >= self.max_waiting:
+            raise RequestQueueFullError(f'{len(self.__waiters)} requests are already waiting. (limit = {int(self.limit)})')
+        future = asyncio.get_running_loop().create_future()
+        self.__waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was handed over right before cancellation. Pass it to next waiter.
+                self.release()
+            else:
+                self.__waiters.remove(future)
+            raise
+
+    def release(self):
+        self.inflight -= 1
+        while self.__waiters and self.inflight < int(self.limit):
+            future = self.__waiters.popleft()
+            if not future.done():
+                self.inflight += 1
+                future.set_result(None)
+
+    def _decrease(self, factor: float):
+        now = time.monotonic()
+        # Failures of requests sent at once are one congestion signal. Decrease at most once per recent latency.
+        if now - self.__last_decrease < (self.recent_latency or 0.0):
+            return
+        self.__last_decrease = now
+        self.limit = max(self.minimum, self.limit * factor)
+
+    def on_success(self, latency: float):
+        if self.recent_latency is None:
+            self.recent_latency = self.baseline_latency = latency
+        else:
+            self.recent_latency += (latency - self.recent_latency) * 0.2
+            self.baseline_latency += (latency - self.baseline_latency) * 0.01
+        if self.recent_latency > self.baseline_latency * LATENCY_TOLERANCE:
+            self._decrease(LATENCY_DECREASE_FACTOR)
+        else:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def on_failure(self):
+        self._decrease(DECREASE_FACTOR)
+
+
+class BreakerState(Enum):
+    CLOSED = 'closed'           # Requests pass.
+    OPEN = 'open'               # Requests fail fast.
+    HALF_OPEN = 'half_open'     # One probe request passes.
+
+
+class CircuitBreaker:
+    """
+    Opens after consecutive failures, and lets a probe request through after open period.
+    Open period doubles while probes keep failing.
+    """
+
+    def __init__(self, threshold: int = FAILURE_THRESHOLD, open_seconds: float = OPEN_SECONDS):
+        self.threshold = threshold
+        self.base_open_seconds = open_seconds
+        self.open_seconds = open_seconds
+        self.state: BreakerState = BreakerState.CLOSED
+        self.failures: int = 0
+        self.opened_at: float = 0.0
+        self.__probing: bool = False
+
+    def check(self, name: str) -> bool:
+        """
+        :return: True if request is the probe request of half open breaker.
+        :raise CircuitOpenError: breaker is open, or probe request is already in flight.
+        """
+        if self.state is BreakerState.CLOSED:
+            return False
+        if self.state is BreakerState.OPEN:
+            retry_after = self.opened_at + self.open_seconds - time.monotonic()
+            if retry_after > 0:
+                raise CircuitOpenError(f'Circuit of {name} is open. Retry after {retry_after:.1f} seconds.')
+            self.state = BreakerState.HALF_OPEN
+        if self.__probing:
+            raise CircuitOpenError(f'Circuit of {name} is half open, and probe request is in flight.')
+        self.__probing = True
+        return True
+
+    def on_success(self):
+        self.failures = 0
+        self.__probing = False
+        self.state = BreakerState.CLOSED
+        self.open_seconds = self.base_open_seconds
+
+    def on_failure(self):
+        self.failures += 1
+        if self.state is BreakerState.HALF_OPEN:
+            self.__probing = False
+            self.open_seconds = min(self.open_seconds * 2, MAX_OPEN_SECONDS)
+            self._open()
+        elif self.state is BreakerState.CLOSED and self.failures >= self.threshold:
+            self._open()
+
+    def on_cancel(self):
+        """
+        Request finished without telling anything about route health. Let another probe through.
+        """
+        self.__probing = False
+
+    def _open(self):
+        self.state = BreakerState.OPEN
+        self.opened_at = time.monotonic()
+
+
+class ConcurrencyController:
+    """
+    Adaptive limits & circuit breakers of every route, keyed by route key (method & path template).
+    """
+
+    def __init__(
+            self,
+            initial: float = INITIAL_LIMIT,
+            maximum: float = MAX_LIMIT,
+            max_waiting: int = MAX_WAITING,
+            failure_threshold: int = FAILURE_THRESHOLD,
+            open_seconds: float = OPEN_SECONDS
+    ):
+        self.logger = get_logger('volt.concurrency', stream_level=DEBUG)
+        self.initial = initial
+        self.maximum = maximum
+        self.max_waiting = max_waiting
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.limits: Dict[str, AdaptiveLimit] = {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def limit(self, route_key: str) -> AdaptiveLimit:
+        limit = self.limits.get(route_key)
+        if limit is None:
+            limit = self.limits[route_key] = AdaptiveLimit(self.initial, maximum=self.maximum, max_waiting=self.max_waiting)
+        return limit
+
+    def breaker(self, route_key: str) -> CircuitBreaker:
+        breaker = self.breakers.get(route_key)
+        if breaker is None:
+            breaker = self.breakers[route_key] = CircuitBreaker(self.failure_threshold, self.open_seconds)
+        return breaker
+
+    async def acquire(self, route_key: str):
+        """
+        Check circuit breaker of route, and wait for in-flight slot.
+        :raise CircuitOpenError: route is failing.
+        :raise RequestQueueFullError: too many requests are waiting on route.
+        """
+        breaker, limit = self.breaker(route_key), self.limit(route_key)
+        probe = breaker.check(route_key)
+        try:
+            await limit.acquire()
+        except BaseException:
+            if probe:
+                breaker.on_cancel()
+            raise
+        if not probe and breaker.state is not BreakerState.CLOSED:
+            # Breaker opened while waiting for slot.
+            limit.release()
+            raise CircuitOpenError(f'Circuit of {route_key} is opened while waiting.')
+
+    def release(self, route_key: str, success: Optional[bool], latency: Optional[float] = None):
+        """
+        Release in-flight slot, and record outcome.
+        :param success: True on success, False on 5xx & timeout, None if outcome says nothing about route health. (ex: 429)
+        :param latency: response latency in seconds, on success.
+        """
+        limit = self.limits[route_key]
+        breaker = self.breakers[route_key]
+        if success:
+            limit.on_success(latency)
+            breaker.on_success()
+        elif success is False:
+            limit.on_failure()
+            before = breaker.state
+            breaker.on_failure()
+            if breaker.state is BreakerState.OPEN and before is not BreakerState.OPEN:
+                self.logger.warning(f'Circuit of {route_key} is opened for {breaker.open_seconds:.1f} seconds.')
+        else:
+            breaker.on_cancel()
+        limit.release()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        :return: current limit, in-flight & waiting requests, latency and breaker state of each route.
+        """
+        return {
+            route_key: {
+                'limit': int(limit.limit),
+                'inflight': limit.inflight,
+                'waiting': limit.waiting,
+                'latency': limit.recent_latency,
+                'baseline_latency': limit.baseline_latency,
+                'breaker': self.breakers[route_key].state.value
+            }
+            for route_key, limit in self.limits.items()
+        }
@@ -1,3 +1,6 @@
+from typing import Any, Optional
+
+
 class DiscordError(Exception):
     """
     Base class of all discord errors
@@ -8,6 +11,23 @@ class DiscordHTTPError(DiscordError):
     """
     Discord errors raised on http.
     """
+    def __init__(self, message: str, status: Optional[int] = None, data: Any = None):
+        super(DiscordHTTPError, self).__init__(message)
+        self.status = status
+        # Error body returned by discord. (ex: {'code': 50001, 'message': 'Missing Access'})
+        self.data = data
+
+
+class CircuitOpenError(DiscordHTTPError):
+    """
+    Error raised when request is rejected because its route keeps failing.
+    """
+
+
+class RequestQueueFullError(DiscordHTTPError):
+    """
+    Error raised when too many requests are waiting for concurrency slot of a route.
+    """
 
 
 class DiscordComponentError(DiscordError):
@@ -0,0 +1,344 @@
+"""
+Erlang External Term Format (ETF)
+Encoder & decoder of discord gateway's `etf` encoding.
+Encoder uses erlpack (C++ extension) when installed, and falls back to pure-python encoder otherwise.
+Decoder is pure-python. erlpack's decoder is not faster than it on gateway payloads, so it is not used.
+Trade-off : ETF frames of discord are larger than their JSON (every string carries 5 byte header), and pure-python decoder
+is several times slower than C JSON backends. (see `benchmarks.codec_bench`) Prefer json encoding with orjson for throughput.
+"""
+
+import struct
+import sys
+import zlib
+from typing import Any, Dict, Final, Optional, Tuple
+
+from volt.types.type_hint import JSON
+
+try:
+    import erlpack
+except ImportError:     # Optional accelerator. `pip install erlpack`
+    erlpack = None
+
+
+__all__ = (
+    'ACCELERATED',
+    'ETFDecodeError',
+    'ETFEncodeError',
+    'decode',
+    'decode_header',
+    'encode'
+)
+
+
+FORMAT_VERSION: Final[int] = 131
+# Whether encode uses erlpack.
+ACCELERATED: Final[bool] = erlpack is not None
+
+# Term tags
+NEW_FLOAT_EXT: Final[int] = 70
+COMPRESSED: Final[int] = 80
+SMALL_INTEGER_EXT: Final[int] = 97
+INTEGER_EXT: Final[int] = 98
+FLOAT_EXT: Final[int] = 99
+ATOM_EXT: Final[int] = 100
+SMALL_TUPLE_EXT: Final[int] = 104
+LARGE_TUPLE_EXT: Final[int] = 105
+NIL_EXT: Final[int] = 106
+STRING_EXT: Final[int] = 107
+LIST_EXT: Final[int] = 108
+BINARY_EXT: Final[int] = 109
+SMALL_BIG_EXT: Final[int] = 110
+LARGE_BIG_EXT: Final[int] = 111
+SMALL_ATOM_EXT: Final[int] = 115
+MAP_EXT: Final[int] = 116
+ATOM_UTF8_EXT: Final[int] = 118
+SMALL_ATOM_UTF8_EXT: Final[int] = 119
+
+_UINT16: Final[struct.Struct] = struct.Struct('>H')
+_UINT32: Final[struct.Struct] = struct.Struct('>I')
+_INT32: Final[struct.Struct] = struct.Struct('>i')
+_DOUBLE: Final[struct.Struct] = struct.Struct('>d')
+
+# Keys ending with `_id` but are not snowflakes.
+SNOWFLAKE_EXCLUDED_KEYS: Final[frozenset] = frozenset({'custom_id', 'session_id', 'nonce'})
+
+_ATOM_CACHE_LIMIT: Final[int] = 4096
+# Raw atom bytes -> decoded python value. Discord uses a small, fixed set of atoms (mostly map keys).
+_atom_cache: Dict[bytes, Any] = {b'nil': None, b'true': True, b'false': False}
+# Map key -> whether its value is a snowflake.
+_snowflake_keys: Dict[Any, bool] = {}
+
+
+class ETFDecodeError(ValueError):
+    """
+    Error raised when given data is not a valid external term format.
+    """
+
+
+class ETFEncodeError(TypeError):
+    """
+    Error raised when given object cannot be encoded into external term format.
+    """
+
+
+def _atom(raw: bytes, encoding: str) -> Any:
+    value = _atom_cache.get(raw, _atom_cache)
+    if value is _atom_cache:
+        value = sys.intern(raw.decode(encoding))
+        if len(_atom_cache) < _ATOM_CACHE_LIMIT:
+            _atom_cache[raw] = value
+    return value
+
+
+def _is_snowflake_key(key: Any) -> bool:
+    result = _snowflake_keys.get(key)
+    if result is None:
+        result = isinstance(key, str) and (key == 'id' or key.endswith('_id')) and key not in SNOWFLAKE_EXCLUDED_KEYS
+        if len(_snowflake_keys) < _ATOM_CACHE_LIMIT:
+            _snowflake_keys[key] = result
+    return result
+
+
+def _decode_term(data: bytes, pos: int, snowflakes: bool) -> Tuple[Any, int]:
+    tag = data[pos]
+    pos += 1
+    # Tags are ordered by their frequency in discord gateway payloads.
+    if tag == BINARY_EXT:
+        length = _UINT32.unpack_from(data, pos)[0]
+        pos += 4
+        return data[pos:pos + length].decode('utf-8'), pos + length
+    elif tag == MAP_EXT:
+        arity = _UINT32.unpack_from(data, pos)[0]
+        pos += 4
+        result = {}
+        for _ in range(arity):
+            key, pos = _decode_term(data, pos, snowflakes)
+            if snowflakes and data[pos] == BINARY_EXT and _is_snowflake_key(key):
+                length = _UINT32.unpack_from(data, pos + 1)[0]
+                start = pos + 5
+                pos = start + length
+                raw = data[start:pos]
+                # int() parses ascii digits directly. No need to decode into str first.
+                result[key] = int(raw) if raw.isdigit() else raw.decode('utf-8')
+            else:
+                result[key], pos = _decode_term(data, pos, snowflakes)
+        return result, pos
+    elif tag == SMALL_INTEGER_EXT:
+        return data[pos], pos + 1
+    elif tag == SMALL_ATOM_UTF8_EXT or tag == SMALL_ATOM_EXT:
+        length = data[pos]
+        pos += 1
+        return _atom(data[pos:pos + length], 'utf-8' if tag == SMALL_ATOM_UTF8_EXT else 'latin-1'), pos + length
+    elif tag == ATOM_UTF8_EXT or tag == ATOM_EXT:
+        length = _UINT16.unpack_from(data, pos)[0]
+        pos += 2
+        return _atom(data[pos:pos + length], 'utf-8' if tag == ATOM_UTF8_EXT else 'latin-1'), pos + length
+    elif tag == LIST_EXT:
+        length = _UINT32.unpack_from(data, pos)[0]
+        pos += 4
+        result = []
+        append = result.append
+        for _ in range(length):
+            item, pos = _decode_term(data, pos, snowflakes)
+            append(item)
+        tail, pos = _decode_term(data, pos, snowflakes)
+        if tail != []:
+            # Improper list. Discord never sends this, but keep the tail to avoid losing data.
+            append(tail)
+        return result, pos
+    elif tag == NIL_EXT:
+        return [], pos
+    elif tag == INTEGER_EXT:
+        return _INT32.unpack_from(data, pos)[0], pos + 4
+    elif tag == SMALL_BIG_EXT or tag == LARGE_BIG_EXT:
+        if tag == SMALL_BIG_EXT:
+            length = data[pos]
+            pos += 1
+        else:
+            length = _UINT32.unpack_from(data, pos)[0]
+            pos += 4
+        sign = data[pos]
+        pos += 1
+        value = int.from_bytes(data[pos:pos + length], 'little')
+        return -value if sign else value, pos + length
+    elif tag == NEW_FLOAT_EXT:
+        return _DOUBLE.unpack_from(data, pos)[0], pos + 8
+    elif tag == STRING_EXT:
+        length = _UINT16.unpack_from(data, pos)[0]
+        pos += 2
+        return data[pos:pos + length].decode('latin-1'), pos + length
+    elif tag == SMALL_TUPLE_EXT or tag == LARGE_TUPLE_EXT:
+        if tag == SMALL_TUPLE_EXT:
+            arity = data[pos]
+            pos += 1
+        else:
+            arity = _UINT32.unpack_from(data, pos)[0]
+            pos += 4
+        result = []
+        for _ in range(arity):
+            item, pos = _decode_term(data, pos, snowflakes)
+            result.append(item)
+        return tuple(result), pos
+    elif tag == FLOAT_EXT:
+        return float(data[pos:pos + 31].split(b'\x00', 1)[0]), pos + 31
+    raise ETFDecodeError(f'Unsupported term tag {tag} at position {pos - 1}.')
+
+
+def decode(data: bytes, snowflakes: bool = False) -> Any:
+    """
+    Decode external term format binary into python object.
+    Atoms are decoded as strings (`nil`, `true`, `false` are decoded as None, True, False).
+    :param data: ETF binary to decode.
+    :param snowflakes: if True, snowflake fields (`id`, `*_id`) are decoded into int. Off by default, so values are the same
+        as json encoding gives.
+    :return: decoded python object.
+    """
+    if not data or data[0] != FORMAT_VERSION:
+        raise ETFDecodeError('Invalid ETF format version.')
+    if len(data) > 1 and data[1] == COMPRESSED:
+        data = bytes([FORMAT_VERSION]) + zlib.decompress(data[6:])
+    try:
+        value, _ = _decode_term(data, 1, snowflakes)
+    except (IndexError, struct.error) as e:
+        raise ETFDecodeError('Unexpected end of ETF data.') from e
+    return value
+
+
+def _skip_term(data: bytes, pos: int) -> int:
+    """
+    Skip a term without building python objects.
+    :return: position of the next term.
+    """
+    tag = data[pos]
+    pos += 1
+    if tag == BINARY_EXT:
+        return pos + 4 + _UINT32.unpack_from(data, pos)[0]
+    elif tag == MAP_EXT:
+        arity = _UINT32.unpack_from(data, pos)[0]
+        pos += 4
+        for _ in range(arity * 2):
+            pos = _skip_term(data, pos)
+        return pos
+    elif tag == SMALL_INTEGER_EXT:
+        return pos + 1
+    elif tag == SMALL_ATOM_UTF8_EXT or tag == SMALL_ATOM_EXT:
+        return pos + 1 + data[pos]
+    elif tag == ATOM_UTF8_EXT or tag == ATOM_EXT or tag == STRING_EXT:
+        return pos + 2 + _UINT16.unpack_from(data, pos)[0]
+    elif tag == LIST_EXT:
+        length = _UINT32.unpack_from(data, pos)[0]
+        pos += 4
+        for _ in range(length + 1):     # Elements and tail.
+            pos = _skip_term(data, pos)
+        return pos
+    elif tag == NIL_EXT:
+        return pos
+    elif tag == INTEGER_EXT:
+        return pos + 4
+    elif tag == SMALL_BIG_EXT:
+        return pos + 2 + data[pos]
+    elif tag == LARGE_BIG_EXT:
+        return pos + 5 + _UINT32.unpack_from(data, pos)[0]
+    elif tag == NEW_FLOAT_EXT:
+        return pos + 8
+    elif tag == SMALL_TUPLE_EXT or tag == LARGE_TUPLE_EXT:
+        if tag == SMALL_TUPLE_EXT:
+            arity = data[pos]
+            pos += 1
+        else:
+            arity = _UINT32.unpack_from(data, pos)[0]
+            pos += 4
+        for _ in range(arity):
+            pos = _skip_term(data, pos)
+        return pos
+    elif tag == FLOAT_EXT:
+        return pos + 31
+    raise ETFDecodeError(f'Unsupported term tag {tag} at position {pos - 1}.')
+
+
+def decode_header(data: bytes, keys: Tuple[str, ...] = ('op', 't', 's')) -> Optional[Dict[str, Any]]:
+    """
+    Decode only the given keys of top-level map, skipping other values (like gateway payload's `d`) without decoding them.
+    :param data: ETF binary to decode.
+    :param keys: top-level keys to decode.
+    :return: dictionary of found keys, or None if data is not a plain top-level map.
+    """
+    if len(data) < 6 or data[0] != FORMAT_VERSION or data[1] != MAP_EXT:
+        return None     # Compressed term, or not a map.
+    try:
+        arity = _UINT32.unpack_from(data, 2)[0]
+        pos = 6
+        header = {}
+        for _ in range(arity):
+            key, pos = _decode_term(data, pos, False)
+            if key in keys:
+                header[key], pos = _decode_term(data, pos, False)
+                if len(header) == len(keys):
+                    break
+            else:
+                pos = _skip_term(data, pos)
+    except (IndexError, struct.error) as e:
+        raise ETFDecodeError('Unexpected end of ETF data.') from e
+    return header
+
+
+def _encode_term(obj: Any, append) -> None:
+    if obj is None:
+        append(b'\x77\x03nil')
+    elif obj is True:
+        append(b'\x77\x04true')
+    elif obj is False:
+        append(b'\x77\x05false')
+    elif isinstance(obj, str):
+        raw = obj.encode('utf-8')
+        append(bytes((BINARY_EXT,)) + _UINT32.pack(len(raw)))
+        append(raw)
+    elif isinstance(obj, int):
+        if 0 <= obj <= 255:
+            append(bytes((SMALL_INTEGER_EXT, obj)))
+        elif -2 ** 31 <= obj < 2 ** 31:
+            append(bytes((INTEGER_EXT,)) + _INT32.pack(obj))
+        else:
+            value = abs(obj)
+            raw = value.to_bytes((value.bit_length() + 7) // 8, 'little')
+            if len(raw) > 255:
+                raise ETFEncodeError(f'Integer {obj} is too big to encode.')
+            append(bytes((SMALL_BIG_EXT, len(raw), 1 if obj < 0 else 0)))
+            append(raw)
+    elif isinstance(obj, float):
+        append(bytes((NEW_FLOAT_EXT,)) + _DOUBLE.pack(obj))
+    elif isinstance(obj, dict):
+        append(bytes((MAP_EXT,)) + _UINT32.pack(len(obj)))
+        for key, value in obj.items():
+            _encode_term(key, append)
+            _encode_term(value, append)
+    elif isinstance(obj, (list, tuple)):
+        if not obj:
+            append(bytes((NIL_EXT,)))
+            return
+        append(bytes((LIST_EXT,)) + _UINT32.pack(len(obj)))
+        for item in obj:
+            _encode_term(item, append)
+        append(bytes((NIL_EXT,)))
+    elif isinstance(obj, (bytes, bytearray)):
+        append(bytes((BINARY_EXT,)) + _UINT32.pack(len(obj)))
+        append(bytes(obj))
+    else:
+        raise ETFEncodeError(f'Object of type {type(obj).__name__} is not ETF serializable.')
+
+
+def encode(obj: JSON) -> bytes:
+    """
+    Encode python object into external term format binary.
+    Strings are encoded as binaries, None and booleans as atoms.
+    :param obj: object to encode.
+    :return: encoded ETF binary.
+    """
+    if erlpack is not None:
+        try:
+            return erlpack.pack(obj)
+        except (OverflowError, TypeError, NotImplementedError):
+            pass    # Integers over 64 bits, or unsupported type. Pure-python encoder handles or reports them.
+    parts = [bytes((FORMAT_VERSION,))]
+    _encode_term(obj, parts.append)
+    return b''.join(parts)
@@ -1,12 +1,32 @@
 import asyncio
+import time
 import typing
+from contextvars import ContextVar
 from enum import Enum, auto
 
 from .types.type_hint import JSON, CoroutineFunction
+from .utils.log import get_logger, DEBUG
+from .utils.stats import RollingStats
 
 
 EVENT_PARAM_BUILDER = typing.Callable[[typing.Any], typing.Tuple]   # Real value : Callable[[gateway.GatewayResponse], Tuple]
 
+# Events whose guild id is `id` of event data, instead of `guild_id`.
+GUILD_ID_EVENTS: typing.Final[typing.FrozenSet[str]] = frozenset(('GUILD_CREATE', 'GUILD_UPDATE', 'GUILD_DELETE'))
+# Maximum queued events per worker. Dispatching into a full queue waits for room.
+DEFAULT_WORKER_QUEUE_SIZE: typing.Final[int] = 1024
+
+# Shard id of the event being handled. Listener tasks inherit this from dispatch.
+_current_shard_id: ContextVar[typing.Optional[int]] = ContextVar('volt_shard_id', default=None)
+
+
+def current_shard_id() -> typing.Optional[int]:
+    """
+    Get shard id which received the event currently handled by listener.
+    :return: shard id, or None if gateway is not sharded.
+    """
+    return _current_shard_id.get()
+
 class GatewayEvents(Enum):
     def _generate_next_value_(name, start, count, last_values):
         return name
@@ -29,11 +49,91 @@ class GatewayEvents(Enum):
         return cls.__members__.keys()
 
 
+def ordering_key(event_name: str, data: typing.Any) -> typing.Any:
+    """
+    Get key of event whose order is kept in worker dispatch mode. Guild id, or channel id of events outside guilds.
+    Ids are normalized to int, because etf payloads decoded with snowflake conversion have int ids, while other payloads have string ids.
+    :return: ordering key, or None if event belongs to no guild nor channel.
+    """
+    if not isinstance(data, dict):
+        return None
+    if event_name in GUILD_ID_EVENTS:
+        key = data.get('id')
+    else:
+        key = data.get('guild_id') or data.get('channel_id')
+    return int(key) if key is not None else None
+
+
+class EventWorker:
+    """
+    Consumer coroutine of worker dispatch mode. Handles events of its queue one by one, in dispatched order.
+    """
+
+    def __init__(self, index: int, latency_window: int = 128, queue_size: int = DEFAULT_WORKER_QUEUE_SIZE):
+        self.index = index
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.processed: int = 0
+        self.failed: int = 0
+        # Time from dispatch to start of handling, and time spent in listeners, in seconds.
+        self.wait_times: RollingStats = RollingStats(size=latency_window)
+        self.latencies: RollingStats = RollingStats(size=latency_window)
+        self.task: typing.Optional[asyncio.Task] = None
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        return {
+            'depth': self.depth,
+            'processed': self.processed,
+            'failed': self.failed,
+            'wait': self.wait_times.snapshot(),
+            'latency': self.latencies.snapshot()
+        }
+
+
 class EventManager:
-    def __init__(self, gateway):
+    def __init__(self, gateway, workers: typing.Optional[int] = None, queue_size: int = DEFAULT_WORKER_QUEUE_SIZE):
+        """
+        :param gateway: gateway (or shard manager) dispatching events.
+        :param workers: number of worker coroutines. If given, listeners run in a fixed pool of workers instead of a task per event.
+            Events of the same guild (or channel, outside guilds) go to the same worker and are handled in dispatched order,
+            one at a time. Listeners of an event are awaited in registration order.
+        :param queue_size: maximum queued events per worker. Event dispatched into a full queue is not dropped :
+            `dispatch()` returns an awaitable which waits for room in the queue, so dispatching source stops reading until workers catch up.
+        """
+        self.logger = get_logger('volt.events', stream_level=DEBUG)
         self.gateway = gateway
         self.listeners = {event: [] for event in GatewayEvents.event_names()}
+        # Events consumed internally (ex: cache), regardless of listeners : event name -> count of consumers.
+        # Counted, so removing one consumer (ex: hook) does not unsubscribe event another consumer (ex: gateway) needs.
+        self.consumers: typing.Dict[str, int] = {}
+        # Synchronous hooks called with raw event data before listeners. (ex: cache invalidation)
+        self.hooks: typing.Dict[str, typing.List[typing.Callable[[str, typing.Any], None]]] = {}
         self.loop = asyncio.get_running_loop()
+        # Frozen routing table of dispatch : event name -> (hooks, listeners), only for events with any of them.
+        # Rebuilt when listeners or hooks change, so dispatch does not copy or check lists for every event.
+        self.__routes: typing.Dict[str, typing.Tuple[typing.Tuple[typing.Callable, ...], typing.Tuple[CoroutineFunction, ...]]] = {}
+        self.queue_size = queue_size
+        self.workers: typing.Tuple[EventWorker, ...] = ()
+        # Set while every worker queue is below queue size.
+        self.__writable = asyncio.Event()
+        self.__writable.set()
+        # Workers of events without ordering key are chosen in turn.
+        self.__next_worker: int = 0
+        if workers is not None:
+            if workers < 1:
+                raise ValueError(f'Worker count must be positive, not {workers}.')
+            self.workers = tuple(EventWorker(index, queue_size=queue_size) for index in range(workers))
+            for worker in self.workers:
+                worker.task = self.loop.create_task(self._work(worker))
+
+    def _rebuild_routes(self):
+        routes = {}
+        for event_name in set(self.hooks) | {event for event, listeners in self.listeners.items() if listeners}:
+            routes[event_name] = (tuple(self.hooks.get(event_name, ())), tuple(self.listeners.get(event_name, ())))
+        self.__routes = routes
 
     def listen(self, event_name: str, listener: CoroutineFunction):
         if event_name not in self.listeners:
@@ -41,16 +141,177 @@ class EventManager:
         if not asyncio.iscoroutinefunction(listener):
             raise TypeError(f'Event listener must be a coroutine function, not {type(listener)}')
         self.listeners[event_name].append(listener)
+        self._rebuild_routes()
 
-    def dispatch(self, resp):
-        event_name, event_data = self.process_events(resp)
+    def remove_listener(self, event_name: str, listener: CoroutineFunction):
         listeners = self.listeners.get(event_name)
-        if listeners:
-            # Call listeners with proper params
-            self.loop.create_task(asyncio.gather(*map(
-                lambda l: l(event_data),
-                listeners
-            )))
+        if listeners and listener in listeners:
+            listeners.remove(listener)
+            self._rebuild_routes()
+
+    def add_consumer(self, event_name: str):
+        """
+        Register internal consumer of event. Consumed events are always decoded and dispatched.
+        Every call must be paired with `remove_consumer`.
+        :param event_name: gateway event name.
+        """
+        self.consumers[event_name] = self.consumers.get(event_name, 0) + 1
+
+    def remove_consumer(self, event_name: str):
+        count = self.consumers.get(event_name)
+        if count is None:
+            return
+        if count > 1:
+            self.consumers[event_name] = count - 1
+        else:
+            del self.consumers[event_name]
+
+    def add_hook(self, event_name: str, hook: typing.Callable[[str, typing.Any], None]):
+        """
+        Register synchronous hook of event. Hooks are called with event name & raw event data, before listeners.
+        Hooked events are consumed, so they are always decoded.
+        :param event_name: gateway event name. Unlike listeners, any event name is allowed.
+        :param hook: hook function.
+        """
+        self.hooks.setdefault(event_name, []).append(hook)
+        self.add_consumer(event_name)
+        self._rebuild_routes()
+
+    def remove_hook(self, event_name: str, hook: typing.Callable[[str, typing.Any], None]):
+        hooks = self.hooks.get(event_name)
+        if hooks and hook in hooks:
+            hooks.remove(hook)
+            if not hooks:
+                del self.hooks[event_name]
+            self.remove_consumer(event_name)
+            self._rebuild_routes()
+
+    def is_subscribed(self, event_name: typing.Optional[str]) -> bool:
+        """
+        Check whether any listener or consumer is registered on event.
+        Gateway drops payloads of unsubscribed events before decoding them.
+        :param event_name: gateway event name.
+        """
+        return event_name in self.consumers or event_name in self.__routes
+
+    def dispatch(self, resp, shard_id: typing.Optional[int] = None) -> typing.Optional[typing.Awaitable[None]]:
+        """
+        Run hooks of event, and schedule its listeners.
+        In worker mode, returns an awaitable if queue of the worker is full. Dispatching source must await it before dispatching more events.
+        :param resp: gateway response of the event.
+        :param shard_id: id of the shard which received the event.
+        """
+        route = self.__routes.get(resp.t)
+        if route is None:
+            return
+        hooks, listeners = route
+        for hook in hooks:
+            try:
+                hook(resp.t, resp.data)
+            except Exception:
+                # Failing hook must not stop other hooks, listeners, nor the gateway receiving the event.
+                self.logger.exception(f'Event hook {hook!r} of {resp.t} failed.')
+        if not listeners:
+            return
+        event_name, event_data = self.process_events(resp)
+        if event_name != resp.t:
+            listeners = self.listeners.get(event_name, ())
+        if self.workers:
+            return self._enqueue(ordering_key(resp.t, resp.data), listeners, event_data, shard_id)
+        # Listener task copies current context, so listeners can read shard id using `current_shard_id()`.
+        # Context is switched only if it holds other shard id. (ex: unsharded gateway never switches it)
+        if _current_shard_id.get() == shard_id:
+            self._create_tasks(listeners, event_data)
+            return
+        token = _current_shard_id.set(shard_id)
+        try:
+            self._create_tasks(listeners, event_data)
+        finally:
+            _current_shard_id.reset(token)
+
+    def _create_tasks(self, listeners: typing.Sequence[CoroutineFunction], event_data: typing.Any):
+        # Each listener runs in its own task. Single listener, the common case, skips the loop.
+        if len(listeners) == 1:
+            self.loop.create_task(listeners[0](event_data))
+            return
+        for listener in listeners:
+            self.loop.create_task(listener(event_data))
+
+    def _enqueue(
+        self, key: typing.Any, listeners: typing.Sequence[CoroutineFunction], event_data: typing.Any, shard_id: typing.Optional[int]
+    ) -> typing.Optional[typing.Awaitable[None]]:
+        if key is None:
+            index = self.__next_worker
+            self.__next_worker = (index + 1) % len(self.workers)
+        else:
+            index = hash(key) % len(self.workers)
+        worker = self.workers[index]
+        queue = worker.queue
+        item = (listeners, event_data, shard_id, time.perf_counter())
+        if queue.full():
+            # Several shards may share this queue : each waits for its own room, instead of overflowing the bound.
+            self.__writable.clear()
+            return self._put(queue, item)
+        queue.put_nowait(item)
+        if queue.full():
+            self.__writable.clear()
+        return None
+
+    async def _put(self, queue: asyncio.Queue, item: tuple):
+        await queue.put(item)
+        if queue.full():
+            self.__writable.clear()
+
+    async def _work(self, worker: EventWorker):
+        queue = worker.queue
+        while True:
+            listeners, event_data, shard_id, dispatched_at = await queue.get()
+            if not self.__writable.is_set() and not any(w.queue.full() for w in self.workers):
+                self.__writable.set()
+            # Worker task has its own context, so listeners read shard id of this event using `current_shard_id()`.
+            _current_shard_id.set(shard_id)
+            started = time.perf_counter()
+            worker.wait_times.add(started - dispatched_at)
+            for listener in listeners:
+                try:
+                    await listener(event_data)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    worker.failed += 1
+                    self.logger.exception(f'Event listener {listener!r} of worker {worker.index} failed.')
+            worker.latencies.add(time.perf_counter() - started)
+            worker.processed += 1
+
+    @property
+    def congested(self) -> bool:
+        """
+        Whether any worker queue is full. Events routed to a full queue wait in `dispatch()` until the worker catches up.
+        """
+        return not self.__writable.is_set()
+
+    async def drain(self):
+        """
+        Wait until every worker queue is below queue size. Returns immediately if workers are not used.
+        Gateway stops reading frames while waiting, so backlog stays in bounded queues and socket buffers.
+        """
+        await self.__writable.wait()
+
+    def worker_stats(self) -> typing.List[typing.Dict[str, typing.Any]]:
+        """
+        Get queue depth, handled event counts, and percentiles of wait & handling latency of each worker.
+        """
+        return [worker.stats() for worker in self.workers]
+
+    async def close(self):
+        """
+        Stop workers. Queued events are dropped.
+        """
+        for worker in self.workers:
+            if worker.task is not None:
+                worker.task.cancel()
+        await asyncio.gather(*(worker.task for worker in self.workers if worker.task is not None), return_exceptions=True)
+        self.__writable.set()
 
     @staticmethod
     def process_events(resp) -> typing.Tuple[str, typing.Any]:
@@ -0,0 +1,150 @@
+"""
+Attachments streamed into multipart requests.
+Files are read chunk by chunk while request is written, so memory used by upload does not grow with file size.
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+from typing import AsyncIterable, AsyncIterator, BinaryIO, Callable, Final, List, Optional, Sequence, Union
+
+import aiohttp
+
+from volt import codec
+from volt.types.type_hint import JSON
+
+
+__all__ = (
+    'File',
+    'multipart'
+)
+
+FILE_CHUNK_SIZE: Final[int] = 64 * 1024
+
+FileSource = Union[str, os.PathLike, BinaryIO, AsyncIterable[bytes], Callable[[], AsyncIterable[bytes]]]
+
+
+async def _read_file(fp: BinaryIO, close: bool) -> AsyncIterator[bytes]:
+    loop = asyncio.get_running_loop()
+    try:
+        while chunk := await loop.run_in_executor(None, fp.read, FILE_CHUNK_SIZE):
+            yield chunk
+    finally:
+        if close:
+            fp.close()
+
+
+async def _read_path(path: Union[str, os.PathLike]) -> AsyncIterator[bytes]:
+    fp = await asyncio.get_running_loop().run_in_executor(None, open, path, 'rb')
+    async for chunk in _read_file(fp, True):
+        yield chunk
+
+
+class File:
+    """
+    Attachment of message, streamed from file path, binary file object or async iterable of bytes.
+    Paths are reopened and seekable file objects are rewound on every attempt, so retried requests re-stream from source.
+    Async iterables can be streamed only once. Pass a function returning new async iterable to make them retryable.
+    """
+
+    def __init__(
+            self,
+            source: FileSource,
+            filename: Optional[str] = None,
+            description: Optional[str] = None,
+            spoiler: bool = False,
+            content_type: str = 'application/octet-stream'
+    ):
+        """
+        :param source: file path, binary file object, async iterable of bytes or function returning it.
+        :param filename: file name shown in discord. Defaults to name of path or file object.
+        :param description: attachment description. (alt text)
+        :param spoiler: mark attachment as spoiler.
+        :param content_type: content type of file.
+        """
+        if filename is None:
+            name = source if isinstance(source, (str, os.PathLike)) else getattr(source, 'name', None)
+            if not isinstance(name, (str, os.PathLike)):
+                raise ValueError('filename is required for file source without name.')
+            filename = os.path.basename(name)
+        if spoiler and not filename.startswith('SPOILER_'):
+            filename = f'SPOILER_{filename}'
+        self.source: FileSource = source
+        self.filename: str = filename
+        self.description: Optional[str] = description
+        self.content_type: str = content_type
+        # Start position of seekable file object. Rewound to this on every attempt.
+        self.__position: Optional[int] = source.tell() if isinstance(source, io.IOBase) and source.seekable() else None
+        self.__streamed: bool = False
+
+    def __repr__(self) -> str:
+        return f'File({self.filename!r})'
+
+    def stream(self) -> AsyncIterator[bytes]:
+        """
+        Get chunks of file for new attempt.
+        :raise ValueError: source cannot be streamed again.
+        """
+        source = self.source
+        if isinstance(source, (str, os.PathLike)):
+            return _read_path(source)
+        if callable(source) and not hasattr(source, '__aiter__'):
+            return source().__aiter__()
+        if self.__streamed and self.__position is None:
+            raise ValueError(f'{self!r} is already streamed, and its source cannot be rewound.')
+        self.__streamed = True
+        if isinstance(source, io.IOBase) or not hasattr(source, '__aiter__'):
+            if self.__position is not None:
+                source.seek(self.__position)
+            return _read_file(source, False)
+        return source.__aiter__()
+
+    @property
+    def rewindable(self) -> bool:
+        """
+        Whether file can be read more than once. (path, seekable file object or function returning async iterable)
+        """
+        return isinstance(self.source, (str, os.PathLike)) or self.__position is not None or (
+            callable(self.source) and not hasattr(self.source, '__aiter__')
+        )
+
+    async def digest(self) -> Optional[str]:
+        """
+        Get sha256 of file content, reading it in chunks.
+        :return: hex digest, or None if file cannot be read again for upload.
+        """
+        if not self.rewindable:
+            return None
+        sha256 = hashlib.sha256()
+        async for chunk in self.stream():
+            sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def to_attachment(self, attachment_id: int) -> JSON:
+        attachment = {'id': attachment_id, 'filename': self.filename}
+        if self.description is not None:
+            attachment['description'] = self.description
+        return attachment
+
+
+def multipart(payload: Optional[JSON], files: Sequence[File]) -> aiohttp.MultipartWriter:
+    """
+    Build multipart body of json payload & files. Build new body for every attempt, so files are streamed again.
+    :param payload: json payload, sent as `payload_json` part.
+    :param files: files, sent as `files[n]` parts.
+    :return: multipart writer streaming files.
+    """
+    payload = dict(payload) if payload else {}
+    # Keep attachments already in payload. (ex: existing attachments kept on edit)
+    attachments: List[JSON] = list(payload.get('attachments', ()))
+    attachments.extend(file.to_attachment(index) for index, file in enumerate(files))
+    payload['attachments'] = attachments
+
+    writer = aiohttp.MultipartWriter('form-data')
+    part = writer.append(codec.dumps_bytes(payload), {'Content-Type': 'application/json'})
+    part.set_content_disposition('form-data', name='payload_json')
+    for index, file in enumerate(files):
+        part = writer.append(file.stream(), {'Content-Type': file.content_type})
+        part.set_content_disposition('form-data', name=f'files[{index}]', filename=file.filename)
+    return writer
@@ -1,14 +1,24 @@
 import asyncio
-import json
+import re
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from abc import ABCMeta, abstractmethod
 from enum import IntEnum, IntFlag, Enum
 from random import random
-from typing import Final, List
+from typing import Any, Callable, Final, List, Optional, Union, Dict, Tuple, Set, Sequence
 
 import aiohttp
 
+from volt import codec, etf
 from volt.events import EventManager
+from volt.ratelimit import CommandPriority, GatewaySendQueue
+from volt.recorder import FrameRecorder
+from volt.types.type_hint import JSON, CoroutineFunction
 from volt.utils.log import get_logger, DEBUG
 from volt.utils.loop_task import loop, LoopTask
+from volt.utils.stats import RollingStats
 
 
 class WSClosedError(Exception):
@@ -19,6 +29,154 @@ class WSClosedError(Exception):
         super(WSClosedError, self).__init__(f'Websocket is closed with data {self.data}.')
 
 
+DEFAULT_GATEWAY_URL: Final[str] = 'wss://gateway.discord.gg'
+# Reconnect backoff, in seconds.
+RECONNECT_BACKOFF_BASE: Final[float] = 1.0
+RECONNECT_BACKOFF_MAX: Final[float] = 60.0
+# Keepalive thread warns when event loop lags more than this, in seconds.
+LOOP_LAG_WARNING_SECONDS: Final[float] = 1.0
+# Client side close code used to reconnect. Non-1000 close code keeps the session resumable.
+RESUMABLE_CLOSE_CODE: Final[int] = 4000
+# Close codes which cannot be recovered by reconnecting. (Authentication failed, invalid shard, sharding required, invalid api version, invalid / disallowed intents)
+FATAL_CLOSE_CODES: Final[frozenset] = frozenset({4004, 4010, 4011, 4012, 4013, 4014})
+# Close codes which invalidate session. Reconnect with identify instead of resume. (Invalid seq, session timed out)
+SESSION_INVALIDATING_CLOSE_CODES: Final[frozenset] = frozenset({4007, 4009})
+
+ZLIB_SUFFIX: Final[bytes] = b'\x00\x00\xff\xff'
+GATEWAY_COMPRESSIONS: Final[tuple] = ('zlib-stream',)
+
+
+class ZlibStreamInflator:
+    """
+    Inflate context of `zlib-stream` transport compression.
+    Discord compresses the whole connection as a single zlib stream, so one context must be shared by every frame of the connection.
+    """
+    __slots__ = ('_inflator', '_buffer', '_length')
+
+    def __init__(self, buffer_size: int = 64 * 1024):
+        self._inflator = zlib.decompressobj()
+        self._buffer: bytearray = bytearray(buffer_size)     # Preallocated, reused for every message.
+        self._length: int = 0
+
+    def feed(self, data: bytes) -> Optional[bytes]:
+        """
+        Feed a binary websocket frame into the inflate context.
+        :param data: raw frame data.
+        :return: decompressed message if the frame completes a message (ends with zlib suffix), otherwise None.
+        """
+        end = self._length + len(data)
+        if end > len(self._buffer):
+            # Grow buffer at least twice, so large messages (GUILD_CREATE) do not grow buffer on every frame.
+            self._buffer.extend(bytes(max(end, len(self._buffer) * 2) - len(self._buffer)))
+        self._buffer[self._length:end] = data
+        self._length = end
+        if end < 4 or self._buffer[end - 4:end] != ZLIB_SUFFIX:
+            # Message is split into several frames. Wait for the rest.
+            return None
+
+        self._length = 0
+        with memoryview(self._buffer)[:end] as view:
+            return self._inflator.decompress(view)
+
+
+# (op, t, s) of gateway payload.
+GatewayHeader = Tuple[int, Optional[str], Optional[int]]
+
+
+class GatewayEncoding(metaclass=ABCMeta):
+    """
+    Codec of gateway payloads. Both received payloads and sent commands use the same codec.
+    """
+    # `encoding` query parameter value of gateway url.
+    name: str
+    # Whether payloads are sent as binary websocket frames.
+    binary: bool
+
+    @abstractmethod
+    def loads(self, data: Union[str, bytes]) -> JSON:  ...
+
+    @abstractmethod
+    def dumps(self, obj: JSON) -> Union[str, bytes]:    ...
+
+    def peek(self, data: Union[str, bytes]) -> Optional[GatewayHeader]:
+        """
+        Read only the header (op, t, s) of payload, without decoding `d`.
+        :param data: raw payload.
+        :return: header tuple, or None if header cannot be read cheaply. Payload should be fully decoded in that case.
+        """
+        return None
+
+
+# Header field of json payload. Discord sends header fields (t, s, op) before `d`.
+_JSON_HEADER_FIELD_STR: Final[re.Pattern] = re.compile(r'\s*"(t|s|op)"\s*:\s*(?:null|"([A-Z0-9_]+)"|(\d+))\s*,')
+_JSON_HEADER_FIELD_BYTES: Final[re.Pattern] = re.compile(_JSON_HEADER_FIELD_STR.pattern.encode())
+
+
+class JsonEncoding(GatewayEncoding):
+    name = 'json'
+    binary = False
+
+    def loads(self, data: Union[str, bytes]) -> JSON:
+        return codec.loads(data)
+
+    def dumps(self, obj: JSON) -> bytes:
+        return codec.dumps_bytes(obj)
+
+    def peek(self, data: Union[str, bytes]) -> Optional[GatewayHeader]:
+        if isinstance(data, str):
+            pattern, brace = _JSON_HEADER_FIELD_STR, '{'
+        else:
+            pattern, brace = _JSON_HEADER_FIELD_BYTES, b'{'
+        if not data.startswith(brace):
+            return None
+        header = {}
+        pos = 1
+        while len(header) < 3:
+            match = pattern.match(data, pos)
+            if match is None:
+                return None     # Unexpected field order. Fallback to full decode.
+            key, name, number = match.groups()
+            if isinstance(key, bytes):
+                key = key.decode()
+                name = name.decode() if name is not None else None
+            header[key] = int(number) if number is not None else name
+            pos = match.end()
+        return header['op'], header['t'], header['s']
+
+
+class EtfEncoding(GatewayEncoding):
+    name = 'etf'
+    binary = True
+
+    def __init__(self, snowflakes: bool = False):
+        """
+        :param snowflakes: if True, snowflake fields (`id`, `*_id`) of received payloads are decoded into int.
+            Pass `encoding=EtfEncoding(snowflakes=True)` into GatewayBot (or ShardManager's gateway options) to enable it.
+        """
+        self.snowflakes: Final[bool] = snowflakes
+
+    def loads(self, data: Union[str, bytes]) -> JSON:
+        return etf.decode(data, self.snowflakes)
+
+    def dumps(self, obj: JSON) -> bytes:
+        return etf.encode(obj)
+
+    def peek(self, data: Union[str, bytes]) -> Optional[GatewayHeader]:
+        header = etf.decode_header(data)
+        if header is None or 'op' not in header:
+            return None
+        return header['op'], header.get('t'), header.get('s')
+
+
+# aiohttp >= 3.11 can send pre-encoded bytes as text frame.
+_SEND_FRAME_SUPPORTED: Final[bool] = hasattr(aiohttp.ClientWebSocketResponse, 'send_frame')
+
+GATEWAY_ENCODINGS: Final[Dict[str, GatewayEncoding]] = {
+    'json': JsonEncoding(),
+    'etf': EtfEncoding()
+}
+
+
 class GatewayOpcodes(IntEnum):
     """
     discord gateway events.
@@ -50,8 +208,8 @@ class GatewayEvents(Enum):
 class GatewayResponse:
     __slots__ = ('op', 'data', 's', 't')
 
-    def __init__(self, data: str):
-        json_data = json.loads(data)
+    def __init__(self, data: Union[str, bytes], encoding: GatewayEncoding = GATEWAY_ENCODINGS['json']):
+        json_data = encoding.loads(data)
         self.op: GatewayOpcodes = GatewayOpcodes(json_data['op'])
         self.data = json_data.get('d')
         self.s = json_data.get('s')
@@ -86,42 +244,275 @@ class GatewayIntents(IntFlag):
         return GatewayIntents(sum(cls.__members__.values()))
 
 
+class KeepAliveThread(threading.Thread):
+    """
+    Sends heartbeats of GatewayBot from a dedicated thread, so heartbeat timing does not depend on event loop timers.
+    asyncio transports are not thread-safe, so frames are scheduled into the event loop thread-safely.
+    The thread also measures how far the event loop is lagging behind, and never treats a connection as zombie
+    only because the event loop was too busy to read the acknowledgement.
+    """
+
+    def __init__(self, gateway: 'GatewayBot', interval: float, loop: asyncio.AbstractEventLoop):
+        super(KeepAliveThread, self).__init__(name=f'volt-keepalive-{gateway.shard_id or 0}', daemon=True)
+        self.gateway = gateway
+        self.interval = interval
+        self.loop = loop
+        # Event loop lag samples, in seconds.
+        self.lag_stats: RollingStats = RollingStats()
+        self._stopped = threading.Event()
+        self._last_send: Optional[Future] = None
+        self._lag_probe_since: Optional[float] = None
+
+    def stop(self):
+        self._stopped.set()
+
+    def _on_lag_probe(self, scheduled_at: float):
+        self.lag_stats.add(time.monotonic() - scheduled_at)
+        self._lag_probe_since = None
+
+    @property
+    def loop_lag(self) -> float:
+        """
+        Current event loop lag, in seconds. If a probe is still pending, loop is blocked at least since then.
+        """
+        pending = self._lag_probe_since
+        if pending is not None:
+            return time.monotonic() - pending
+        return self.lag_stats.last or 0.0
+
+    def _probe_lag(self):
+        if self._lag_probe_since is not None:
+            return  # Previous probe is not handled yet.
+        now = self._lag_probe_since = time.monotonic()
+        self.loop.call_soon_threadsafe(self._on_lag_probe, now)
+
+    def run(self):
+        # Client must send first heartbeat in heartbeat_interval * random.random().
+        if self._stopped.wait(self.interval * random()):
+            return
+        while not self._stopped.is_set():
+            lag = self.loop_lag
+            if lag > LOOP_LAG_WARNING_SECONDS:
+                self.gateway.logger.warning(f'Event loop is lagging {lag:.2f} seconds behind. Heartbeats are delayed.')
+            if self._last_send is not None and not self._last_send.done():
+                # Previous heartbeat is still waiting for the event loop. Do not queue more heartbeats.
+                pass
+            elif not self.gateway.heartbeat_acked and lag < self.interval:
+                # Loop was responsive, but heartbeat is not acknowledged. Connection is zombie.
+                asyncio.run_coroutine_threadsafe(self.gateway.close_zombie(), self.loop)
+                return
+            else:
+                self._last_send = asyncio.run_coroutine_threadsafe(self.gateway.send_heartbeat(), self.loop)
+            self._probe_lag()
+            self._stopped.wait(self.interval)
+
+
 class GatewayBot:
-    def __init__(self, token: str, version: int = 9, intents: GatewayIntents = GatewayIntents.all()):
+    def __init__(
+            self,
+            token: str,
+            version: int = 9,
+            intents: GatewayIntents = GatewayIntents.all(),
+            compress: Optional[str] = None,
+            encoding: Union[str, GatewayEncoding] = 'json',
+            filter_events: bool = True,
+            shard: Optional[Tuple[int, int]] = None,
+            session: Optional[aiohttp.ClientSession] = None,
+            event_manager: Optional[EventManager] = None,
+            before_identify: Optional[CoroutineFunction] = None,
+            latency_window: int = 128,
+            keepalive_thread: bool = False,
+            gateway_url: str = DEFAULT_GATEWAY_URL,
+            record: Optional[str] = None
+    ):
+        if isinstance(encoding, str):
+            if encoding not in GATEWAY_ENCODINGS:
+                raise ValueError(f'Unsupported gateway encoding {encoding}. Supported encodings : {tuple(GATEWAY_ENCODINGS)}')
+            encoding = GATEWAY_ENCODINGS[encoding]
+        if compress is not None and compress not in GATEWAY_COMPRESSIONS:
+            raise ValueError(f'Unsupported gateway compression {compress}. Supported compressions : {GATEWAY_COMPRESSIONS}')
         self.logger = get_logger('volt.gateway', stream=True, stream_level=DEBUG)
         self.loop = asyncio.get_event_loop()
         self.gateway_version: Final[int] = version
         self.intents = intents
-        self.__session = None
+        self.compress: Final[Optional[str]] = compress
+        self.encoding: Final[GatewayEncoding] = encoding
+        # Drop DISPATCH payloads nobody subscribes, before decoding them.
+        self.filter_events: bool = filter_events
+        # [shard_id, shard_count] sent on identify. None if bot is not sharded.
+        self.shard: Final[Optional[Tuple[int, int]]] = shard
+        # Coroutine function awaited before sending identify. Used by ShardManager to schedule identifies.
+        self.before_identify: Optional[CoroutineFunction] = before_identify
+        self.__inflator: Optional[ZlibStreamInflator] = None
+        self.__session: Optional[aiohttp.ClientSession] = session
+        # Shared session is owned by creator (ex: ShardManager). Do not close it on disconnect.
+        self.__owns_session: bool = session is None
         self.__token: Final[str] = token
         self.__hearbeat_interval: int = 0
         self.__closed: bool = False
         self.__ws: aiohttp.ClientWebSocketResponse = None
+        self.__last_seq: Optional[int] = None
+        self._ping: Optional[float] = None
+        # Heartbeat round trip times, in seconds.
+        self.latency_histogram: RollingStats = RollingStats(size=latency_window)
+        self.__heartbeat_sent_at: Optional[float] = None
+        self.__heartbeat_acked: bool = True
+        self.heartbeat_sender: Optional[LoopTask] = None
+        self.__heartbeat_task: Optional[asyncio.Task] = None
+        # Send heartbeats from a dedicated thread instead of LoopTask.
+        self.keepalive_thread: bool = keepalive_thread
+        self.__keepalive: Optional[KeepAliveThread] = None
+        # Outbound command scheduler of current connection.
+        self.__send_queue: Optional[GatewaySendQueue] = None
+        # Gateway url used to identify. Can be pointed to local gateway for testing & benchmarks.
+        self.base_gateway_url: Final[str] = gateway_url.rstrip('/')
+        # Session info used to resume. Set on READY.
+        self.session_id: Optional[str] = None
+        self.gateway_url: str = self.base_gateway_url
+        # Appends every raw frame received into file, for offline replay. (See volt.replay)
+        self.recorder: Optional[FrameRecorder] = FrameRecorder(record) if record is not None else None
+        self.event_manager = event_manager or EventManager(gateway=self)
+        # Events consumed by gateway itself. These must not be filtered.
+        self.event_manager.add_consumer('READY')
+        self.event_manager.add_consumer('RESUMED')
+        self.event_manager.add_consumer('GUILD_CREATE')
+        self.event_manager.add_consumer('GUILD_DELETE')
+        # Ids of guilds this bot (shard) is in.
+        self.guild_ids: Set[int] = set()
+
+    @property
+    def shard_id(self) -> Optional[int]:
+        return self.shard[0] if self.shard is not None else None
+
+    @property
+    def latency(self) -> Optional[float]:
+        """
+        Round trip time of the latest acknowledged heartbeat, in seconds. None if no heartbeat is acknowledged yet.
+        """
+        return self._ping
+
+    @property
+    def latency_stats(self) -> Dict[str, Optional[float]]:
+        """
+        Statistics (count, min, mean, p50, p90, p99, max) of recent heartbeat round trip times, in seconds.
+        """
+        return self.latency_histogram.snapshot()
+
+    @property
+    def heartbeat_acked(self) -> bool:
+        return self.__heartbeat_acked
+
+    @property
+    def loop_lag(self) -> Optional[float]:
+        """
+        Event loop lag measured by keepalive thread, in seconds. None if keepalive thread is not used.
+        """
+        return self.__keepalive.loop_lag if self.__keepalive is not None else None
+
+    @property
+    def loop_lag_stats(self) -> Optional[Dict[str, Optional[float]]]:
+        return self.__keepalive.lag_stats.snapshot() if self.__keepalive is not None else None
+
+    @property
+    def send_queue_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Queue depth, wait time statistics and remaining tokens of outbound command queue. None if not connected.
+        """
+        return self.__send_queue.stats() if self.__send_queue is not None else None
+
+    @property
+    def can_resume(self) -> bool:
+        return self.session_id is not None and self.__last_seq is not None
+
+    def invalidate_session(self):
+        """
+        Forget current session. Next connection identifies again instead of resuming.
+        """
+        self.session_id = None
         self.__last_seq = None
-        self._ping = None
-        self.heartbeat_sender = None
-        self.event_manager = EventManager(gateway=self)
+        # New session must be identified on base gateway url, not resume gateway url.
+        self.gateway_url = self.base_gateway_url
 
     async def connect(self):
         self.logger.debug('')
-        self.__session = aiohttp.ClientSession()
-        self.__ws = await self.__session.ws_connect(
-            f'wss://gateway.discord.gg/?v={self.gateway_version}&encoding=json'
-        )
-
-    async def disconnect(self):
+        if self.__session is None or self.__session.closed:
+            self.__session = aiohttp.ClientSession()
+            self.__owns_session = True
+        url = f'{self.gateway_url}/?v={self.gateway_version}&encoding={self.encoding.name}'
+        if self.compress is not None:
+            url += f'&compress={self.compress}'
+            # zlib stream lives as long as the connection does. New connection needs new inflate context.
+            self.__inflator = ZlibStreamInflator()
+        self.__ws = await self.__session.ws_connect(url)
+        if self.recorder is not None:
+            self.recorder.connection(self.encoding.name, self.compress)
+        # Command limit is applied per connection.
+        self.__send_queue = GatewaySendQueue(self._write)
+        self.__send_queue.start()
+
+    async def disconnect(self, code: int = 1000):
+        """
+        Close current connection.
+        :param code: websocket close code. Closing with 1000 or 1001 invalidates the session; use other codes to resume later.
+        """
         if self.heartbeat_sender:
             self.heartbeat_sender.cancel()
+            self.__heartbeat_task.cancel()
+            self.heartbeat_sender = None
+        if self.__keepalive:
+            self.__keepalive.stop()
+            self.__keepalive = None
+        if self.__send_queue:
+            self.__send_queue.stop()
+            self.__send_queue = None
         if self.__ws:
-            await self.__ws.close()
-        if self.__session:
+            await self.__ws.close(code=code)
+        if self.__session and self.__owns_session:
             await self.__session.close()
+        if self.recorder is not None:
+            if self.__closed:
+                self.recorder.close()
+            else:
+                self.recorder.flush()
         # Should we close event loop?
 
+    async def send(
+            self,
+            payload: JSON,
+            priority: CommandPriority = CommandPriority.NORMAL,
+            on_send: Optional[Callable[[], Any]] = None
+    ):
+        """
+        Send gateway command through outbound command queue. Returns when the command is written.
+        :param payload: gateway command payload.
+        :param priority: priority lane of command. CRITICAL commands are always sent first.
+        :param on_send: function called right before the command is written.
+        """
+        if self.__send_queue is None:
+            raise ConnectionResetError('Gateway is not connected.')
+        await self.__send_queue.put(payload, priority, on_send)
+
+    async def _write(self, payload: JSON):
+        """
+        Write gateway command into websocket, encoded with gateway encoding of this bot.
+        """
+        data = self.encoding.dumps(payload)
+        if self.encoding.binary:
+            await self.__ws.send_bytes(data)
+        elif isinstance(data, str):
+            await self.__ws.send_str(data)
+        elif _SEND_FRAME_SUPPORTED:
+            # Send encoded bytes as text frame directly. Skips bytes -> str -> bytes round trip.
+            await self.__ws.send_frame(data, aiohttp.WSMsgType.TEXT)
+        else:
+            await self.__ws.send_str(data.decode('utf-8'))
+
     async def identify(self):
+        if self.before_identify is not None:
+            await self.before_identify(self)
         self.logger.debug('Send `Identify`.')
         from platform import system
-        await self.__ws.send_json({
+        payload = {
             'op': GatewayOpcodes.IDENTIFY.value,
             'd': {
                 'token': self.__token,
@@ -132,59 +523,245 @@ class GatewayBot:
                     '$device': 'volt.py'
                 }
             }
-        })
+        }
+        if self.shard is not None:
+            payload['d']['shard'] = list(self.shard)
+        await self.send(payload, CommandPriority.CRITICAL)
+
+    async def resume(self):
+        self.logger.debug(f'Send `Resume` of session {self.session_id} from sequence {self.__last_seq}.')
+        await self.send({
+            'op': GatewayOpcodes.RESUME.value,
+            'd': {
+                'token': self.__token,
+                'session_id': self.session_id,
+                'seq': self.__last_seq
+            }
+        }, CommandPriority.CRITICAL)
+
+    async def close_zombie(self):
+        """
+        Close connection whose heartbeat is not acknowledged. run() reconnects and resumes the session.
+        """
+        self.logger.warning(f'Heartbeat is not acknowledged in {self.__hearbeat_interval} ms. Reconnecting zombie connection.')
+        await self.__ws.close(code=RESUMABLE_CLOSE_CODE)
+
+    def _on_heartbeat_sent(self):
+        self.__heartbeat_sent_at = time.monotonic()
+        self.__heartbeat_acked = False
+
+    async def send_heartbeat(self):
+        await self.send({
+            'op': GatewayOpcodes.HEARTBEAT.value,
+            'd': self.__last_seq
+        }, CommandPriority.CRITICAL, on_send=self._on_heartbeat_sent)
+
+    async def update_presence(self, status: str = 'online', activities: Optional[List[JSON]] = None, afk: bool = False, since: Optional[int] = None):
+        """
+        Send presence update.
+        :param status: `online`, `dnd`, `idle`, `invisible` or `offline`.
+        :param activities: list of activity objects.
+        :param afk: whether the bot is afk.
+        :param since: unix time (in milliseconds) of when the bot went idle.
+        """
+        await self.send({
+            'op': GatewayOpcodes.PRESENCE.value,
+            'd': {
+                'since': since,
+                'activities': activities or [],
+                'status': status,
+                'afk': afk
+            }
+        }, CommandPriority.NORMAL)
+
+    async def request_guild_members(
+            self,
+            guild_id: int,
+            query: Optional[str] = '',
+            limit: int = 0,
+            presences: bool = False,
+            user_ids: Optional[Sequence[int]] = None,
+            nonce: Optional[str] = None
+    ):
+        """
+        Request guild members. Members are sent in GUILD_MEMBERS_CHUNK events.
+        Requests are paced in bulk lane, so they never delay heartbeats or presence updates.
+        """
+        data = {
+            'guild_id': str(guild_id),
+            'limit': limit,
+            'presences': presences
+        }
+        if user_ids is not None:
+            data['user_ids'] = [str(user_id) for user_id in user_ids]
+        else:
+            data['query'] = query
+        if nonce is not None:
+            data['nonce'] = nonce
+        await self.send({
+            'op': GatewayOpcodes.REQUEST_MEMBERS.value,
+            'd': data
+        }, CommandPriority.BULK)
 
     async def run(self):
-        await self.connect()
+        """
+        Connect to gateway and receive events until closed.
+        Lost connections are reconnected with exponential backoff, and resume their session if possible.
+        """
+        backoff = RECONNECT_BACKOFF_BASE
+        while not self.__closed:
+            try:
+                await self.connect()
+                await self.poll()
+                # Discord requested reconnect. Reconnect immediately.
+                backoff = RECONNECT_BACKOFF_BASE
+                continue
+            except WSClosedError as e:
+                if self.__closed:
+                    break
+                if e.data in FATAL_CLOSE_CODES:
+                    self.logger.error(f'Gateway closed with fatal close code {e.data}. Cannot reconnect.')
+                    raise
+                if e.data in SESSION_INVALIDATING_CLOSE_CODES:
+                    self.invalidate_session()
+                self.logger.warning(f'Gateway closed with close code {e.data}.')
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                self.logger.warning(f'Gateway connection failed : {e!r}')
+            finally:
+                # Keep session resumable unless bot is closed for good.
+                await self.disconnect(code=1000 if self.__closed else RESUMABLE_CLOSE_CODE)
+            if self.__closed:
+                break
+            delay = backoff * (1 + random())
+            self.logger.info(f'Reconnecting in {delay:.2f} seconds. (resume = {self.can_resume})')
+            await asyncio.sleep(delay)
+            backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX)
+
+    async def poll(self):
+        """
+        Receive and handle gateway payloads of current connection.
+        Returns when discord requests reconnect. Raises WSClosedError when connection is closed.
+        """
         while not self.__closed:
             resp = await self.receive()
-            self.logger.debug(f'Gateway Response : op = {resp.op}, d = {resp.data}')
+            self.logger.debug('Gateway Response : op = %s, d = %s', resp.op, resp.data)
             if resp.op is GatewayOpcodes.HELLO:
                 # Login please!
                 await self.login(resp)
             elif resp.op is GatewayOpcodes.DISPATCH:
+                self.handle_dispatch(resp)
                 # Dispatch events into internal event listeners.
-                self.event_manager.dispatch(resp)
+                waiting = self.event_manager.dispatch(resp, self.shard_id)
+                if waiting is not None:
+                    # Worker queue is full. Stop reading until it has room, so backlog does not grow in memory nor drop events.
+                    await waiting
+            elif resp.op is GatewayOpcodes.HEARTBEAT:
+                # Gateway requested heartbeat immediately.
+                await self.send_heartbeat()
             elif resp.op is GatewayOpcodes.HEARTBEAT_ACK:
                 # Gateway acknowledged heartbeat.
-                # TODO : Calculate ws ping.
-                self._ping = None
-        await self.disconnect()
+                self.__heartbeat_acked = True
+                if self.__heartbeat_sent_at is not None:
+                    self._ping = time.monotonic() - self.__heartbeat_sent_at
+                    self.latency_histogram.add(self._ping)
+                    self.__heartbeat_sent_at = None
+            elif resp.op is GatewayOpcodes.RECONNECT:
+                self.logger.info('Gateway requested reconnect.')
+                return
+            elif resp.op is GatewayOpcodes.INVALIDATE_SESSION:
+                # Client must wait 1~5 seconds before sending identify / resume.
+                await asyncio.sleep(1 + random() * 4)
+                if self.__closed:
+                    return
+                if resp.data and self.can_resume:
+                    self.logger.info('Session is invalidated, but resumable. Resume session.')
+                    await self.resume()
+                else:
+                    self.logger.info('Session is invalidated. Identify again.')
+                    self.invalidate_session()
+                    await self.identify()
+
+    def handle_dispatch(self, resp: GatewayResponse):
+        """
+        Update gateway state using dispatched events, before dispatching them into listeners.
+        """
+        if resp.t == 'READY':
+            self.session_id = resp.data['session_id']
+            self.gateway_url = resp.data.get('resume_gateway_url', self.gateway_url)
+            self.guild_ids = {int(guild['id']) for guild in resp.data['guilds']}
+        elif resp.t == 'RESUMED':
+            self.logger.info(f'Resumed session {self.session_id}.')
+        elif resp.t == 'GUILD_CREATE':
+            self.guild_ids.add(int(resp.data['id']))
+        elif resp.t == 'GUILD_DELETE' and not resp.data.get('unavailable'):
+            # Bot is removed from guild. (Unavailable guilds are still in the bot's guild list.)
+            self.guild_ids.discard(int(resp.data['id']))
 
     async def login(self, resp: GatewayResponse):
         # First Heartbeat
         self.__hearbeat_interval = resp.data['heartbeat_interval']
-        self.__last_seq = resp.s
-
-        @loop(seconds=self.__hearbeat_interval / 1000)
-        async def heartbeat_sender(self: 'GatewayBot'):
-            self.logger.debug('Sending heartbeat!')
-            await self.__ws.send_json({
-                'op': GatewayOpcodes.HEARTBEAT.value,
-                'd': self.__last_seq or None
-            })
 
-        self.heartbeat_sender = heartbeat_sender
-        self.heartbeat_sender.args = (self,)    # inject self.
-        heartbeat_sender.start()
-
-        @heartbeat_sender.before_invoke
-        async def before_heartbeat_sender(self: 'GatewayBot'):
-            await asyncio.sleep(self.__hearbeat_interval * random() / 1000)
-            await heartbeat_sender()    # Client must send first heartbeat in heartbeat_interval * random.random() milliseconds.
-
-        # Identify
-        await self.identify()
+        self.__heartbeat_acked = True
+        self.__heartbeat_sent_at = None
+
+        if self.keepalive_thread:
+            self.__keepalive = KeepAliveThread(self, self.__hearbeat_interval / 1000, asyncio.get_running_loop())
+            self.__keepalive.start()
+        else:
+            @loop(seconds=self.__hearbeat_interval / 1000)
+            async def heartbeat_sender(self: 'GatewayBot'):
+                if not self.__heartbeat_acked:
+                    # Previous heartbeat is not acknowledged. Connection is zombie; reconnect and resume.
+                    heartbeat_sender.cancel()
+                    await self.close_zombie()
+                    return
+                self.logger.debug('Sending heartbeat!')
+                await self.send_heartbeat()
+
+            @heartbeat_sender.before_invoke
+            async def before_heartbeat_sender(self: 'GatewayBot'):
+                # Client must send first heartbeat in heartbeat_interval * random.random() milliseconds.
+                await asyncio.sleep(self.__hearbeat_interval * random() / 1000)
+
+            self.heartbeat_sender = heartbeat_sender
+            self.__heartbeat_task = heartbeat_sender.start(self)    # inject self.
+
+        if self.can_resume:
+            await self.resume()
+        else:
+            # Identify
+            await self.identify()
 
     async def receive(self) -> GatewayResponse:
-        resp = await self.__ws.receive()
-        self.logger.debug(f'Raw gateway response = type = {resp.type}, data = {resp.data}')
-        if resp.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSING, aiohttp.WSMsgType.CLOSED):
-            await self.disconnect()
-            raise WSClosedError(resp.data or None)
-        resp_obj = GatewayResponse(resp.data)
-        return resp_obj
+        while True:
+            resp = await self.__ws.receive()
+            self.logger.debug('Raw gateway response = type = %s, data = %s', resp.type, resp.data)
+            if resp.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSING, aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                raise WSClosedError(self.__ws.close_code or resp.data or None)
+            if self.recorder is not None:
+                self.recorder.frame(resp.data)
+            if resp.type is aiohttp.WSMsgType.BINARY and self.__inflator is not None:
+                data = self.__inflator.feed(resp.data)
+                if data is None:
+                    continue    # Wait for the rest frames of the message.
+            else:
+                data = resp.data
+            if self.filter_events:
+                header = self.encoding.peek(data)
+                if header is not None and header[0] == GatewayOpcodes.DISPATCH and not self.event_manager.is_subscribed(header[1]):
+                    # Nobody consumes this event. Track sequence, and drop payload without decoding.
+                    if header[2] is not None:
+                        self.__last_seq = header[2]
+                    continue
+            # Decoded bytes are passed as-is. Gateway encodings can handle bytes directly.
+            resp_obj = GatewayResponse(data, self.encoding)
+            if resp_obj.s is not None:
+                self.__last_seq = resp_obj.s
+            return resp_obj
 
     async def close(self):
         # Stop sending heartbeats and wait to gracefully close.
         self.__closed = True
+        if self.__ws is not None and not self.__ws.closed:
+            # Wake up receive(), so run() can finish.
+            await self.__ws.close()
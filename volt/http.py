@@ -1,28 +1,723 @@
-from typing import Final, Optional
+import asyncio
+import time
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Final, Hashable, List, Mapping, Optional, Sequence, Tuple, Union
+from urllib.parse import quote
+
+import aiohttp
+
+from volt import codec
+from volt.concurrency import ConcurrencyController
+from volt.errors import DiscordHTTPError
+from volt.file import File, multipart
+from volt.ratelimit import RateLimitBackend, RateLimiter
+from volt.rest_cache import ResponseCache
+from volt.rest_pagination import paginate, paginate_split
+from volt.types.type_hint import JSON
+from volt.upload_cache import UploadCache
+from volt.utils.dtutil import time_snowflake, utcnow
+from volt.utils.stats import RollingStats
+from volt.utils.log import get_logger, DEBUG
+
+
+__all__ = (
+    'ApiRoute',
+    'HTTPSession',
+    'HTTPClient'
+)
+
+# Connection pool defaults of shared http session.
+DEFAULT_CONNECTOR_LIMIT: Final[int] = 100
+DEFAULT_KEEPALIVE_TIMEOUT: Final[float] = 60.0
+DEFAULT_DNS_CACHE_TTL: Final[int] = 300
+DEFAULT_REQUEST_TIMEOUT: Final[float] = 30.0
+USER_AGENT: Final[str] = 'DiscordBot (https://github.com/Lapis0875/volt.py, 0.1.0)'
+# Retry policy of REST requests.
+MAX_RETRIES: Final[int] = 5
+RETRY_STATUSES: Final[frozenset] = frozenset((500, 502, 503, 504))
+# Hedging policy. Duplicate is sent when request is slower than this percentile of recent latencies of its route.
+DEFAULT_HEDGE_PERCENTILE: Final[float] = 95.0
+HEDGE_LATENCY_SAMPLES: Final[int] = 128
+HEDGE_MIN_SAMPLES: Final[int] = 20
+_MISSING: Final[object] = object()
+
+
+def _decode_body(headers: Mapping[str, str], body: bytes) -> Any:
+    return codec.loads(body) if body and headers.get('Content-Type', '').startswith('application/json') else body or None
+
+
+def _rate_limit_info(headers: Mapping[str, str], result: Any) -> Tuple[float, bool]:
+    """
+    :return: seconds to retry 429 response after, and whether global rate limit is exceeded.
+    """
+    if isinstance(result, dict):
+        return float(result.get('retry_after', 1.0)), bool(headers.get('X-RateLimit-Global') or result.get('global'))
+    return float(headers.get('Retry-After', 1.0)), bool(headers.get('X-RateLimit-Global'))
+
+# Request body : bytes, or function building new body for every attempt. (ex: multipart streaming files)
+RequestBody = Union[bytes, Callable[[], Any], None]
 
 
 class ApiRoute:
-    base: Final[str] = ''
+    """
+    REST api route. Holds method, path template and its parameters.
+    Major parameters (channel_id, guild_id, webhook_id & webhook_token) split rate limit buckets of same route.
+    """
+    base: Final[str] = 'https://discord.com/api'
 
-    def __init__(self, version: int = 9):
+    def __init__(self, version: int = 9, method: str = 'GET', path: str = '', **params):
+        """
+        :param version: api version.
+        :param method: http method.
+        :param path: path template, formatted with params. ex) `/channels/{channel_id}/messages`
+        :param params: path parameters.
+        """
         self.version: Final[int] = version
-        self.channel_id: Optional[int] = None
-        self.guild_id: Optional[int] = None
-        self.user_id: Optional[int] = None
-        self.message_id: Optional[int] = None
+        self.method: str = method
+        self.path: str = path
+        self.params: Dict[str, Any] = params
+        self.channel_id: Optional[int] = params.get('channel_id')
+        self.guild_id: Optional[int] = params.get('guild_id')
+        self.user_id: Optional[int] = params.get('user_id')
+        self.message_id: Optional[int] = params.get('message_id')
+        self.webhook_id: Optional[int] = params.get('webhook_id')
+        self.webhook_token: Optional[str] = params.get('webhook_token')
+
+    def __repr__(self) -> str:
+        return f'ApiRoute({self.method} {self.path}, params={self.params})'
+
+    @property
+    def api_url(self) -> str:
+        """Versioned base url of discord api."""
+        return f'{self.base}/v{self.version}'
+
+    @property
+    def url(self) -> str:
+        return f'{self.api_url}{self.path.format_map(self.params)}'
+
+    @property
+    def route_key(self) -> str:
+        """Method & path template, identifying route regardless of its parameters."""
+        return f'{self.method} {self.path}'
+
+    @property
+    def major_parameters(self) -> str:
+        return f'{self.channel_id}:{self.guild_id}:{self.webhook_id}:{self.webhook_token}'
+
+    @property
+    def global_limited(self) -> bool:
+        """Interaction callbacks are not bound to global rate limit."""
+        return not self.path.startswith('/interactions/')
 
     def channel(self, channel_id: int) -> 'ApiRoute':
-        self.channel_id = channel_id
+        self.channel_id = self.params['channel_id'] = channel_id
         return self     # Support method chaining
 
     def guild(self, guild_id: int) -> 'ApiRoute':
-        self.guild_id = guild_id
+        self.guild_id = self.params['guild_id'] = guild_id
         return self     # Support method chaining
 
     def user(self, user_id: int) -> 'ApiRoute':
-        self.user_id = user_id
+        self.user_id = self.params['user_id'] = user_id
         return self     # Support method chaining
 
     def message(self, message_id: int) -> 'ApiRoute':
-        self.message_id = message_id
+        self.message_id = self.params['message_id'] = message_id
+        return self     # Support method chaining
+
+    def webhook(self, webhook_id: int, webhook_token: Optional[str] = None) -> 'ApiRoute':
+        self.webhook_id = self.params['webhook_id'] = webhook_id
+        self.webhook_token = self.params['webhook_token'] = webhook_token
         return self     # Support method chaining
+
+
+class HTTPSession:
+    """
+    Long-lived, pooled http session for REST traffic.
+    Connections are kept alive and reused, so requests skip dns lookup and tls handshake.
+    """
+    __shared: Optional['HTTPSession'] = None
+
+    def __init__(
+            self,
+            version: int = 9,
+            limit: int = DEFAULT_CONNECTOR_LIMIT,
+            limit_per_host: int = 0,
+            keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+            timeout: float = DEFAULT_REQUEST_TIMEOUT
+    ):
+        """
+        :param version: api version used to build routes.
+        :param limit: maximum connections in pool. 0 for no limit.
+        :param limit_per_host: maximum connections per host in pool. 0 for no limit.
+        :param keepalive_timeout: seconds to keep idle connection alive.
+        :param timeout: total timeout of a request, in seconds.
+        """
+        self.version: Final[int] = version
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.__session: Optional[aiohttp.ClientSession] = None
+
+    @classmethod
+    def shared(cls) -> 'HTTPSession':
+        """
+        Process-wide default session, used by REST calls which are not given a session.
+        Close it with `close_shared` on shutdown. (ShardManager does)
+        """
+        if cls.__shared is None:
+            cls.__shared = cls()
+        return cls.__shared
+
+    @classmethod
+    async def close_shared(cls):
+        if cls.__shared is not None:
+            shared, cls.__shared = cls.__shared, None
+            await shared.close()
+
+    @property
+    def route(self) -> ApiRoute:
+        return ApiRoute(self.version)
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """
+        Underlying aiohttp session. Created on first use, since it must be created inside running event loop.
+        """
+        if self.__session is None or self.__session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=DEFAULT_DNS_CACHE_TTL
+            )
+            self.__session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'User-Agent': USER_AGENT}
+            )
+        return self.__session
+
+    @property
+    def closed(self) -> bool:
+        return self.__session is None or self.__session.closed
+
+    async def close(self):
+        if self.__session is not None and not self.__session.closed:
+            await self.__session.close()
+        self.__session = None
+
+    async def __aenter__(self) -> 'HTTPSession':
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+class HTTPClient:
+    """
+    Discord REST client. Requests wait in their rate limit bucket instead of failing,
+    and requests in independent buckets run fully in parallel.
+    """
+    __shared: Optional['HTTPClient'] = None
+
+    def __init__(
+            self,
+            token: Optional[str] = None,
+            version: int = 9,
+            http: Optional[HTTPSession] = None,
+            ratelimiter: Optional[RateLimitBackend] = None,
+            max_retries: int = MAX_RETRIES,
+            concurrency: Optional[ConcurrencyController] = None,
+            cache: Optional[ResponseCache] = None,
+            hedging: bool = False,
+            hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE,
+            upload_cache: Optional[UploadCache] = None
+    ):
+        """
+        :param token: bot token. Requests are sent without authorization if None. (ex: webhooks)
+        :param version: api version.
+        :param http: pooled http session. New session is created if None. Given session is not closed by `close`, since others may use it.
+        :param ratelimiter: rate limit state backend. New in-memory rate limiter is created if None.
+            Use `volt.ratelimit_broker.BrokerRateLimiter` to share rate limits between processes.
+        :param max_retries: maximum retries of a request on 429 and 5xx responses.
+        :param concurrency: adaptive concurrency limits & circuit breakers of routes. New controller is created if None.
+        :param cache: TTL cache of GET responses. Responses are not cached if None.
+            Call `cache.attach(event_manager)` to invalidate entries on gateway events.
+        :param hedging: send duplicate of slow GET requests & interaction callbacks, and use whichever succeeds first.
+        :param hedge_percentile: latency percentile of route, after which duplicate is sent.
+        :param upload_cache: content-addressed cache of uploaded files. Files referenced by embeds are not uploaded again if cached.
+        """
+        self.logger = get_logger('volt.http', stream_level=DEBUG)
+        self.version: Final[int] = version
+        self.http: HTTPSession = http or HTTPSession(version)
+        self.__owns_http: Final[bool] = http is None
+        self.ratelimiter: RateLimitBackend = ratelimiter or RateLimiter()
+        self.max_retries = max_retries
+        self.concurrency: ConcurrencyController = concurrency or ConcurrencyController()
+        self.cache: Optional[ResponseCache] = cache
+        # Identical GET requests in flight, shared by concurrent callers.
+        self.__inflight: Dict[Hashable, asyncio.Task] = {}
+        self.coalesced: int = 0
+        self.hedging = hedging
+        self.hedge_percentile = hedge_percentile
+        # Recent latencies of successful requests, per route key.
+        self.latencies: Dict[str, RollingStats] = {}
+        self.hedged: int = 0
+        self.hedge_wins: int = 0
+        self.upload_cache: Optional[UploadCache] = upload_cache
+        self.__token: Final[Optional[str]] = token
+
+    @classmethod
+    def shared(cls) -> 'HTTPClient':
+        """
+        Process-wide client without token, on shared http session. Used by REST calls which are not given a client.
+        (ex: interaction callbacks, which need no authorization)
+        Close it with `close_shared` on shutdown. (ShardManager does)
+        """
+        if cls.__shared is None:
+            cls.__shared = cls(http=HTTPSession.shared())
+        return cls.__shared
+
+    @classmethod
+    async def close_shared(cls):
+        """
+        Close shared client, and shared http session.
+        """
+        if cls.__shared is not None:
+            shared, cls.__shared = cls.__shared, None
+            await shared.close()
+        await HTTPSession.close_shared()
+
+    def route(self, method: str, path: str, **params) -> ApiRoute:
+        return ApiRoute(self.version, method, path, **params)
+
+    def concurrency_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        :return: adaptive concurrency limit & circuit breaker state of each route. See `ConcurrencyController.stats`.
+        """
+        return self.concurrency.stats()
+
+    def hedge_stats(self) -> Dict[str, Any]:
+        """
+        :return: count of duplicated requests, count of duplicates which won, and latency statistics of each route.
+        """
+        return {
+            'hedged': self.hedged,
+            'wins': self.hedge_wins,
+            'latencies': {route_key: latencies.snapshot() for route_key, latencies in self.latencies.items()}
+        }
+
+    async def close(self):
+        """
+        Close http session created by this client, and rate limit backend. (ex: connection to rate limit broker)
+        """
+        if self.__owns_http:
+            await self.http.close()
+        await self.ratelimiter.close()
+
+    async def __aenter__(self) -> 'HTTPClient':
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def request(
+            self,
+            route: ApiRoute,
+            json: Optional[Any] = None,
+            files: Optional[Sequence[File]] = None,
+            params: Optional[Mapping[str, Any]] = None,
+            reason: Optional[str] = None,
+            headers: Optional[Mapping[str, str]] = None,
+            hedge: Optional[bool] = None
+    ) -> Any:
+        """
+        Send request on route, waiting for concurrency slot and rate limits.
+        Concurrency slot is taken before rate limit, so requests piling up on a degraded route fail fast
+        instead of waiting in memory. Identical concurrent GET requests share one request. (See `_get`)
+        :param route: api route.
+        :param json: json body. Sent as `payload_json` part if files are given.
+        :param files: files, streamed as multipart. Files are streamed again from their source on retries.
+        :param params: query parameters.
+        :param reason: audit log reason.
+        :param headers: extra headers.
+        :param hedge: send duplicate if request is slow. Only use on idempotent requests. Defaults to `hedging` on GET requests.
+        :return: decoded json body, or None if response has no content.
+        """
+        request_headers = dict(headers) if headers else {}
+        if self.__token is not None:
+            request_headers['Authorization'] = f'Bot {self.__token}'
+        if reason is not None:
+            request_headers['X-Audit-Log-Reason'] = quote(reason, safe='/ ')
+        data: RequestBody = None
+        if files:
+            data = partial(multipart, json, files)
+        elif json is not None:
+            data = codec.dumps_bytes(json)
+            request_headers['Content-Type'] = 'application/json'
+        if hedge is None:
+            hedge = self.hedging and route.method == 'GET'
+        if route.method == 'GET' and data is None and headers is None and reason is None:
+            return await self._get(route, params, request_headers, hedge)
+        return await self._request(route, data, params, request_headers, hedge)
+
+    async def _get(self, route: ApiRoute, params: Optional[Mapping[str, Any]], headers: Dict[str, str], hedge: bool) -> Any:
+        """
+        Send GET request, sharing one in-flight request between identical concurrent GETs.
+        Shared & cached responses are the same object for every caller, so do not mutate them.
+        """
+        key = (route.url, tuple(sorted(params.items()))) if params else route.url
+        cache = self.cache
+        if cache is not None and cache.cacheable(route.route_key):
+            result = cache.get(key, _MISSING)
+            if result is not _MISSING:
+                return result
+        task = self.__inflight.get(key)
+        if task is None:
+            task = self.__inflight[key] = asyncio.ensure_future(self._fetch(key, route, params, headers, hedge))
+            task.add_done_callback(partial(self._fetched, key))
+        else:
+            self.coalesced += 1
+        # Shielded, so a cancelled caller does not cancel the request shared with others.
+        return await asyncio.shield(task)
+
+    async def _fetch(
+            self,
+            key: Hashable,
+            route: ApiRoute,
+            params: Optional[Mapping[str, Any]],
+            headers: Dict[str, str],
+            hedge: bool
+    ) -> Any:
+        generation = self.cache.generation(route.params) if self.cache is not None else None
+        result = await self._request(route, None, params, headers, hedge)
+        if self.cache is not None:
+            self.cache.set(key, route.route_key, route.params, result, generation)
+        return result
+
+    def _fetched(self, key: Hashable, task: asyncio.Task):
+        if self.__inflight.get(key) is task:
+            del self.__inflight[key]
+        if not task.cancelled():
+            task.exception()    # Retrieve exception, even if every caller gave up.
+
+    async def _send(
+            self,
+            route: ApiRoute,
+            data: RequestBody,
+            params: Optional[Mapping[str, Any]],
+            request_headers: Dict[str, str]
+    ) -> Tuple[int, Mapping[str, str], bytes, float]:
+        """
+        Send request once, holding rate limit ticket while request is in flight.
+        Bucket 429 locks the bucket before the ticket is released, so no request on the bucket is sent before retry_after.
+        :return: status, response headers, body and latency in seconds.
+        """
+        route_key, major = route.route_key, route.major_parameters
+        ticket = await self.ratelimiter.acquire(route_key, major, route.global_limited)
+        limit_headers = retry_after = None
+        try:
+            started = time.perf_counter()
+            request_body = data() if callable(data) else data
+            async with self.http.session.request(route.method, route.url, data=request_body, params=params, headers=request_headers) as resp:
+                if resp.status != 429 or 'X-RateLimit-Limit' in resp.headers:
+                    # 429 without bucket headers is global or shared limit. Says nothing about limit of route bucket.
+                    limit_headers = resp.headers
+                body = await resp.read()
+                if resp.status == 429:
+                    retry_after, is_global = _rate_limit_info(resp.headers, _decode_body(resp.headers, body))
+                    if is_global:
+                        retry_after = None    # Locks global limit instead. See `_request`.
+                return resp.status, resp.headers, body, time.perf_counter() - started
+        finally:
+            await self.ratelimiter.release(ticket, route_key, major, limit_headers, retry_after)
+
+    async def _hedged_send(
+            self,
+            route: ApiRoute,
+            data: RequestBody,
+            params: Optional[Mapping[str, Any]],
+            request_headers: Dict[str, str],
+            delay: float
+    ) -> Tuple[int, Mapping[str, str], bytes, float]:
+        """
+        Send request, and send duplicate if it does not complete in delay.
+        Duplicate takes its own rate limit ticket, and runs on another pooled connection because the first one is busy.
+        First successful (2xx) response wins and the other request is cancelled.
+        Non-retried failure of one request waits for the other, so duplicate interaction callback
+        rejected as already acknowledged does not hide successful original.
+        """
+        started = time.perf_counter()
+        primary = asyncio.ensure_future(self._send(route, data, params, request_headers))
+        done, _ = await asyncio.wait((primary,), timeout=delay)
+        if done:
+            return primary.result()
+        self.hedged += 1
+        duplicate = asyncio.ensure_future(self._send(route, data, params, request_headers))
+        pending = {primary, duplicate}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in (primary, duplicate):
+                    if task in done and task.exception() is None and 200 <= task.result()[0] < 300:
+                        if task is duplicate:
+                            self.hedge_wins += 1
+                        status, response_headers, body, _ = task.result()
+                        return status, response_headers, body, time.perf_counter() - started
+            # Both failed. Report failure of original request.
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def hedge_delay(self, route_key: str) -> Optional[float]:
+        """
+        :return: latency percentile of route to send duplicate after, or None if route has too few samples.
+        """
+        latencies = self.latencies.get(route_key)
+        if latencies is None or len(latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return latencies.percentile(self.hedge_percentile)
+
+    async def _request(
+            self,
+            route: ApiRoute,
+            data: RequestBody,
+            params: Optional[Mapping[str, Any]],
+            request_headers: Dict[str, str],
+            hedge: bool = False
+    ) -> Any:
+        route_key = route.route_key
+
+        for attempt in range(self.max_retries + 1):
+            await self.concurrency.acquire(route_key)
+            # Outcome of route health : True on success, False on 5xx & network failures, None otherwise.
+            healthy, latency = None, None
+            try:
+                delay = self.hedge_delay(route_key) if hedge else None
+                if delay is None:
+                    status, response_headers, body, latency = await self._send(route, data, params, request_headers)
+                else:
+                    status, response_headers, body, latency = await self._hedged_send(route, data, params, request_headers, delay)
+                if status >= 500:
+                    healthy = False
+                elif status != 429:
+                    healthy = True
+                    latencies = self.latencies.get(route_key)
+                    if latencies is None:
+                        latencies = self.latencies[route_key] = RollingStats(HEDGE_LATENCY_SAMPLES)
+                    latencies.add(latency)
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError):
+                healthy = False
+                raise
+            finally:
+                self.concurrency.release(route_key, healthy, latency)
+
+            result = _decode_body(response_headers, body)
+            if 200 <= status < 300:
+                return result
+            if status == 429 and attempt < self.max_retries:
+                retry_after, is_global = _rate_limit_info(response_headers, result)
+                if is_global:
+                    self.logger.warning(f'Global rate limit is exceeded. Retry {route!r} in {retry_after:.2f} seconds.')
+                    self.ratelimiter.lock_global(retry_after)
+                else:
+                    # Bucket is already locked by `_send`, while the ticket was held.
+                    self.logger.warning(f'Rate limit of {route!r} is exceeded. Retry in {retry_after:.2f} seconds.')
+                continue
+            if status in RETRY_STATUSES and attempt < self.max_retries:
+                delay = 1 + attempt * 2
+                self.logger.warning(f'{route!r} failed with status {status}. Retry in {delay} seconds.')
+                await asyncio.sleep(delay)
+                continue
+            raise DiscordHTTPError(f'{route.method} {route.url} failed with status {status}.', status, result)
+
+    # Endpoints
+
+    async def get_gateway_bot(self) -> JSON:
+        return await self.request(self.route('GET', '/gateway/bot'))
+
+    async def get_current_user(self) -> JSON:
+        return await self.request(self.route('GET', '/users/@me'))
+
+    async def get_user(self, user_id: int) -> JSON:
+        return await self.request(self.route('GET', '/users/{user_id}', user_id=user_id))
+
+    async def get_channel(self, channel_id: int) -> JSON:
+        return await self.request(self.route('GET', '/channels/{channel_id}', channel_id=channel_id))
+
+    async def get_guild(self, guild_id: int) -> JSON:
+        return await self.request(self.route('GET', '/guilds/{guild_id}', guild_id=guild_id))
+
+    async def get_guild_member(self, guild_id: int, user_id: int) -> JSON:
+        return await self.request(self.route('GET', '/guilds/{guild_id}/members/{user_id}', guild_id=guild_id, user_id=user_id))
+
+    async def get_message(self, channel_id: int, message_id: int) -> JSON:
+        return await self.request(self.route(
+            'GET', '/channels/{channel_id}/messages/{message_id}', channel_id=channel_id, message_id=message_id
+        ))
+
+    async def get_messages(self, channel_id: int, limit: int = 50, **params) -> List[JSON]:
+        """
+        :param params: `before`, `after` or `around` message id.
+        """
+        return await self.request(
+            self.route('GET', '/channels/{channel_id}/messages', channel_id=channel_id),
+            params={'limit': limit, **params}
+        )
+
+    async def get_guild_members(self, guild_id: int, limit: int = 1000, after: Optional[int] = None) -> List[JSON]:
+        params = {'limit': limit}
+        if after is not None:
+            params['after'] = after
+        return await self.request(self.route('GET', '/guilds/{guild_id}/members', guild_id=guild_id), params=params)
+
+    async def get_audit_log(self, guild_id: int, limit: int = 100, **params) -> JSON:
+        """
+        :param params: `before`, `after`, `user_id` or `action_type`.
+        """
+        return await self.request(
+            self.route('GET', '/guilds/{guild_id}/audit-logs', guild_id=guild_id),
+            params={'limit': limit, **params}
+        )
+
+    # Paginated iterators. Entities are streamed page by page, fetching next page while current page is consumed.
+
+    def iter_messages(
+            self,
+            channel_id: int,
+            limit: Optional[int] = None,
+            before: Optional[int] = None,
+            after: Optional[int] = None,
+            splits: int = 1,
+            concurrency: int = 4
+    ) -> AsyncIterator[JSON]:
+        """
+        Iterate messages of channel. Newest first, or oldest first if only `after` is given.
+        :param limit: maximum messages. Iterates every message if None.
+        :param before: message id (or snowflake of time) to iterate before.
+        :param after: message id (or snowflake of time) to iterate after.
+        :param splits: split range between `after` (default: channel creation) and `before` (default: now) into
+            this many snowflake sub-ranges, walked concurrently. Messages of sub-ranges are interleaved, as they arrive.
+        :param concurrency: maximum sub-ranges walked at once.
+        """
+        route = self.route('GET', '/channels/{channel_id}/messages', channel_id=channel_id)
+        key = lambda message: int(message['id'])
+
+        def fetcher(ascending: bool):
+            async def fetch(cursor: Optional[int], size: int) -> List[JSON]:
+                params = {'limit': size}
+                if cursor is not None:
+                    params['after' if ascending else 'before'] = cursor
+                page = await self.request(route, params=params)
+                # Pages are newest first, even when walking `after` cursor.
+                return page[::-1] if ascending else page
+            return fetch
+
+        if splits > 1:
+            if limit is not None:
+                raise ValueError('limit cannot be used with splits, because messages of sub-ranges are interleaved.')
+            lower = int(channel_id) - 1 if after is None else after
+            upper = time_snowflake(utcnow(), high=True) + 1 if before is None else before
+            return paginate_split(fetcher(True), key, 100, lower, upper, splits, concurrency)
+        if after is not None and before is None:
+            return paginate(fetcher(True), key, 100, cursor=after, ascending=True, limit=limit)
+        return paginate(fetcher(False), key, 100, cursor=before, end=after, limit=limit)
+
+    def iter_guild_members(
+            self,
+            guild_id: int,
+            limit: Optional[int] = None,
+            after: Optional[int] = None,
+            splits: int = 1,
+            concurrency: int = 4
+    ) -> AsyncIterator[JSON]:
+        """
+        Iterate members of guild in ascending user id. Requires GUILD_MEMBERS intent.
+        :param limit: maximum members. Iterates every member if None.
+        :param after: user id to iterate after.
+        :param splits: split user id range into this many sub-ranges, walked concurrently.
+            Members of sub-ranges are interleaved, as they arrive.
+        :param concurrency: maximum sub-ranges walked at once.
+        """
+        key = lambda member: int(member['user']['id'])
+
+        async def fetch(cursor: Optional[int], size: int) -> List[JSON]:
+            return await self.get_guild_members(guild_id, size, cursor)
+
+        if splits > 1:
+            if limit is not None:
+                raise ValueError('limit cannot be used with splits, because members of sub-ranges are interleaved.')
+            upper = time_snowflake(utcnow(), high=True) + 1
+            return paginate_split(fetch, key, 1000, after or 0, upper, splits, concurrency)
+        return paginate(fetch, key, 1000, cursor=after, ascending=True, limit=limit)
+
+    def iter_audit_log_entries(
+            self,
+            guild_id: int,
+            limit: Optional[int] = None,
+            before: Optional[int] = None,
+            **params
+    ) -> AsyncIterator[JSON]:
+        """
+        Iterate audit log entries of guild, newest first.
+        :param limit: maximum entries. Iterates every entry if None.
+        :param before: entry id (or snowflake of time) to iterate before.
+        :param params: `user_id` or `action_type` filter.
+        """
+        async def fetch(cursor: Optional[int], size: int) -> List[JSON]:
+            if cursor is not None:
+                params['before'] = cursor
+            return (await self.get_audit_log(guild_id, size, **params))['audit_log_entries']
+
+        return paginate(fetch, lambda entry: int(entry['id']), 100, cursor=before, limit=limit)
+
+    async def _send_message(self, route: ApiRoute, payload: JSON, files: Optional[Sequence[File]]) -> JSON:
+        """
+        Send message payload with files, using upload cache if any.
+        """
+        if not files or self.upload_cache is None:
+            return await self.request(route, json=payload, files=files)
+        payload, files, pending = await self.upload_cache.prepare(self, payload, files)
+        message = await self.request(route, json=payload, files=files)
+        await self.upload_cache.record(pending, payload, files, message)
+        return message
+
+    async def create_message(self, channel_id: int, payload: JSON, files: Optional[Sequence[File]] = None) -> JSON:
+        """
+        :param payload: message payload.
+        :param files: attachments, streamed from their source. See `volt.file.File`.
+            Embeds refer to them by `attachment://filename`.
+        """
+        return await self._send_message(self.route('POST', '/channels/{channel_id}/messages', channel_id=channel_id), payload, files)
+
+    async def edit_message(self, channel_id: int, message_id: int, payload: JSON, files: Optional[Sequence[File]] = None) -> JSON:
+        """
+        :param payload: message payload. Existing attachments not listed in its `attachments` are removed.
+        :param files: new attachments, streamed from their source.
+        """
+        return await self._send_message(self.route(
+            'PATCH', '/channels/{channel_id}/messages/{message_id}', channel_id=channel_id, message_id=message_id
+        ), payload, files)
+
+    async def refresh_attachment_urls(self, urls: Sequence[str]) -> Dict[str, str]:
+        """
+        Refresh signed CDN urls of attachments.
+        :return: refreshed urls keyed by original url.
+        """
+        data = await self.request(self.route('POST', '/attachments/refresh-urls'), json={'attachment_urls': list(urls)})
+        return {url['original']: url['refreshed'] for url in data.get('refreshed_urls', ())}
+
+    async def delete_message(self, channel_id: int, message_id: int, reason: Optional[str] = None):
+        await self.request(self.route(
+            'DELETE', '/channels/{channel_id}/messages/{message_id}', channel_id=channel_id, message_id=message_id
+        ), reason=reason)
+
+    async def create_interaction_response(self, interaction_id: int, interaction_token: str, payload: JSON) -> Optional[JSON]:
+        # Discord accepts only the first callback of an interaction, so hedged duplicate cannot respond twice.
+        return await self.request(self.route(
+            'POST', '/interactions/{interaction_id}/{interaction_token}/callback',
+            interaction_id=interaction_id, interaction_token=interaction_token
+        ), json=payload, hedge=self.hedging)
@@ -0,0 +1,152 @@
+"""
+Identify scheduling.
+Discord allows one identify per 5 seconds for each rate limit key (`shard_id % max_concurrency`),
+and limits total identifies per day by `session_start_limit`.
+"""
+
+import asyncio
+import time
+from typing import Dict, Final, Optional
+
+from volt.types.type_hint import JSON
+from volt.utils.log import get_logger, DEBUG
+
+
+__all__ = (
+    'IdentifySchedule',
+    'IdentifyScheduler'
+)
+
+# Discord allows one identify per 5 seconds (per max_concurrency bucket).
+IDENTIFY_INTERVAL: Final[float] = 5.0
+# Identifies left in daily budget which are never used. They are kept for manual recovery.
+IDENTIFY_BUDGET_RESERVE: Final[int] = 5
+# Fallback length of identify budget window, when `reset_after` is unknown.
+IDENTIFY_BUDGET_WINDOW: Final[float] = 86400.0
+
+
+class IdentifySchedule:
+    """
+    Bookkeeping of identify schedule, independent from event loop.
+    Shards in different `shard_id % max_concurrency` buckets identify in parallel,
+    and shards in same bucket are spaced by IDENTIFY_INTERVAL.
+    """
+
+    def __init__(
+            self,
+            max_concurrency: int = 1,
+            remaining: Optional[int] = None,
+            total: Optional[int] = None,
+            reset_after: Optional[float] = None,
+            reserve: int = IDENTIFY_BUDGET_RESERVE
+    ):
+        """
+        :param max_concurrency: `session_start_limit.max_concurrency`.
+        :param remaining: identifies left in current budget window. None if unknown (not limited).
+        :param total: identifies allowed in a budget window.
+        :param reset_after: seconds until budget window resets.
+        :param reserve: identifies left in budget which are never used.
+        """
+        self.logger = get_logger('volt.identify', stream_level=DEBUG)
+        self.max_concurrency: int = max_concurrency
+        self.reserve: int = reserve
+        self.remaining: Optional[int] = remaining
+        self.total: Optional[int] = total if total is not None else remaining
+        self.reset_at: Optional[float] = time.monotonic() + reset_after if reset_after is not None else None
+        # Time until which every bucket waits, because only reserved identifies are left. None if budget is not blocked.
+        self.blocked_until: Optional[float] = None
+        self.identified: int = 0
+        self.__bucket_available: Dict[int, float] = {}
+        # Identifies granted in future budget windows, not yet counted in `remaining`.
+        self.__deferred: int = 0
+
+    @classmethod
+    def from_session_start_limit(cls, limit: JSON, reserve: int = IDENTIFY_BUDGET_RESERVE) -> 'IdentifySchedule':
+        """
+        Create schedule from `session_start_limit` object of `GET /gateway/bot`.
+        """
+        schedule = cls(reserve=reserve)
+        schedule.update(limit)
+        return schedule
+
+    def update(self, limit: JSON):
+        """
+        Update concurrency & budget from `session_start_limit` object of `GET /gateway/bot`.
+        """
+        self.max_concurrency = limit.get('max_concurrency', 1)
+        self.remaining = limit.get('remaining')
+        self.total = limit.get('total', self.remaining)
+        reset_after = limit.get('reset_after')
+        # reset_after is given in milliseconds.
+        self.reset_at = time.monotonic() + reset_after / 1000 if reset_after is not None else None
+        self.blocked_until = None
+        self.__deferred = 0
+
+    def bucket_of(self, shard_id: int) -> int:
+        return shard_id % self.max_concurrency
+
+    def _consume_budget(self, now: float) -> float:
+        """
+        Consume one identify from budget.
+        :return: time.monotonic() value when budget allows the identify.
+        """
+        if self.remaining is None:
+            return now
+        total = self.total if self.total is not None else self.remaining
+        usable = max(1, total - self.reserve)
+        if self.reset_at is not None and self.reset_at <= now:
+            # Budget is refilled only after its window is over. Identifies deferred into the new window are counted first.
+            carried = min(self.__deferred, usable)
+            self.__deferred -= carried
+            self.remaining = total - carried
+            self.reset_at = now + IDENTIFY_BUDGET_WINDOW
+            self.blocked_until = None
+        if self.remaining > self.reserve:
+            self.remaining -= 1
+            return now
+        # Refuse to burn the reserved identifies. Every bucket waits for the next budget window instead.
+        if self.reset_at is None:
+            self.reset_at = now + IDENTIFY_BUDGET_WINDOW
+        available_at = self.reset_at + IDENTIFY_BUDGET_WINDOW * (self.__deferred // usable)
+        self.__deferred += 1
+        if self.blocked_until is None:
+            self.logger.error(
+                f'Only {self.remaining} identifies are left in daily budget. Identifies are delayed by {available_at - now:.0f} seconds.'
+            )
+        self.blocked_until = available_at
+        return available_at
+
+    def reserve_slot(self, shard_id: int) -> float:
+        """
+        Reserve identify slot of a shard, and consume one identify from budget.
+        :param shard_id: shard id to identify. None is treated as shard 0.
+        :return: time.monotonic() value when the shard can identify.
+        """
+        now = time.monotonic()
+        bucket = self.bucket_of(shard_id or 0)
+        grant_at = max(self._consume_budget(now), self.__bucket_available.get(bucket, 0.0))
+        self.__bucket_available[bucket] = grant_at + IDENTIFY_INTERVAL
+        self.identified += 1
+        return grant_at
+
+
+class IdentifyScheduler:
+    """
+    Asynchronous identify scheduler, used as `before_identify` hook of GatewayBot.
+    """
+
+    def __init__(self, schedule: Optional[IdentifySchedule] = None):
+        self.logger = get_logger('volt.identify', stream_level=DEBUG)
+        self.schedule: IdentifySchedule = schedule or IdentifySchedule()
+
+    async def __call__(self, shard):
+        await self.wait(shard.shard_id)
+
+    async def wait(self, shard_id: Optional[int]):
+        """
+        Wait until the shard can identify.
+        """
+        delay = self.schedule.reserve_slot(shard_id) - time.monotonic()
+        if delay > 0:
+            self.logger.debug(f'Shard {shard_id} waits {delay:.2f} seconds to identify.')
+            await asyncio.sleep(delay)
@@ -1,10 +1,10 @@
-import aiohttp
 from typing import Optional, List, Any, Dict, Mapping, Union
 
 from enum import Enum, IntFlag
 
 from .abc import JsonObject
 from .components import ComponentType, Component
+from .http import HTTPClient
 from .message import Message
 from .types.type_hint import JSON
 
@@ -284,7 +284,7 @@ class Interaction(JsonObject):
     user: Optional[discord.User]
 
     @classmethod
-    async def from_dict(cls, data: JSON, bot: discord.Client) -> 'Interaction':
+    async def from_dict(cls, data: JSON, bot: discord.Client, http: Optional[HTTPClient] = None) -> 'Interaction':
         interaction_type = InteractionType.from_value(data['type'])
         message = ComponentMessage.from_json(data['message'], bot) if 'message' in data else None
 
@@ -320,7 +320,8 @@ class Interaction(JsonObject):
             guild_id=data.get('guild_id'),
             channel_id=data.get('channel_id'),
             member=member,
-            user=user
+            user=user,
+            http=http
         )
 
     def __init__(
@@ -335,7 +336,8 @@ class Interaction(JsonObject):
             guild_id: Optional[discord.Message] = None,
             channel_id: Optional[discord.Message] = None,
             member: Optional[discord.Member] = None,
-            user: Optional[discord.User] = None
+            user: Optional[discord.User] = None,
+            http: Optional[HTTPClient] = None
     ) -> None:
         self.id = id
         self.application_id = application_id
@@ -350,18 +352,21 @@ class Interaction(JsonObject):
         if user:
             self.user = user
         self.data = data
+        # REST client used to respond. Shared default client is used if None.
+        self.http: Optional[HTTPClient] = http
 
     async def respond(
             self,
             response: 'InteractionResponse'
-    ):
-        url = 'https://discord.com/api/v8/interactions/{0}/{1}/callback'.format(self.id, self.token)
-        async with aiohttp.ClientSession() as s:
-            async with s.post(
-                    url,
-                    json=response.to_dict()
-            ) as resp:
-                print(await resp.json())
+    ) -> Optional[JSON]:
+        """
+        Send interaction callback through REST client, so it is rate limited, retried and hedged like other requests.
+        :param response: interaction response.
+        :return: response body, or None if discord responded without content.
+        :raise DiscordHTTPError: callback failed. Status & error body of discord are in `status` and `data`.
+        """
+        http = self.http or HTTPClient.shared()
+        return await http.create_interaction_response(self.id, self.token, response.to_dict())
 
     def to_dict(self) -> JSON:
         data = {}
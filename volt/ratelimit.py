@@ -0,0 +1,459 @@
+"""
+Rate limiting primitives.
+"""
+
+import asyncio
+import time
+from abc import ABCMeta, abstractmethod
+from collections import deque
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Deque, Dict, Final, Mapping, Optional, Tuple
+
+from volt.types.type_hint import JSON
+from volt.utils.stats import RollingStats
+
+
+__all__ = (
+    'TokenBucket',
+    'CommandPriority',
+    'GatewaySendQueue',
+    'RateLimitBucket',
+    'RateLimitBackend',
+    'RateLimiter'
+)
+
+# Discord gateway allows 120 commands per 60 seconds per connection.
+GATEWAY_COMMAND_LIMIT: Final[int] = 120
+GATEWAY_COMMAND_PERIOD: Final[float] = 60.0
+# Discord REST api allows 50 requests per second per bot, across every route.
+GLOBAL_RATE_LIMIT: Final[int] = 50
+GLOBAL_RATE_PERIOD: Final[float] = 1.0
+# Idle buckets are pruned when rate limiter holds more buckets than this.
+MAX_IDLE_BUCKETS: Final[int] = 4096
+# Responses whose reset times differ less than this (latency jitter) belong to the same rate limit window.
+WINDOW_TOLERANCE: Final[float] = 0.25
+
+
+class TokenBucket:
+    """
+    Continuously refilled token bucket.
+    """
+    __slots__ = ('capacity', 'rate', '_tokens', '_updated')
+
+    def __init__(self, capacity: int, period: float):
+        """
+        :param capacity: maximum tokens (burst size).
+        :param period: seconds to refill the whole bucket.
+        """
+        self.capacity = capacity
+        self.rate = capacity / period   # tokens per second
+        self._tokens: float = capacity
+        self._updated: float = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def delay(self, reserve: float = 0) -> float:
+        """
+        Seconds to wait until a token can be consumed while keeping `reserve` tokens in the bucket.
+        :param reserve: tokens which must remain after consuming.
+        """
+        self._refill()
+        missing = reserve + 1 - self._tokens
+        return missing / self.rate if missing > 0 else 0.0
+
+    def consume(self):
+        self._refill()
+        self._tokens -= 1
+
+    async def acquire(self, reserve: float = 0):
+        """
+        Wait until a token is available, and consume it.
+        """
+        while (delay := self.delay(reserve)) > 0:
+            await asyncio.sleep(delay)
+        self.consume()
+
+
+class CommandPriority(IntEnum):
+    """
+    Priority lanes of gateway commands. Lower value is sent first.
+    """
+    CRITICAL = 0    # Heartbeat, Identify, Resume
+    NORMAL = 1      # Presence update, voice state update
+    BULK = 2        # Request guild members
+
+
+# Tokens each lane must leave in the bucket, so bulk commands never starve heartbeats and presence updates.
+LANE_RESERVED_TOKENS: Final[Dict[CommandPriority, int]] = {
+    CommandPriority.CRITICAL: 0,
+    CommandPriority.NORMAL: 5,
+    CommandPriority.BULK: 20
+}
+
+# (payload, future resolved when sent, enqueued time, callback called right before sending)
+_QueueItem = Tuple[JSON, asyncio.Future, float, Optional[Callable[[], Any]]]
+
+
+class GatewaySendQueue:
+    """
+    Outbound gateway command scheduler of a connection.
+    Commands are sent in priority order, paced by a token bucket of discord's gateway command limit.
+    """
+
+    def __init__(
+            self,
+            writer: Callable[[JSON], Awaitable[None]],
+            limit: int = GATEWAY_COMMAND_LIMIT,
+            period: float = GATEWAY_COMMAND_PERIOD
+    ):
+        """
+        :param writer: coroutine function writing encoded command into websocket.
+        :param limit: commands allowed per period.
+        :param period: period of the limit, in seconds.
+        """
+        self.writer = writer
+        self.bucket: TokenBucket = TokenBucket(limit, period)
+        self.lanes: Dict[CommandPriority, Deque[_QueueItem]] = {priority: deque() for priority in CommandPriority}
+        # Time commands spent in queue, in seconds.
+        self.wait_stats: Dict[CommandPriority, RollingStats] = {priority: RollingStats() for priority in CommandPriority}
+        self.sent: int = 0
+        self._wakeup: asyncio.Event = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # Future of command being written. Failed on stop, because cancelled writer never resolves it.
+        self._sending: Optional[asyncio.Future] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(), name='volt-gateway-send-queue')
+
+    def stop(self, exc: Optional[BaseException] = None):
+        """
+        Stop sending commands. Queued commands fail with given exception.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        exc = exc or ConnectionResetError('Gateway connection is closed before sending command.')
+        if self._sending is not None:
+            if not self._sending.done():
+                self._sending.set_exception(exc)
+            self._sending = None
+        for lane in self.lanes.values():
+            while lane:
+                _, future, _, _ = lane.popleft()
+                if not future.done():
+                    future.set_exception(exc)
+
+    @property
+    def depth(self) -> int:
+        return sum(map(len, self.lanes.values()))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        :return: queue depth & wait time statistics of each lane, remaining tokens and sent command count.
+        """
+        return {
+            'depth': {priority.name: len(lane) for priority, lane in self.lanes.items()},
+            'wait': {priority.name: stats.snapshot() for priority, stats in self.wait_stats.items()},
+            'tokens': self.bucket.tokens,
+            'sent': self.sent
+        }
+
+    def put(
+            self,
+            payload: JSON,
+            priority: CommandPriority = CommandPriority.NORMAL,
+            on_send: Optional[Callable[[], Any]] = None
+    ) -> asyncio.Future:
+        """
+        Enqueue gateway command.
+        :param payload: command payload.
+        :param priority: priority lane of command.
+        :param on_send: function called right before the command is written.
+        :return: future resolved when command is written.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.lanes[priority].append((payload, future, time.monotonic(), on_send))
+        self._wakeup.set()
+        return future
+
+    async def _run(self):
+        while True:
+            priority = next((p for p, lane in self.lanes.items() if lane), None)
+            if priority is None:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            delay = self.bucket.delay(LANE_RESERVED_TOKENS[priority])
+            if delay > 0:
+                # Wait for token, but wake up if a command arrives. It may have higher priority.
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            payload, future, enqueued, on_send = self.lanes[priority].popleft()
+            if future.cancelled():
+                continue
+            self.bucket.consume()
+            self.wait_stats[priority].add(time.monotonic() - enqueued)
+            self._sending = future
+            try:
+                if on_send is not None:
+                    on_send()
+                await self.writer(payload)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                self.sent += 1
+                if not future.done():
+                    future.set_result(None)
+            finally:
+                if self._sending is future:
+                    self._sending = None
+
+
+class RateLimitBucket:
+    """
+    REST rate limit bucket. Requests wait in FIFO order until the bucket has remaining requests.
+    Unknown bucket allows one request at a time, until its limit is learned from response headers.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.limit: Optional[int] = 1
+        self.remaining: int = 1
+        self.reset_at: Optional[float] = None   # time.monotonic() value when bucket is refilled.
+        self.window_end: float = 0.0            # Reset time of latest rate limit window seen in responses.
+        self.learned: bool = False
+        self.inflight: int = 0
+        # Acquired requests still waiting for global limit. They are sent in whichever window is current then.
+        self.unsent: int = 0
+        self.waiting: int = 0
+        self._cond: asyncio.Condition = asyncio.Condition()
+
+    @property
+    def idle(self) -> bool:
+        return self.inflight == 0 and self.waiting == 0 and (self.reset_at is None or self.reset_at <= time.monotonic())
+
+    async def acquire(self):
+        async with self._cond:
+            self.waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self.reset_at is not None and self.reset_at <= now:
+                        self.remaining = (self.limit or 1) - self.unsent
+                        self.reset_at = None
+                    if self.limit is None or self.remaining > 0:
+                        self.remaining -= 1
+                        self.inflight += 1
+                        self.unsent += 1
+                        return
+                    timeout = self.reset_at - now if self.reset_at is not None else None
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self.waiting -= 1
+
+    def update(self, limit: Optional[int], remaining: Optional[int], reset_after: Optional[float]):
+        """
+        Update bucket state from response. Every parameter is None if the route is not rate limited.
+        """
+        self.learned = True
+        if limit is None:
+            self.limit = None
+            return
+        self.limit = limit
+        reset_at = time.monotonic() + reset_after
+        # Requests still in flight are not counted in response yet.
+        remaining = max(0, remaining - (self.inflight - 1))
+        if reset_at <= self.window_end + WINDOW_TOLERANCE:
+            # Response of current window, or late response of finished window.
+            if self.reset_at is not None and reset_at >= self.window_end - WINDOW_TOLERANCE:
+                self.remaining = min(self.remaining, remaining)
+            return
+        # New window.
+        self.remaining = remaining
+        self.reset_at = self.window_end = reset_at
+
+    def sent(self):
+        """
+        Mark acquired request as sent.
+        """
+        self.unsent -= 1
+
+    def lock(self, retry_after: float):
+        """
+        Block bucket for given seconds. Used on 429 response.
+        """
+        self.remaining = 0
+        self.reset_at = time.monotonic() + retry_after
+
+    async def release(self, sent: bool = True):
+        async with self._cond:
+            self.inflight -= 1
+            if not sent:
+                self.unsent -= 1
+            if not self.learned:
+                # Request failed before learning bucket limit. Let next request try.
+                self.remaining = max(self.remaining, 1)
+            self._cond.notify_all()
+
+
+class RateLimitBackend(metaclass=ABCMeta):
+    """
+    Abstraction of REST rate limit state. HTTPClient acquires a ticket before each request,
+    and releases it with response headers.
+    """
+
+    @abstractmethod
+    async def acquire(self, route_key: str, major: str, global_limited: bool = True) -> Any:
+        """
+        Wait until a request on route can be sent.
+        :param route_key: method & path template of route.
+        :param major: major parameters of route.
+        :param global_limited: whether the route counts against global limit.
+        :return: ticket of acquired bucket. Must be released with `release()`.
+        """
+
+    @abstractmethod
+    async def release(
+            self,
+            ticket: Any,
+            route_key: str,
+            major: str,
+            headers: Optional[Mapping[str, str]] = None,
+            retry_after: Optional[float] = None
+    ):
+        """
+        Update bucket from response headers, and release ticket.
+        :param headers: response headers. None if request failed without response.
+        :param retry_after: seconds to block bucket for, on 429 response of the bucket.
+            Applied while ticket is held, so the bucket is blocked before any waiting request takes it.
+        """
+
+    @abstractmethod
+    def lock_global(self, retry_after: float):
+        """
+        Block every globally limited route for given seconds. Used on global 429 response.
+        """
+
+    @abstractmethod
+    async def stats(self) -> Dict[str, Any]:
+        """
+        :return: count of buckets, waiting & in-flight requests, and remaining global requests.
+        """
+
+    async def close(self):
+        """
+        Release resources of backend. (ex: broker connection)
+        """
+
+
+class RateLimiter(RateLimitBackend):
+    """
+    In-memory REST rate limit state : buckets keyed by discord bucket hash (or route) and major parameters,
+    and global limit shared by every route. Default backend of HTTPClient.
+    """
+
+    def __init__(self, global_limit: int = GLOBAL_RATE_LIMIT, global_period: float = GLOBAL_RATE_PERIOD):
+        self.global_bucket: TokenBucket = TokenBucket(global_limit, global_period)
+        self.global_reset_at: float = 0.0
+        # Route key (method & path template) -> bucket hash from `X-RateLimit-Bucket` header.
+        self.bucket_hashes: Dict[str, str] = {}
+        self.buckets: Dict[str, RateLimitBucket] = {}
+
+    def bucket_key(self, route_key: str, major: str) -> str:
+        return f'{self.bucket_hashes.get(route_key, route_key)}:{major}'
+
+    def get_bucket(self, route_key: str, major: str) -> RateLimitBucket:
+        key = self.bucket_key(route_key, major)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if len(self.buckets) >= MAX_IDLE_BUCKETS:
+                self.prune()
+            bucket = self.buckets[key] = RateLimitBucket(key)
+        return bucket
+
+    def prune(self):
+        for key, bucket in list(self.buckets.items()):
+            if bucket.idle:
+                del self.buckets[key]
+
+    async def acquire(self, route_key: str, major: str, global_limited: bool = True) -> RateLimitBucket:
+        bucket = self.get_bucket(route_key, major)
+        await bucket.acquire()
+        if global_limited:
+            try:
+                while (delay := self.global_reset_at - time.monotonic()) > 0:
+                    await asyncio.sleep(delay)
+                await self.global_bucket.acquire()
+            except BaseException:
+                # Cancelled while waiting for global limit. Do not leak bucket reservation.
+                await bucket.release(sent=False)
+                raise
+        bucket.sent()
+        return bucket
+
+    async def release(
+            self,
+            bucket: RateLimitBucket,
+            route_key: str,
+            major: str,
+            headers: Optional[Mapping[str, str]] = None,
+            retry_after: Optional[float] = None
+    ):
+        if headers is not None:
+            bucket_hash = headers.get('X-RateLimit-Bucket')
+            if bucket_hash is not None and self.bucket_hashes.get(route_key) != bucket_hash:
+                # Learned real bucket of route. Routes sharing the hash share the bucket from now on.
+                learned = route_key in self.bucket_hashes
+                self.bucket_hashes[route_key] = bucket_hash
+                self.buckets.setdefault(self.bucket_key(route_key, major), bucket)
+                if not learned:
+                    # Move buckets of other major parameters too, so requests in flight and new requests share one window.
+                    prefix = f'{route_key}:'
+                    for key, route_bucket in list(self.buckets.items()):
+                        if key.startswith(prefix):
+                            del self.buckets[key]
+                            self.buckets.setdefault(self.bucket_key(route_key, key[len(prefix):]), route_bucket)
+            if 'X-RateLimit-Limit' in headers:
+                bucket.update(
+                    int(headers['X-RateLimit-Limit']),
+                    int(headers['X-RateLimit-Remaining']),
+                    float(headers['X-RateLimit-Reset-After'])
+                )
+            else:
+                bucket.update(None, None, None)
+        if retry_after is not None:
+            bucket.lock(retry_after)
+            # Ticket may be of a bucket just merged into the learned one. Block the bucket new requests take too.
+            current = self.buckets.get(self.bucket_key(route_key, major))
+            if current is not None and current is not bucket:
+                current.lock(retry_after)
+        await bucket.release()
+
+    def lock_global(self, retry_after: float):
+        self.global_reset_at = max(self.global_reset_at, time.monotonic() + retry_after)
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            'buckets': len(self.buckets),
+            'waiting': sum(bucket.waiting for bucket in self.buckets.values()),
+            'inflight': sum(bucket.inflight for bucket in self.buckets.values()),
+            'global_tokens': self.global_bucket.tokens
+        }
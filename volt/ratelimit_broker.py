@@ -0,0 +1,260 @@
+"""
+Cross-process REST rate limit coordination.
+RateLimitBroker owns the only rate limit state of a bot token on a host, and serves processes over a unix socket.
+Every bucket reservation is made by the broker, so reservations of all processes are atomic,
+and the global limit is shared by every process.
+Unix sockets are not available on windows.
+usage : python -m volt.ratelimit_broker [socket path]
+"""
+
+import asyncio
+import os
+import struct
+import sys
+import time
+from itertools import count
+from typing import Any, Dict, Final, Mapping, Optional, Set, Tuple
+
+from volt import codec
+from volt.ratelimit import RateLimitBackend, RateLimitBucket, RateLimiter, GLOBAL_RATE_LIMIT, GLOBAL_RATE_PERIOD
+from volt.utils.log import get_logger, DEBUG
+
+
+__all__ = (
+    'RateLimitBroker',
+    'BrokerRateLimiter'
+)
+
+DEFAULT_BROKER_PATH: Final[str] = '/tmp/volt-ratelimit.sock'
+# Every message is json object prefixed with its length.
+_LENGTH: Final[struct.Struct] = struct.Struct('>I')
+# Response headers forwarded to broker. Other headers are not used by rate limiter.
+_RATELIMIT_HEADERS: Final[Tuple[str, ...]] = (
+    'X-RateLimit-Bucket',
+    'X-RateLimit-Limit',
+    'X-RateLimit-Remaining',
+    'X-RateLimit-Reset-After'
+)
+
+
+async def _read_message(reader: asyncio.StreamReader) -> Dict[str, Any]:
+    length, = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+    return codec.loads(await reader.readexactly(length))
+
+
+def _write_message(writer: asyncio.StreamWriter, message: Dict[str, Any]):
+    data = codec.dumps_bytes(message)
+    writer.write(_LENGTH.pack(len(data)) + data)
+
+
+class _Ticket:
+    __slots__ = ('bucket', 'route_key', 'major')
+
+    def __init__(self, bucket: RateLimitBucket, route_key: str, major: str):
+        self.bucket = bucket
+        self.route_key = route_key
+        self.major = major
+
+
+class RateLimitBroker:
+    """
+    Unix socket server holding shared rate limit state.
+    Tickets of a disconnected process are released, so a crashed process never leaks bucket reservations.
+    """
+
+    def __init__(
+            self,
+            path: str = DEFAULT_BROKER_PATH,
+            global_limit: int = GLOBAL_RATE_LIMIT,
+            global_period: float = GLOBAL_RATE_PERIOD
+    ):
+        self.logger = get_logger('volt.ratelimit_broker', stream_level=DEBUG)
+        self.path = path
+        self.limiter: RateLimiter = RateLimiter(global_limit, global_period)
+        self.tickets: Dict[int, _Ticket] = {}
+        self.__ticket_ids = count(1)
+        self.__server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        """
+        Listen on socket path. Socket left by a crashed broker is replaced, but a running broker is never taken over.
+        """
+        if os.path.exists(self.path):
+            try:
+                _, writer = await asyncio.open_unix_connection(self.path)
+            except ConnectionRefusedError:
+                os.unlink(self.path)    # Stale socket of previous broker.
+            else:
+                writer.close()
+                await writer.wait_closed()
+                raise RuntimeError(f'Another rate limit broker is listening on {self.path}.')
+        self.__server = await asyncio.start_unix_server(self._handle, self.path)
+        self.logger.info(f'Rate limit broker is listening on {self.path}.')
+
+    async def close(self):
+        if self.__server is not None:
+            self.__server.close()
+            await self.__server.wait_closed()
+            self.__server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def serve_forever(self):
+        if self.__server is None:
+            await self.start()
+        try:
+            await self.__server.serve_forever()
+        finally:
+            await self.close()
+
+    async def _acquire(self, writer: asyncio.StreamWriter, owned: Set[int], message: Dict[str, Any]):
+        route_key, major = message['route'], message['major']
+        bucket = await self.limiter.acquire(route_key, major, message['global'])
+        ticket = next(self.__ticket_ids)
+        self.tickets[ticket] = _Ticket(bucket, route_key, major)
+        owned.add(ticket)
+        _write_message(writer, {'n': message['n'], 'ticket': ticket})
+
+    async def _release(self, owned: Set[int], ticket_id: int, headers: Optional[Mapping[str, str]], retry_after: Optional[float] = None):
+        owned.discard(ticket_id)
+        ticket = self.tickets.pop(ticket_id, None)
+        if ticket is not None:
+            await self.limiter.release(ticket.bucket, ticket.route_key, ticket.major, headers, retry_after)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        owned: Set[int] = set()
+        acquiring: Set[asyncio.Task] = set()
+        try:
+            while True:
+                message = await _read_message(reader)
+                op = message['op']
+                if op == 'acquire':
+                    task = asyncio.create_task(self._acquire(writer, owned, message))
+                    acquiring.add(task)
+                    task.add_done_callback(acquiring.discard)
+                elif op == 'release':
+                    await self._release(owned, message['ticket'], message.get('headers'), message.get('retry_after'))
+                elif op == 'lock_global':
+                    self.limiter.lock_global(message['retry_after'])
+                elif op == 'stats':
+                    _write_message(writer, {'n': message['n'], 'stats': await self.limiter.stats()})
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass    # Process is gone.
+        finally:
+            for task in list(acquiring):
+                task.cancel()
+            for ticket_id in list(owned):
+                await self._release(owned, ticket_id, None)
+            writer.close()
+
+
+class BrokerRateLimiter(RateLimitBackend):
+    """
+    Rate limit backend delegating every reservation to RateLimitBroker.
+    Use this in every process sharing one bot token on a host.
+    """
+
+    def __init__(self, path: str = DEFAULT_BROKER_PATH):
+        self.path = path
+        self.__reader: Optional[asyncio.StreamReader] = None
+        self.__writer: Optional[asyncio.StreamWriter] = None
+        self.__reader_task: Optional[asyncio.Task] = None
+        self.__connecting: Optional[asyncio.Lock] = None
+        self.__nonce = count()
+        self.__pending: Dict[int, asyncio.Future] = {}
+        # Global lock which could not be sent to broker. Kept locally until reconnected.
+        self.__global_reset_at: float = 0.0
+
+    async def _connect(self):
+        if self.__connecting is None:
+            self.__connecting = asyncio.Lock()
+        async with self.__connecting:
+            if self.__writer is not None and not self.__writer.is_closing():
+                return
+            self.__reader, self.__writer = await asyncio.open_unix_connection(self.path)
+            self.__reader_task = asyncio.create_task(self._read_replies())
+
+    async def _read_replies(self):
+        try:
+            while True:
+                message = await _read_message(self.__reader)
+                future = self.__pending.pop(message['n'], None)
+                if future is not None and not future.done():
+                    future.set_result(message)
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            error = ConnectionError(f'Rate limit broker on {self.path} is disconnected.')
+            error.__cause__ = e
+            for future in self.__pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self.__pending.clear()
+            if self.__writer is not None:
+                self.__writer.close()
+
+    def _send(self, message: Dict[str, Any]):
+        if self.__writer is None or self.__writer.is_closing():
+            raise ConnectionError(f'Rate limit broker on {self.path} is disconnected.')
+        _write_message(self.__writer, message)
+
+    async def _request(self, message: Dict[str, Any]) -> asyncio.Future:
+        await self._connect()
+        nonce = message['n'] = next(self.__nonce)
+        future = self.__pending[nonce] = asyncio.get_running_loop().create_future()
+        self._send(message)
+        return future
+
+    async def acquire(self, route_key: str, major: str, global_limited: bool = True) -> int:
+        if global_limited:
+            delay = self.__global_reset_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        future = await self._request({'op': 'acquire', 'route': route_key, 'major': major, 'global': global_limited})
+        try:
+            return (await asyncio.shield(future))['ticket']
+        except asyncio.CancelledError:
+            # Caller gave up. Release the ticket when broker grants it, so bucket reservation is not leaked.
+            def release_granted(f: asyncio.Future):
+                if not f.cancelled() and f.exception() is None:
+                    asyncio.ensure_future(self.release(f.result()['ticket'], route_key, major))
+            future.add_done_callback(release_granted)
+            raise
+
+    async def release(
+            self,
+            ticket: int,
+            route_key: str,
+            major: str,
+            headers: Optional[Mapping[str, str]] = None,
+            retry_after: Optional[float] = None
+    ):
+        if headers is not None:
+            headers = {name: headers[name] for name in _RATELIMIT_HEADERS if name in headers}
+        try:
+            self._send({'op': 'release', 'ticket': ticket, 'headers': headers, 'retry_after': retry_after})
+        except ConnectionError:
+            pass    # Broker releases tickets of lost connection by itself.
+
+    def lock_global(self, retry_after: float):
+        try:
+            self._send({'op': 'lock_global', 'retry_after': retry_after})
+        except ConnectionError:
+            # Request is retried after reconnecting, so the lock is applied locally instead of failing it.
+            self.__global_reset_at = max(self.__global_reset_at, time.monotonic() + retry_after)
+
+    async def stats(self) -> Dict[str, Any]:
+        return (await (await self._request({'op': 'stats'})))['stats']
+
+    async def close(self):
+        if self.__writer is not None:
+            self.__writer.close()
+            self.__writer = None
+        if self.__reader_task is not None:
+            self.__reader_task.cancel()
+            self.__reader_task = None
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(RateLimitBroker(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_BROKER_PATH).serve_forever())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,70 @@
+"""
+Raw gateway frame recorder.
+Recorded file is append-only sequence of length-prefixed records :
+    header (timestamp: float64, kind: uint8, length: uint32, little endian) + payload
+CONNECTION record starts every connection, and holds encoding & compression of it as json.
+Recorded files are replayed by `volt.replay.GatewayReplay`.
+"""
+
+import os
+import struct
+import time
+from enum import IntEnum
+from typing import Final, Optional, Union
+
+from volt import codec
+
+
+__all__ = (
+    'RecordKind',
+    'FrameRecorder'
+)
+
+RECORD_MAGIC: Final[bytes] = b'VOLTREC1'
+RECORD_HEADER: Final[struct.Struct] = struct.Struct('<dBI')
+
+
+class RecordKind(IntEnum):
+    CONNECTION = 0  # New connection. Payload is json of {'encoding': str, 'compress': Optional[str]}
+    TEXT = 1        # Text websocket frame, utf-8 encoded.
+    BINARY = 2      # Binary websocket frame, as received. (compressed if connection uses compression)
+
+
+class FrameRecorder:
+    """
+    Appends raw gateway frames into file. Used by GatewayBot when `record` path is given.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self.path = path
+        self.records: int = 0
+        self.__file = open(path, 'ab')
+        if self.__file.tell() == 0:
+            self.__file.write(RECORD_MAGIC)
+
+    @property
+    def closed(self) -> bool:
+        return self.__file.closed
+
+    def record(self, kind: RecordKind, data: Union[str, bytes]):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.__file.write(RECORD_HEADER.pack(time.time(), kind, len(data)))
+        self.__file.write(data)
+        self.records += 1
+
+    def connection(self, encoding: str, compress: Optional[str]):
+        """
+        Mark start of new connection. Replay resets compression context on this record.
+        """
+        self.record(RecordKind.CONNECTION, codec.dumps_bytes({'encoding': encoding, 'compress': compress}))
+
+    def frame(self, data: Union[str, bytes]):
+        self.record(RecordKind.TEXT if isinstance(data, str) else RecordKind.BINARY, data)
+
+    def flush(self):
+        self.__file.flush()
+
+    def close(self):
+        if not self.__file.closed:
+            self.__file.close()
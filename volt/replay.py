@@ -0,0 +1,155 @@
+"""
+Deterministic replay of recorded gateway frames.
+Replay memory-maps recorded file, and feeds frames into GatewayResponse & EventManager without network,
+so parse & dispatch costs can be profiled against captured traffic.
+"""
+
+import asyncio
+import mmap
+import os
+import time
+import weakref
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+from volt import codec
+from volt.events import EventManager
+from volt.gateway import GATEWAY_ENCODINGS, GatewayOpcodes, GatewayResponse, ZlibStreamInflator
+from volt.recorder import RECORD_HEADER, RECORD_MAGIC, RecordKind
+from volt.utils.log import get_logger, DEBUG
+
+
+__all__ = (
+    'GatewayReplay',
+)
+
+
+class GatewayReplay:
+    """
+    Replays recorded gateway frames into EventManager, as fast as possible or at the original pacing.
+    Frames go through same inflate, filter and decode steps as GatewayBot.receive.
+    """
+
+    def __init__(
+            self,
+            path: Union[str, os.PathLike],
+            event_manager: Optional[EventManager] = None,
+            filter_events: bool = True
+    ):
+        """
+        :param path: recorded file.
+        :param event_manager: event manager to dispatch events into. New one is created if None.
+        :param filter_events: drop DISPATCH payloads nobody subscribes, before decoding them.
+        """
+        self.logger = get_logger('volt.recorder', stream_level=DEBUG)
+        self.path = path
+        self.event_manager: EventManager = event_manager or EventManager(gateway=None)
+        self.filter_events = filter_events
+        self.__file = open(path, 'rb')
+        # Zero length file cannot be memory-mapped. (ex: recorder was killed before flushing anything) It has no records.
+        self.__mmap: Optional[mmap.mmap] = None
+        # Record iterators not exhausted yet. Their views of the map must be released before closing it.
+        self.__iterators: 'weakref.WeakSet[Iterator]' = weakref.WeakSet()
+        if os.fstat(self.__file.fileno()).st_size == 0:
+            return
+        self.__mmap = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.__mmap[:len(RECORD_MAGIC)] != RECORD_MAGIC:
+            self.close()
+            raise ValueError(f'{path} is not a recorded gateway file.')
+
+    def close(self):
+        for iterator in list(self.__iterators):
+            iterator.close()
+        if self.__mmap is not None:
+            self.__mmap.close()
+        self.__file.close()
+
+    def __enter__(self) -> 'GatewayReplay':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def records(self) -> Iterator[Tuple[float, RecordKind, memoryview]]:
+        """
+        Iterate records without copying payloads. Payload view is released when iteration moves to the next record.
+        Truncated record at the end of file (ex: recorder was killed while writing) is ignored.
+        """
+        iterator = self._records()
+        self.__iterators.add(iterator)
+        return iterator
+
+    def _records(self) -> Iterator[Tuple[float, RecordKind, memoryview]]:
+        if self.__mmap is None:
+            return
+        with memoryview(self.__mmap) as view:
+            offset = len(RECORD_MAGIC)
+            end = len(view)
+            while offset + RECORD_HEADER.size <= end:
+                timestamp, kind, length = RECORD_HEADER.unpack_from(view, offset)
+                offset += RECORD_HEADER.size
+                if offset + length > end:
+                    break
+                with view[offset:offset + length] as payload:
+                    yield timestamp, RecordKind(kind), payload
+                offset += length
+
+    async def run(self, pace: bool = False, speed: float = 1.0) -> Dict[str, Any]:
+        """
+        Replay every recorded frame.
+        :param pace: sleep between frames to reproduce original timing.
+        :param speed: pacing multiplier. 2.0 replays twice faster than recorded.
+        :return: counts of frames, decoded payloads, dispatched events, and elapsed seconds.
+        """
+        records = self.records()
+        try:
+            return await self._replay(records, pace, speed)
+        finally:
+            # Release views of the map even if replay stops part-way, so the map can be closed.
+            records.close()
+
+    async def _replay(self, records: Iterator[Tuple[float, RecordKind, memoryview]], pace: bool, speed: float) -> Dict[str, Any]:
+        encoding = GATEWAY_ENCODINGS['json']
+        inflator: Optional[ZlibStreamInflator] = None
+        frames = decoded = dispatched = 0
+        first_timestamp: Optional[float] = None
+        started = time.perf_counter()
+        for timestamp, kind, payload in records:
+            if kind is RecordKind.CONNECTION:
+                info = codec.loads(bytes(payload))
+                encoding = GATEWAY_ENCODINGS[info['encoding']]
+                inflator = ZlibStreamInflator() if info.get('compress') is not None else None
+                continue
+            if pace:
+                if first_timestamp is None:
+                    first_timestamp = timestamp
+                delay = started + (timestamp - first_timestamp) / speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            frames += 1
+            if kind is RecordKind.BINARY and inflator is not None:
+                data = inflator.feed(payload)
+                if data is None:
+                    continue
+            elif kind is RecordKind.TEXT:
+                data = str(payload, 'utf-8')    # aiohttp gives text frames as str.
+            else:
+                data = bytes(payload)
+            if self.filter_events:
+                header = encoding.peek(data)
+                if header is not None and header[0] == GatewayOpcodes.DISPATCH and not self.event_manager.is_subscribed(header[1]):
+                    continue
+            resp = GatewayResponse(data, encoding)
+            decoded += 1
+            if resp.op is GatewayOpcodes.DISPATCH:
+                waiting = self.event_manager.dispatch(resp)
+                if waiting is not None:
+                    await waiting
+                dispatched += 1
+            # Let listener tasks run between frames, like receiving from websocket does.
+            await asyncio.sleep(0)
+        return {
+            'frames': frames,
+            'decoded': decoded,
+            'dispatched': dispatched,
+            'elapsed': time.perf_counter() - started
+        }
@@ -0,0 +1,206 @@
+"""
+TTL cache of REST GET responses.
+Only routes given TTL are cached. Entries expire after their TTL, and least recently used entries are evicted on overflow.
+Entries are indexed by snowflake parameters of their route, so gateway UPDATE & DELETE events invalidate them.
+"""
+
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Final, FrozenSet, Hashable, Mapping, Optional, Set, Tuple
+
+
+__all__ = (
+    'ResponseCache',
+)
+
+DEFAULT_CACHE_SIZE: Final[int] = 1024
+# Route key -> ttl in seconds. Used if ResponseCache is created without ttls.
+DEFAULT_CACHE_TTLS: Final[Mapping[str, float]] = {
+    'GET /users/{user_id}': 300.0,
+    'GET /channels/{channel_id}': 60.0,
+    'GET /guilds/{guild_id}': 60.0,
+    'GET /guilds/{guild_id}/members/{user_id}': 60.0
+}
+# Route parameters used to invalidate entries.
+INDEXED_PARAMETERS: Final[Tuple[str, ...]] = ('channel_id', 'guild_id', 'user_id', 'message_id')
+# Gateway event -> parameters of entries made stale by it. See `_event_targets`.
+EVENT_TARGET_PARAMETERS: Final[Mapping[str, FrozenSet[str]]] = {
+    'CHANNEL_UPDATE': frozenset(('channel_id',)),
+    'CHANNEL_DELETE': frozenset(('channel_id',)),
+    'GUILD_UPDATE': frozenset(('guild_id',)),
+    'GUILD_DELETE': frozenset(('guild_id',)),
+    'GUILD_MEMBER_UPDATE': frozenset(('guild_id', 'user_id')),
+    'GUILD_MEMBER_REMOVE': frozenset(('guild_id', 'user_id')),
+    'USER_UPDATE': frozenset(('user_id',)),
+    'MESSAGE_UPDATE': frozenset(('channel_id', 'message_id')),
+    'MESSAGE_DELETE': frozenset(('channel_id', 'message_id'))
+}
+# Invalidated parameters whose generation is tracked, before tracked generations are reset.
+MAX_TRACKED_GENERATIONS: Final[int] = 4096
+_ROUTE_PARAMETER: Final[re.Pattern] = re.compile(r'{(\w+)}')
+
+
+def _event_targets(event_name: str, data: Any) -> Optional[Dict[str, int]]:
+    """
+    Parameters of entries made stale by gateway event.
+    """
+    if event_name in ('CHANNEL_UPDATE', 'CHANNEL_DELETE'):
+        return {'channel_id': int(data['id'])}
+    if event_name in ('GUILD_UPDATE', 'GUILD_DELETE'):
+        return {'guild_id': int(data['id'])}
+    if event_name in ('GUILD_MEMBER_UPDATE', 'GUILD_MEMBER_REMOVE'):
+        return {'guild_id': int(data['guild_id']), 'user_id': int(data['user']['id'])}
+    if event_name == 'USER_UPDATE':
+        return {'user_id': int(data['id'])}
+    if event_name in ('MESSAGE_UPDATE', 'MESSAGE_DELETE'):
+        return {'channel_id': int(data['channel_id']), 'message_id': int(data['id'])}
+    return None
+
+
+def _indexed(params: Mapping[str, Any]) -> Tuple[Tuple[str, int], ...]:
+    return tuple((name, int(params[name])) for name in INDEXED_PARAMETERS if params.get(name) is not None)
+
+
+class ResponseCache:
+    """
+    LRU cache of decoded GET responses with per-route TTL. Used by HTTPClient when given.
+    Cached responses are shared by every caller, so do not mutate them.
+    """
+
+    def __init__(self, ttls: Optional[Mapping[str, float]] = None, maxsize: int = DEFAULT_CACHE_SIZE):
+        """
+        :param ttls: route key (ex: `GET /users/{user_id}`) -> ttl in seconds. Other routes are not cached.
+        :param maxsize: maximum entries.
+        """
+        self.ttls: Dict[str, float] = dict(DEFAULT_CACHE_TTLS if ttls is None else ttls)
+        self.maxsize = maxsize
+        self.hits: int = 0
+        self.misses: int = 0
+        # Invalidation count of each parameter. Responses of requests started before their parameters are invalidated are not cached.
+        self.__generations: Dict[Tuple[str, int], int] = {}
+        # Incremented on `clear`, and when tracked generations are reset.
+        self.__epoch: int = 0
+        # Key -> (expires at, value, indexed parameters)
+        self.__entries: 'OrderedDict[Hashable, Tuple[float, Any, Tuple[Tuple[str, int], ...]]]' = OrderedDict()
+        self.__index: Dict[Tuple[str, int], Set[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def cacheable(self, route_key: str) -> bool:
+        return route_key in self.ttls
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self.__entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        if entry[0] <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return default
+        self.__entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def generation(self, params: Mapping[str, Any]) -> Hashable:
+        """
+        Take generation of route parameters before sending request. Only invalidation of these parameters changes it,
+        so events of other channels, guilds & users do not discard the response.
+        :param params: route parameters.
+        """
+        return self.__epoch, tuple(self.__generations.get(param, 0) for param in _indexed(params))
+
+    def set(self, key: Hashable, route_key: str, params: Mapping[str, Any], value: Any, generation: Optional[Hashable] = None):
+        """
+        :param key: request key.
+        :param route_key: route key, selecting ttl.
+        :param params: route parameters, indexed for invalidation.
+        :param value: decoded response.
+        :param generation: `generation(params)` when request was started. Value may be stale if it is changed since then.
+        """
+        ttl = self.ttls.get(route_key)
+        if ttl is None or (generation is not None and generation != self.generation(params)):
+            return
+        if key in self.__entries:
+            self._remove(key)
+        indexed = _indexed(params)
+        self.__entries[key] = (time.monotonic() + ttl, value, indexed)
+        for param in indexed:
+            self.__index.setdefault(param, set()).add(key)
+        while len(self.__entries) > self.maxsize:
+            self._remove(next(iter(self.__entries)))
+
+    def _remove(self, key: Hashable):
+        _, _, indexed = self.__entries.pop(key)
+        for param in indexed:
+            keys = self.__index.get(param)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.__index[param]
+
+    def invalidate(self, **params: int) -> int:
+        """
+        Remove entries whose route has every given parameter. ex) `invalidate(guild_id=1, user_id=2)` removes member 2 of guild 1.
+        :param params: snowflake parameters among channel_id, guild_id, user_id & message_id.
+        :return: number of removed entries.
+        """
+        if len(self.__generations) >= MAX_TRACKED_GENERATIONS:
+            # Forget old generations. New epoch still discards responses of every request in flight.
+            self.__generations.clear()
+            self.__epoch += 1
+        for name, value in params.items():
+            param = (name, int(value))
+            self.__generations[param] = self.__generations.get(param, 0) + 1
+        matched: Optional[Set[Hashable]] = None
+        for name, value in params.items():
+            keys = self.__index.get((name, int(value)), set())
+            matched = set(keys) if matched is None else matched & keys
+            if not matched:
+                return 0
+        for key in matched or ():
+            self._remove(key)
+        return len(matched or ())
+
+    def clear(self):
+        self.__generations.clear()
+        self.__epoch += 1
+        self.__entries.clear()
+        self.__index.clear()
+
+    def handle_event(self, event_name: str, data: Any):
+        """
+        Invalidation hook of gateway events. Register with `attach`.
+        """
+        targets = _event_targets(event_name, data)
+        if targets is not None:
+            self.invalidate(**targets)
+
+    def invalidating_events(self) -> Tuple[str, ...]:
+        """
+        Gateway events which may invalidate entries of cached routes.
+        Event invalidates a route if the route has every parameter the event targets.
+        """
+        route_parameters = [frozenset(_ROUTE_PARAMETER.findall(route_key)) for route_key in self.ttls]
+        return tuple(
+            event_name for event_name, targets in EVENT_TARGET_PARAMETERS.items()
+            if any(targets <= parameters for parameters in route_parameters)
+        )
+
+    def attach(self, event_manager):
+        """
+        Invalidate entries on gateway UPDATE & DELETE events dispatched by event manager.
+        Only events invalidating cached routes are hooked, so other events are still dropped before decoding.
+        :param event_manager: volt.events.EventManager of gateway or shard manager.
+        """
+        for event_name in self.invalidating_events():
+            event_manager.add_hook(event_name, self.handle_event)
+
+    def detach(self, event_manager):
+        for event_name in self.invalidating_events():
+            event_manager.remove_hook(event_name, self.handle_event)
+
+    def stats(self) -> Dict[str, int]:
+        return {'entries': len(self.__entries), 'hits': self.hits, 'misses': self.misses}
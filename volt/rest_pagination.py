@@ -0,0 +1,134 @@
+"""
+Async iterators over cursor-paginated REST endpoints. (channel messages, guild members, audit log entries)
+Entities are yielded as each page arrives, and next page is fetched while current page is consumed.
+Only a few pages are held in memory at once, regardless of total entities.
+When breaking out of iteration early, close the iterator (ex: `contextlib.aclosing`) to cancel prefetch immediately.
+"""
+
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Final, List, Optional
+
+from volt.types.type_hint import JSON
+
+
+__all__ = (
+    'paginate',
+    'paginate_split'
+)
+
+# Fetches page of at most `size` entities after (ascending) or before (descending) cursor, in iteration order.
+PageFetcher = Callable[[Optional[int], int], Awaitable[List[JSON]]]
+# Snowflake of entity, used as cursor.
+EntityKey = Callable[[JSON], int]
+
+DEFAULT_SPLIT_CONCURRENCY: Final[int] = 4
+_DONE: Final[object] = object()
+
+
+async def paginate(
+        fetch: PageFetcher,
+        key: EntityKey,
+        page_size: int,
+        cursor: Optional[int] = None,
+        end: Optional[int] = None,
+        ascending: bool = False,
+        limit: Optional[int] = None
+) -> AsyncIterator[JSON]:
+    """
+    Walk cursor-paginated endpoint, prefetching next page while current page is consumed.
+    :param fetch: page fetcher.
+    :param key: snowflake of entity.
+    :param page_size: maximum entities per page of the endpoint.
+    :param cursor: start cursor (exclusive). None starts from newest (descending) or oldest (ascending) entity.
+    :param end: end snowflake (exclusive). Walk stops on entity beyond this.
+    :param ascending: whether cursor moves to newer entities.
+    :param limit: maximum entities to yield.
+    """
+    remaining = limit
+
+    def next_page(page_cursor: Optional[int]) -> asyncio.Future:
+        return asyncio.ensure_future(fetch(page_cursor, page_size if remaining is None else min(page_size, remaining)))
+
+    task: Optional[asyncio.Future] = next_page(cursor)
+    try:
+        while task is not None:
+            page = await task
+            task = None
+            if not page:
+                return
+            last = key(page[-1])
+            finished = (
+                len(page) < page_size
+                or (end is not None and (last >= end if ascending else last <= end))
+                or (remaining is not None and remaining <= len(page))
+            )
+            if not finished:
+                task = next_page(last)
+            for entity in page:
+                if end is not None and (key(entity) >= end if ascending else key(entity) <= end):
+                    return
+                yield entity
+                if remaining is not None:
+                    remaining -= 1
+                    if remaining <= 0:
+                        return
+    finally:
+        if task is not None:
+            task.cancel()
+
+
+async def paginate_split(
+        fetch: PageFetcher,
+        key: EntityKey,
+        page_size: int,
+        after: int,
+        before: int,
+        splits: int,
+        concurrency: int = DEFAULT_SPLIT_CONCURRENCY
+) -> AsyncIterator[JSON]:
+    """
+    Split snowflake range into sub-ranges, and walk them concurrently in ascending order.
+    Entities are yielded as they arrive, so entities of different sub-ranges are interleaved.
+    Every request still waits for its rate limit bucket, so walkers sharing a bucket only fill its budget.
+    :param fetch: ascending page fetcher.
+    :param key: snowflake of entity.
+    :param page_size: maximum entities per page of the endpoint.
+    :param after: start snowflake (exclusive).
+    :param before: end snowflake (exclusive).
+    :param splits: number of sub-ranges.
+    :param concurrency: maximum sub-ranges walked at once.
+    """
+    splits = max(1, min(splits, before - after))
+    step = (before - after) // splits
+    bounds = [after + step * i for i in range(splits)] + [before]
+    # Bounded, so walkers wait for slow consumer instead of buffering entities.
+    queue: asyncio.Queue = asyncio.Queue(maxsize=page_size)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def walk(lo: int, hi: int):
+        try:
+            async with semaphore:
+                async for entity in paginate(fetch, key, page_size, cursor=lo, end=hi, ascending=True):
+                    await queue.put(entity)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put(e)
+            return
+        await queue.put(_DONE)
+
+    # Cursors are exclusive, so sub-ranges after the first start one below their bound.
+    walkers = [asyncio.ensure_future(walk(lo - (i > 0), hi)) for i, (lo, hi) in enumerate(zip(bounds, bounds[1:]))]
+    running = len(walkers)
+    try:
+        while running:
+            item = await queue.get()
+            if item is _DONE:
+                running -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        for walker in walkers:
+            walker.cancel()
@@ -0,0 +1,209 @@
+"""
+Sharding support.
+ShardManager runs several GatewayBot shards in one event loop, sharing one http session and one event manager.
+"""
+
+import asyncio
+import time
+from random import random
+from typing import Dict, Final, Optional, Sequence
+
+import aiohttp
+
+from volt.errors import DiscordHTTPError
+from volt.events import EventManager
+from volt.gateway import GatewayBot, GatewayIntents, WSClosedError, RECONNECT_BACKOFF_BASE, RECONNECT_BACKOFF_MAX, FATAL_CLOSE_CODES
+from volt.http import ApiRoute, HTTPClient, HTTPSession, _decode_body
+from volt.identify import IdentifyScheduler
+from volt.types.type_hint import JSON, CoroutineFunction
+from volt.utils.log import get_logger, DEBUG
+
+
+__all__ = (
+    'ShardManager',
+    'fetch_gateway_bot'
+)
+
+# Shard which stayed connected longer than this is considered healthy, and its backoff is reset.
+HEALTHY_CONNECTION_SECONDS: Final[float] = 60.0
+
+
+async def fetch_gateway_bot(session: aiohttp.ClientSession, token: str, version: int = 9) -> JSON:
+    """
+    Request `GET /gateway/bot`.
+    :param session: http session to use.
+    :param token: bot token.
+    :param version: api version.
+    :return: gateway info, including recommended shard count (`shards`) and `session_start_limit`.
+    """
+    async with session.get(
+            f'{ApiRoute(version).api_url}/gateway/bot',
+            headers={'Authorization': f'Bot {token}'}
+    ) as resp:
+        if resp.status != 200:
+            raise DiscordHTTPError(
+                f'GET /gateway/bot failed with status {resp.status}.', resp.status, _decode_body(resp.headers, await resp.read())
+            )
+        return await resp.json()
+
+
+class ShardManager:
+    """
+    Runs N GatewayBot shards in one event loop.
+    Each shard reconnects on its own. A failing shard does not restart other shards.
+    """
+
+    def __init__(
+            self,
+            token: str,
+            shard_count: Optional[int] = None,
+            shard_ids: Optional[Sequence[int]] = None,
+            version: int = 9,
+            intents: GatewayIntents = GatewayIntents.all(),
+            before_identify: Optional[CoroutineFunction] = None,
+            event_workers: Optional[int] = None,
+            **gateway_options
+    ):
+        """
+        :param token: bot token.
+        :param shard_count: total shard count. If None, recommended shard count from `GET /gateway/bot` is used.
+        :param shard_ids: shard ids to run in this manager. If None, runs every shard.
+        :param version: gateway & api version.
+        :param intents: gateway intents of shards.
+        :param before_identify: coroutine function awaited before each shard identifies. Replaces default identify scheduler of this manager,
+            which identifies `shard_id % max_concurrency` buckets in parallel and keeps daily identify budget.
+        :param event_workers: if given, listeners of every shard run in this many workers with per-guild ordering. (See EventManager)
+        :param gateway_options: extra keyword arguments passed into each GatewayBot. (compress, encoding, ...)
+        """
+        self.logger = get_logger('volt.shard', stream_level=DEBUG)
+        self.version: Final[int] = version
+        self.intents = intents
+        self.shard_count: Optional[int] = shard_count
+        self.shard_ids: Optional[Sequence[int]] = shard_ids
+        self.gateway_options = gateway_options
+        self.identify_scheduler: IdentifyScheduler = IdentifyScheduler()
+        self.before_identify: CoroutineFunction = before_identify or self.identify_scheduler
+        # Websocket connections of shards. REST requests use pooled `http` session instead, so shards never exhaust its pool.
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.http: HTTPSession = HTTPSession(version)
+        self.event_manager: Optional[EventManager] = None
+        self.event_workers: Optional[int] = event_workers
+        self.shards: Dict[int, GatewayBot] = {}
+        self.gateway_info: Optional[JSON] = None
+        self.__token: Final[str] = token
+        self.__tasks: Dict[int, asyncio.Task] = {}
+        self.__closed: bool = False
+
+    @property
+    def latencies(self) -> Dict[int, Optional[float]]:
+        """
+        Latest heartbeat round trip time of each shard, in seconds.
+        """
+        return {shard_id: shard.latency for shard_id, shard in self.shards.items()}
+
+    async def fetch_gateway_bot(self) -> JSON:
+        """
+        Request `GET /gateway/bot` using shared session.
+        """
+        return await fetch_gateway_bot(self.http.session, self.__token, self.version)
+
+    def create_shard(self, shard_id: int) -> GatewayBot:
+        return GatewayBot(
+            self.__token,
+            version=self.version,
+            intents=self.intents,
+            shard=(shard_id, self.shard_count),
+            session=self.session,
+            event_manager=self.event_manager,
+            before_identify=self.before_identify,
+            **self.gateway_options
+        )
+
+    async def _run_shard(self, shard_id: int):
+        backoff = RECONNECT_BACKOFF_BASE
+        shard = self.shards[shard_id]
+        while not self.__closed:
+            started = time.monotonic()
+            try:
+                await shard.run()
+            except asyncio.CancelledError:
+                raise
+            except WSClosedError as e:
+                if e.data in FATAL_CLOSE_CODES:
+                    self.logger.error(f'Shard {shard_id} is closed with fatal close code {e.data}. Stop the shard.')
+                    break
+                self.logger.warning(f'Shard {shard_id} disconnected : {e!r}')
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                self.logger.warning(f'Shard {shard_id} disconnected : {e!r}')
+            except Exception as e:
+                self.logger.error(f'Shard {shard_id} crashed.', exc_info=e)
+            if self.__closed:
+                break
+            if time.monotonic() - started > HEALTHY_CONNECTION_SECONDS:
+                backoff = RECONNECT_BACKOFF_BASE
+            delay = backoff * (1 + random())
+            self.logger.info(f'Reconnecting shard {shard_id} in {delay:.2f} seconds.')
+            await asyncio.sleep(delay)
+            backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX)
+        self.logger.debug(f'Shard {shard_id} is stopped.')
+
+    async def prepare(self):
+        """
+        Create shared session & event manager, fetch recommended shard count if needed, and create shards without connecting.
+        Register listeners on `event_manager` after this call.
+        """
+        if self.session is not None:
+            return
+        self.session = aiohttp.ClientSession()
+        self.event_manager = EventManager(gateway=self, workers=self.event_workers)
+        # Default identify scheduler needs session_start_limit, so gateway info is fetched even if shard count is given.
+        if self.shard_count is None or self.before_identify is self.identify_scheduler:
+            self.gateway_info = await self.fetch_gateway_bot()
+            self.identify_scheduler.schedule.update(self.gateway_info['session_start_limit'])
+        if self.shard_count is None:
+            self.shard_count = self.gateway_info['shards']
+            self.logger.info(f'Using recommended shard count {self.shard_count}.')
+        shard_ids = self.shard_ids if self.shard_ids is not None else range(self.shard_count)
+        for shard_id in shard_ids:
+            self.shards[shard_id] = self.create_shard(shard_id)
+
+    async def start(self):
+        """
+        Prepare manager if needed, and start every shard.
+        Returns when all shards are stopped.
+        """
+        await self.prepare()
+        for shard_id in self.shards:
+            self.__tasks[shard_id] = asyncio.create_task(self._run_shard(shard_id), name=f'volt-shard-{shard_id}')
+        try:
+            await asyncio.gather(*self.__tasks.values(), return_exceptions=True)
+        finally:
+            if not self.session.closed:
+                await self.session.close()
+            await self.http.close()
+
+    async def close(self):
+        """
+        Close every shard and shared http session.
+        """
+        self.__closed = True
+        for shard in self.shards.values():
+            await shard.close()
+            await shard.disconnect()
+        for task in self.__tasks.values():
+            task.cancel()
+        if self.event_manager is not None:
+            await self.event_manager.close()
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        await self.http.close()
+        await HTTPClient.close_shared()
+
+    def run(self):
+        """
+        Blocking call to run every shard.
+        """
+        try:
+            asyncio.get_event_loop().run_until_complete(self.start())
+        except KeyboardInterrupt:
+            asyncio.get_event_loop().run_until_complete(self.close())
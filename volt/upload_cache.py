@@ -0,0 +1,266 @@
+"""
+Content-addressed cache of uploaded attachments.
+Remembers CDN url of files by sha256 of their content. When embed of new message refers to a file by `attachment://`
+(image, thumbnail, author & footer icon), and the same content was uploaded before, the embed refers to cached CDN url
+and the file is not uploaded again. Plain attachments are always uploaded, because discord cannot reference them by url.
+Entries are kept in sqlite database with bounded size. Signed CDN urls expire, so expiring entries are refreshed
+via discord before use, and dropped if discord refuses to refresh them.
+Database is used only from a dedicated thread, so queries & commits never block the event loop.
+"""
+
+import asyncio
+import copy
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Final, Iterator, List, Optional, Sequence, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
+
+from volt.errors import DiscordHTTPError
+from volt.file import File
+from volt.types.type_hint import JSON
+from volt.utils.log import get_logger, DEBUG
+
+
+__all__ = (
+    'UploadCache',
+)
+
+DEFAULT_UPLOAD_CACHE_PATH: Final[str] = 'volt-uploads.sqlite3'
+DEFAULT_MAX_ENTRIES: Final[int] = 10000
+# Entries of urls without expiry are revalidated after this.
+DEFAULT_UPLOAD_TTL: Final[float] = 86400.0
+# Entries expiring within this are refreshed before use.
+REFRESH_MARGIN: Final[float] = 3600.0
+ATTACHMENT_SCHEME: Final[str] = 'attachment://'
+# Embed fields which can refer to attachment, as (object key, url key).
+_EMBED_REFERENCES: Final[Tuple[Tuple[str, str], ...]] = (
+    ('image', 'url'),
+    ('thumbnail', 'url'),
+    ('author', 'icon_url'),
+    ('footer', 'icon_url')
+)
+
+
+def _url_expiry(url: str) -> Optional[float]:
+    """
+    Expiry of signed CDN url, from its `ex` parameter. (hex unix timestamp)
+    """
+    ex = parse_qs(urlsplit(url).query).get('ex')
+    try:
+        return float(int(ex[0], 16)) if ex else None
+    except ValueError:
+        return None
+
+
+def _references(embeds: List[JSON]) -> Iterator[Tuple[JSON, str, str]]:
+    """
+    Find attachment references in embeds.
+    :return: iterator of (embed object, url key, filename).
+    """
+    for embed in embeds:
+        for obj_key, url_key in _EMBED_REFERENCES:
+            obj = embed.get(obj_key)
+            if obj and isinstance(url := obj.get(url_key), str) and url.startswith(ATTACHMENT_SCHEME):
+                yield obj, url_key, url[len(ATTACHMENT_SCHEME):]
+
+
+class UploadCache:
+    """
+    Attachment upload cache, used by HTTPClient when given.
+    """
+
+    def __init__(
+            self,
+            path: Union[str, os.PathLike] = DEFAULT_UPLOAD_CACHE_PATH,
+            max_entries: int = DEFAULT_MAX_ENTRIES,
+            ttl: float = DEFAULT_UPLOAD_TTL
+    ):
+        """
+        :param path: sqlite database path. `:memory:` keeps entries in memory only.
+        :param max_entries: maximum entries. Least recently used entries are evicted.
+        :param ttl: lifetime of entries whose url has no expiry.
+        """
+        self.logger = get_logger('volt.upload_cache', stream_level=DEBUG)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits: int = 0
+        self.misses: int = 0
+        # Path -> (mtime, size, digest). Unchanged files are not hashed again.
+        self.__digests: Dict[str, Tuple[float, int, str]] = {}
+        # Single thread, so queries run one at a time and in order.
+        self.__executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='volt-upload-cache')
+        self.__db = sqlite3.connect(path, check_same_thread=False)
+        self.__db.execute(
+            'CREATE TABLE IF NOT EXISTS uploads ('
+            'digest TEXT PRIMARY KEY, url TEXT NOT NULL, proxy_url TEXT, size INTEGER, expires_at REAL, used_at REAL)'
+        )
+        self.__db.execute('CREATE INDEX IF NOT EXISTS uploads_used_at ON uploads (used_at)')
+        self.__db.commit()
+        # Count of entries, kept in memory instead of counting rows on every store.
+        self.__count: int = self.__db.execute('SELECT COUNT(*) FROM uploads').fetchone()[0]
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def close(self):
+        """
+        Wait for queued queries, and close database.
+        """
+        self.__executor.shutdown(wait=True)
+        self.__db.close()
+
+    async def _run(self, func: Callable, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.__executor, func, *args)
+
+    async def digest(self, file: File) -> Optional[str]:
+        """
+        :return: sha256 of file, or None if file cannot be read twice.
+        """
+        if isinstance(file.source, (str, os.PathLike)):
+            path = os.fspath(file.source)
+            stat = await asyncio.get_running_loop().run_in_executor(None, os.stat, path)
+            known = self.__digests.get(path)
+            if known is not None and known[:2] == (stat.st_mtime, stat.st_size):
+                return known[2]
+            digest = await file.digest()
+            if len(self.__digests) >= self.max_entries:
+                self.__digests.clear()
+            self.__digests[path] = (stat.st_mtime, stat.st_size, digest)
+            return digest
+        return await file.digest()
+
+    async def get(self, digest: str) -> Optional[Tuple[str, float]]:
+        """
+        :return: cached url and its expiry, or None.
+        """
+        return await self._run(self._get, digest)
+
+    def _get(self, digest: str) -> Optional[Tuple[str, float]]:
+        row = self.__db.execute('SELECT url, expires_at FROM uploads WHERE digest = ?', (digest,)).fetchone()
+        return tuple(row) if row is not None else None
+
+    async def store(self, digest: str, attachment: JSON):
+        """
+        Remember uploaded attachment.
+        :param digest: sha256 of attachment.
+        :param attachment: attachment object of discord message.
+        """
+        url = attachment['url']
+        expires_at = _url_expiry(url) or time.time() + self.ttl
+        await self._run(
+            self._store,
+            (digest, url, attachment.get('proxy_url'), attachment.get('size'), expires_at, time.time())
+        )
+
+    def _store(self, row: Tuple):
+        if self.__db.execute('SELECT 1 FROM uploads WHERE digest = ?', (row[0],)).fetchone() is None:
+            self.__count += 1
+        self.__db.execute('INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, ?, ?)', row)
+        overflow = self.__count - self.max_entries
+        if overflow > 0:
+            self.__count -= self.__db.execute(
+                'DELETE FROM uploads WHERE digest IN (SELECT digest FROM uploads ORDER BY used_at LIMIT ?)', (overflow,)
+            ).rowcount
+        self.__db.commit()
+
+    async def invalidate(self, digest: str):
+        await self._run(self._invalidate, digest)
+
+    def _invalidate(self, digest: str):
+        self.__count -= self.__db.execute('DELETE FROM uploads WHERE digest = ?', (digest,)).rowcount
+        self.__db.commit()
+
+    def _touch(self, digest: str, url: str, expires_at: float):
+        self.__db.execute(
+            'UPDATE uploads SET url = ?, expires_at = ?, used_at = ? WHERE digest = ?', (url, expires_at, time.time(), digest)
+        )
+        self.__db.commit()
+
+    async def resolve(self, http, digest: str) -> Optional[str]:
+        """
+        Get valid CDN url of content. Expiring url is refreshed, and dropped if discord refuses to refresh it.
+        :param http: volt.http.HTTPClient used to refresh url.
+        :param digest: sha256 of content.
+        :return: url, or None if content should be uploaded.
+        """
+        entry = await self.get(digest)
+        if entry is None:
+            return None
+        url, expires_at = entry
+        if expires_at - time.time() < REFRESH_MARGIN:
+            try:
+                refreshed = await http.refresh_attachment_urls([url])
+            except DiscordHTTPError as e:
+                self.logger.debug(f'Cannot refresh cached upload {digest} : {e}')
+                refreshed = {}
+            if not refreshed.get(url):
+                await self.invalidate(digest)
+                return None
+            url = refreshed[url]
+            expires_at = _url_expiry(url) or time.time() + self.ttl
+        await self._run(self._touch, digest, url, expires_at)
+        return url
+
+    async def prepare(self, http, payload: Optional[JSON], files: Sequence[File]) -> Tuple[Optional[JSON], List[File], Dict[int, str]]:
+        """
+        Replace embed references to previously uploaded files with their CDN urls, and drop those files.
+        :param http: volt.http.HTTPClient used to refresh urls.
+        :param payload: message payload. Not modified.
+        :param files: files of message.
+        :return: payload to send, files to upload, and digests of uploaded files referenced by embeds,
+            keyed by index in files to upload.
+        """
+        embeds = payload.get('embeds') if payload else None
+        if not embeds:
+            return payload, list(files), {}
+        referenced = {filename for _, _, filename in _references(embeds)}
+        urls: Dict[str, str] = {}
+        pending: Dict[File, str] = {}
+        for file in files:
+            if file.filename not in referenced:
+                continue
+            digest = await self.digest(file)
+            if digest is None:
+                continue
+            url = await self.resolve(http, digest)
+            if url is None:
+                self.misses += 1
+                pending[file] = digest
+            else:
+                self.hits += 1
+                urls[file.filename] = url
+        if urls:
+            payload = dict(payload)
+            payload['embeds'] = copy.deepcopy(embeds)
+            for obj, url_key, filename in _references(payload['embeds']):
+                if filename in urls:
+                    obj[url_key] = urls[filename]
+            # File referenced by embed is shown only in the embed, so it is not needed anymore.
+            files = [file for file in files if file.filename not in urls]
+        return payload, list(files), {index: pending[file] for index, file in enumerate(files) if file in pending}
+
+    async def record(self, pending: Dict[int, str], payload: Optional[JSON], files: Sequence[File], message: Optional[JSON]):
+        """
+        Remember attachments of sent message.
+        Attachments are matched to files by their order, not by filename, because discord sanitizes filenames.
+        :param pending: digests keyed by file index, returned by `prepare`.
+        :param payload: sent payload, returned by `prepare`.
+        :param files: uploaded files, returned by `prepare`.
+        :param message: message returned by discord.
+        """
+        if not pending or not message:
+            return
+        # Attachments kept from existing message (on edit) are listed with their ids in payload. Others are new uploads.
+        kept = {str(attachment['id']) for attachment in (payload or {}).get('attachments', ()) if 'id' in attachment}
+        uploaded = [attachment for attachment in message.get('attachments', ()) if str(attachment.get('id')) not in kept]
+        if len(uploaded) != len(files):
+            self.logger.debug(f'Cannot match {len(uploaded)} attachments of message {message.get("id")} to {len(files)} uploaded files.')
+            return
+        for index, digest in pending.items():
+            if uploaded[index].get('url'):
+                await self.store(digest, uploaded[index])
+
+    def stats(self) -> Dict[str, Any]:
+        return {'entries': len(self), 'hits': self.hits, 'misses': self.misses}
@@ -3,5 +3,6 @@ from .iterutils import SizedIter, ilen, chunk
 from .dtutil import *
 from .log import *
 from .loop_task import LoopTask, CronLikeTask, loop, cron
+from .stats import RollingStats
 from .paginator import FullEmbedPaginator, FieldPaginator, FirstPageException, LastPageException, PaginatorException
 
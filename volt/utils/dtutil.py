@@ -3,17 +3,22 @@ Aware Datetime Utility
 """
 
 import datetime
-from typing import Union
+from typing import Final, Union
 
 
 __all__ = (
     'UTC',
     'utcnow',
     'get_discord_timestamp',
-    'is_leap_year'
+    'is_leap_year',
+    'DISCORD_EPOCH',
+    'snowflake_time',
+    'time_snowflake'
 )
 
 UTC = datetime.timezone.utc
+# First second of 2015, in milliseconds. Snowflakes hold milliseconds since this in their upper 42 bits.
+DISCORD_EPOCH: Final[int] = 1420070400000
 
 
 def utcnow() -> datetime.datetime:
@@ -58,3 +63,24 @@ def is_leap_year(year: int) -> bool:
     else:
         # Just yet another regular year!
         return False
+
+
+def snowflake_time(snowflake: int) -> datetime.datetime:
+    """
+    Get creation time of snowflake.
+    :param snowflake: discord snowflake id.
+    :return: aware datetime in UTC.
+    """
+    return datetime.datetime.fromtimestamp(((int(snowflake) >> 22) + DISCORD_EPOCH) / 1000, tz=UTC)
+
+
+def time_snowflake(dt: datetime.datetime, high: bool = False) -> int:
+    """
+    Get snowflake of given time, used as `before` & `after` cursor of paginated api.
+    :param dt: datetime. Naive datetime is regarded as UTC.
+    :param high: set lower 22 bits, so the snowflake is the last one of the millisecond.
+    :return: snowflake.
+    """
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=UTC)
+    return ((int(dt.timestamp() * 1000) - DISCORD_EPOCH) << 22) + ((1 << 22) - 1 if high else 0)
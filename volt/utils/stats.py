@@ -0,0 +1,74 @@
+"""
+Rolling Statistics Utility
+"""
+
+import math
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+__all__ = (
+    'RollingStats',
+)
+
+
+def _nearest_rank(ordered: list, p: float) -> float:
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))]
+
+
+class RollingStats:
+    """
+    Keeps the most recent samples, and computes percentiles over them.
+    """
+    __slots__ = ('_samples', '_total')
+
+    def __init__(self, size: int = 128):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._total: int = 0
+
+    def add(self, value: float):
+        self._samples.append(value)
+        self._total += 1
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    @property
+    def total(self) -> int:
+        """Count of every sample added, including the ones rolled out of window."""
+        return self._total
+
+    @property
+    def last(self) -> Optional[float]:
+        return self._samples[-1] if self._samples else None
+
+    @property
+    def mean(self) -> Optional[float]:
+        return sum(self._samples) / len(self._samples) if self._samples else None
+
+    def percentile(self, p: float) -> Optional[float]:
+        """
+        Get percentile of samples in window, using nearest-rank method.
+        :param p: percentile in range 0 ~ 100.
+        :return: percentile value, or None if there is no sample.
+        """
+        if not self._samples:
+            return None
+        return _nearest_rank(sorted(self._samples), p)
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        """
+        :return: dictionary of count, min, mean, p50, p90, p99, max of samples in window.
+        """
+        if not self._samples:
+            return {'count': 0, 'min': None, 'mean': None, 'p50': None, 'p90': None, 'p99': None, 'max': None}
+        ordered = sorted(self._samples)
+        return {
+            'count': len(ordered),
+            'min': ordered[0],
+            'mean': sum(ordered) / len(ordered),
+            'p50': _nearest_rank(ordered, 50),
+            'p90': _nearest_rank(ordered, 90),
+            'p99': _nearest_rank(ordered, 99),
+            'max': ordered[-1]
+        }